@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import AuditEvent
+from .models import AuditArchive, AuditEvent
 
 
 @admin.register(AuditEvent)
@@ -17,3 +17,15 @@ class AuditEventAdmin(admin.ModelAdmin):
     
     def has_change_permission(self, request, obj=None):
         return False
+
+
+@admin.register(AuditArchive)
+class AuditArchiveAdmin(admin.ModelAdmin):
+    list_display = ['period_start', 'row_count', 'size_bytes', 'bucket', 'object_key', 'created_at']
+    readonly_fields = ['period_start', 'period_end', 'bucket', 'object_key', 'row_count', 'size_bytes', 'sha256', 'created_at']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
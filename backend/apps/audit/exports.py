@@ -0,0 +1,49 @@
+import csv
+import io
+import json
+import zlib
+
+CHUNK_SIZE = 2000
+EXPORT_FIELDS = [
+    'id', 'created_at', 'actor_id', 'actor', 'action', 'entity_type', 'entity_id',
+    'ip_address', 'user_agent', 'before_json', 'after_json',
+]
+
+
+def _rows(queryset):
+    """Yield export rows from a server-side cursor, CHUNK_SIZE rows per fetch."""
+    values = queryset.values(*[field if field != 'actor' else 'actor__username' for field in EXPORT_FIELDS])
+    for row in values.iterator(chunk_size=CHUNK_SIZE):
+        row['actor'] = row.pop('actor__username')
+        row['created_at'] = row['created_at'].isoformat()
+        yield row
+
+
+def iter_csv(queryset):
+    """Stream events as CSV; the JSON columns hold JSON text."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    for count, row in enumerate(_rows(queryset), start=1):
+        row['before_json'] = json.dumps(row['before_json'], default=str) if row['before_json'] is not None else ''
+        row['after_json'] = json.dumps(row['after_json'], default=str) if row['after_json'] is not None else ''
+        writer.writerow(row)
+        if count % CHUNK_SIZE == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+def iter_jsonl_gz(queryset):
+    """Stream events as gzip-compressed JSON lines."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    lines = []
+    for row in _rows(queryset):
+        lines.append(json.dumps(row, default=str))
+        if len(lines) == CHUNK_SIZE:
+            yield compressor.compress(('\n'.join(lines) + '\n').encode('utf-8'))
+            lines = []
+    if lines:
+        yield compressor.compress(('\n'.join(lines) + '\n').encode('utf-8'))
+    yield compressor.flush()
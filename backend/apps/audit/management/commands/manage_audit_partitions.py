@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.audit.partitions import add_months, archive_before, ensure_partitions, is_partitioned, month_start
+
+
+class Command(BaseCommand):
+    help = (
+        'Create upcoming monthly AuditEvent partitions and archive months older than the '
+        'hot retention window to compressed JSONL in the exports bucket.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months-ahead', type=int, default=getattr(settings, 'AUDIT_PARTITION_MONTHS_AHEAD', 3))
+        parser.add_argument('--retain-months', type=int, default=getattr(settings, 'AUDIT_HOT_RETENTION_MONTHS', 12))
+        parser.add_argument('--no-archive', action='store_true', help='Only create partitions')
+
+    def handle(self, *args, **options):
+        months_ahead = options['months_ahead']
+        retain_months = options['retain_months']
+        if months_ahead < 0:
+            raise CommandError('--months-ahead must be >= 0')
+        if retain_months <= 0:
+            raise CommandError('--retain-months must be > 0')
+
+        if is_partitioned():
+            created = ensure_partitions(months_ahead)
+            for name in created:
+                self.stdout.write(self.style.SUCCESS(f'Created partition {name}'))
+        else:
+            self.stdout.write(self.style.WARNING('audit_auditevent is not partitioned; skipping partition creation'))
+
+        if options['no_archive']:
+            return
+        cutoff = add_months(month_start(timezone.now()), -retain_months)
+        for archive in archive_before(cutoff):
+            self.stdout.write(self.style.SUCCESS(
+                f'Archived {archive.row_count} events for {archive.period_start:%Y-%m} to {archive.bucket}/{archive.object_key}'
+            ))
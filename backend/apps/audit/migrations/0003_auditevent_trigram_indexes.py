@@ -0,0 +1,43 @@
+from django.db import migrations
+
+TRIGRAM_COLUMNS = ['action', 'entity_type', 'entity_id']
+
+
+def _index_name(column):
+    return f'audit_auditevent_{column}_trgm'
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # Substring search uses UPPER(col::text) LIKE, so index that expression.
+    # Without pg_trgm (or on SQLite) the search still works, just unindexed.
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for column in TRIGRAM_COLUMNS:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {_index_name(column)} '
+            f'ON audit_auditevent USING gin ((UPPER({column}::text)) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for column in TRIGRAM_COLUMNS:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {_index_name(column)}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0002_auditevent_keyset_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
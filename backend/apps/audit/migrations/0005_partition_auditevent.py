@@ -0,0 +1,97 @@
+from datetime import datetime, timezone
+
+from django.db import migrations
+
+TABLE = 'audit_auditevent'
+MONTHS_AHEAD = 3
+
+
+def _add_months(value, months):
+    years, month = divmod(value.month - 1 + months, 12)
+    return value.replace(year=value.year + years, month=month + 1)
+
+
+def _month_start(value):
+    return value.astimezone(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _rebuild(schema_editor, partitioned):
+    """
+    Recreate audit_auditevent as a plain or range-partitioned table, keeping its rows,
+    identity sequence, indexes and foreign keys.
+
+    A partitioned table's primary key has to include the partition key, so it
+    becomes (id, created_at); ids still come from the same sequence.
+    """
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+    staging = f'{TABLE}_rebuild'
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT indexdef FROM pg_indexes WHERE schemaname = current_schema() AND tablename = %s AND indexname <> %s',
+            [TABLE, f'{TABLE}_pkey'],
+        )
+        # Indexes on a partitioned parent are reported as ON ONLY; recreate them recursively.
+        index_defs = [row[0].replace(' ON ONLY ', ' ON ') for row in cursor.fetchall()]
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'f'",
+            [TABLE],
+        )
+        foreign_keys = cursor.fetchall()
+        cursor.execute(f'SELECT MIN(created_at) FROM {TABLE}')
+        oldest = cursor.fetchone()[0]
+
+    like = f'LIKE {TABLE} INCLUDING DEFAULTS INCLUDING IDENTITY INCLUDING CONSTRAINTS'
+    if partitioned:
+        schema_editor.execute(f'CREATE TABLE {staging} ({like}) PARTITION BY RANGE (created_at)')
+        schema_editor.execute(f'CREATE TABLE {TABLE}_default PARTITION OF {staging} DEFAULT')
+        now = datetime.now(timezone.utc)
+        start = _month_start(min(oldest, now) if oldest else now)
+        last = _add_months(_month_start(now), MONTHS_AHEAD)
+        while start <= last:
+            end = _add_months(start, 1)
+            schema_editor.execute(
+                f"CREATE TABLE {TABLE}_y{start:%Y}m{start:%m} PARTITION OF {staging} "
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+            )
+            start = end
+        primary_key = '(id, created_at)'
+    else:
+        schema_editor.execute(f'CREATE TABLE {staging} ({like})')
+        primary_key = '(id)'
+
+    schema_editor.execute(f'INSERT INTO {staging} SELECT * FROM {TABLE}')
+    schema_editor.execute(f'DROP TABLE {TABLE} CASCADE')
+    schema_editor.execute(f'ALTER TABLE {staging} RENAME TO {TABLE}')
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_get_serial_sequence(%s, %s)', [TABLE, 'id'])
+        sequence = cursor.fetchone()[0]
+    schema_editor.execute(f'ALTER SEQUENCE {sequence} RENAME TO {TABLE}_id_seq')
+    schema_editor.execute(
+        f"SELECT setval('{TABLE}_id_seq', COALESCE(MAX(id), 1), MAX(id) IS NOT NULL) FROM {TABLE}"
+    )
+    schema_editor.execute(f'ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_pkey PRIMARY KEY {primary_key}')
+    for index_def in index_defs:
+        schema_editor.execute(index_def)
+    for name, definition in foreign_keys:
+        schema_editor.execute(f'ALTER TABLE {TABLE} ADD CONSTRAINT {name} {definition}')
+
+
+def partition_audit_events(apps, schema_editor):
+    _rebuild(schema_editor, partitioned=True)
+
+
+def unpartition_audit_events(apps, schema_editor):
+    _rebuild(schema_editor, partitioned=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0004_auditarchive'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_audit_events, unpartition_audit_events),
+    ]
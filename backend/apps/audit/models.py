@@ -25,8 +25,29 @@ class AuditEvent(models.Model):
         indexes = [
             models.Index(fields=['entity_type', 'entity_id']),
             models.Index(fields=['actor', 'created_at']),
+            models.Index(fields=['created_at', 'id']),
         ]
     
     def __str__(self):
         actor_name = self.actor.username if self.actor else 'System'
         return f"{actor_name} {self.action} {self.entity_type} {self.entity_id} at {self.created_at}"
+
+
+class AuditArchive(models.Model):
+    """
+    One month of audit events moved out of the database into compressed JSONL in object storage.
+    """
+    period_start = models.DateTimeField(unique=True)
+    period_end = models.DateTimeField()
+    bucket = models.CharField(max_length=100)
+    object_key = models.CharField(max_length=500)
+    row_count = models.PositiveIntegerField()
+    size_bytes = models.BigIntegerField()
+    sha256 = models.CharField(max_length=64)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-period_start']
+
+    def __str__(self):
+        return f"Audit archive {self.period_start:%Y-%m} ({self.row_count} events)"
@@ -0,0 +1,202 @@
+"""
+Monthly partitions and cold-storage archives for AuditEvent.
+
+On PostgreSQL audit_auditevent is range-partitioned by created_at into
+audit_auditevent_yYYYYmMM tables plus a default partition (migration 0005).
+Months older than the hot retention window are written to gzipped JSONL in
+the exports bucket, recorded as an AuditArchive, and then dropped from the
+database. On other databases the same archiving deletes the month's rows.
+"""
+import gzip
+import json
+import tempfile
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apps.evidence.storage import HashingWriter, get_s3_client
+from .models import AuditArchive, AuditEvent
+
+TABLE = AuditEvent._meta.db_table
+DEFAULT_PARTITION = f'{TABLE}_default'
+ARCHIVE_FIELDS = [
+    'id', 'created_at', 'actor_id', 'actor__username', 'action', 'entity_type', 'entity_id',
+    'before_json', 'after_json', 'ip_address', 'user_agent',
+]
+
+
+def month_start(value):
+    return value.astimezone(dt_timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(value, months: int):
+    years, month = divmod(value.month - 1 + months, 12)
+    return value.replace(year=value.year + years, month=month + 1)
+
+
+def partition_name(start) -> str:
+    return f'{TABLE}_y{start:%Y}m{start:%m}'
+
+
+def is_partitioned() -> bool:
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)',
+            [TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+def attached_partitions() -> set[str]:
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT child.relname FROM pg_inherits JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+            'WHERE pg_inherits.inhparent = to_regclass(%s)',
+            [TABLE],
+        )
+        return {row[0] for row in cursor.fetchall()}
+
+
+def _create_partition(cursor, start):
+    end = add_months(start, 1)
+    bounds = f"FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    cursor.execute(
+        f'SELECT 1 FROM {DEFAULT_PARTITION} WHERE created_at >= %s AND created_at < %s LIMIT 1',
+        [start, end],
+    )
+    if cursor.fetchone() is None:
+        cursor.execute(f'CREATE TABLE {partition_name(start)} PARTITION OF {TABLE} FOR VALUES {bounds}')
+        return
+    # Rows for this month already landed in the default partition, which would
+    # overlap the new one; move them across while the default is detached.
+    cursor.execute(f'ALTER TABLE {TABLE} DETACH PARTITION {DEFAULT_PARTITION}')
+    cursor.execute(f'CREATE TABLE {partition_name(start)} PARTITION OF {TABLE} FOR VALUES {bounds}')
+    cursor.execute(
+        f'INSERT INTO {TABLE} SELECT * FROM {DEFAULT_PARTITION} WHERE created_at >= %s AND created_at < %s',
+        [start, end],
+    )
+    cursor.execute(f'DELETE FROM {DEFAULT_PARTITION} WHERE created_at >= %s AND created_at < %s', [start, end])
+    cursor.execute(f'ALTER TABLE {TABLE} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT')
+
+
+def ensure_partitions(months_ahead: int, now=None) -> list[str]:
+    """Create the partitions for the current month and the next months_ahead months."""
+    if not is_partitioned():
+        return []
+    current = month_start(now or timezone.now())
+    existing = attached_partitions()
+    created = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        for offset in range(months_ahead + 1):
+            start = add_months(current, offset)
+            if partition_name(start) not in existing:
+                _create_partition(cursor, start)
+                created.append(partition_name(start))
+    return created
+
+
+def _ensure_bucket_exists(s3_client, bucket_name: str):
+    try:
+        s3_client.head_bucket(Bucket=bucket_name)
+    except Exception:
+        s3_client.create_bucket(Bucket=bucket_name)
+
+
+def _archive_row(row: dict) -> dict:
+    row = dict(row)
+    row['created_at'] = row['created_at'].isoformat()
+    row['actor'] = row.pop('actor__username')
+    return row
+
+
+def archive_month(start, s3_client=None) -> AuditArchive | None:
+    """
+    Move one month of events to object storage and drop it from the database.
+
+    Returns None when the month held no events; an empty partition is simply dropped.
+    """
+    start = month_start(start)
+    end = add_months(start, 1)
+    partition = partition_name(start)
+    has_partition = is_partitioned() and partition in attached_partitions()
+    events = (
+        AuditEvent.objects.filter(created_at__gte=start, created_at__lt=end)
+        .order_by('-created_at', '-id')
+        .values(*ARCHIVE_FIELDS)
+    )
+
+    archive = None
+    if events.exists():
+        s3_client = s3_client or get_s3_client()
+        bucket = getattr(settings, 'MINIO_BUCKET_EXPORTS', 'exports')
+        object_key = f'audit-archive/{start:%Y}/{partition}.jsonl.gz'
+        _ensure_bucket_exists(s3_client, bucket)
+        row_count = 0
+        with tempfile.TemporaryFile(suffix='.jsonl.gz') as spool:
+            output = HashingWriter(spool)
+            with gzip.GzipFile(fileobj=output, mode='wb') as gz:
+                for row in events.iterator(chunk_size=2000):
+                    gz.write(json.dumps(_archive_row(row), default=str).encode('utf-8') + b'\n')
+                    row_count += 1
+            spool.seek(0)
+            s3_client.upload_fileobj(spool, bucket, object_key, ExtraArgs={'ContentType': 'application/gzip'})
+        archive = AuditArchive(
+            period_start=start,
+            period_end=end,
+            bucket=bucket,
+            object_key=object_key,
+            row_count=row_count,
+            size_bytes=output.size,
+            sha256=output.sha256,
+        )
+
+    with transaction.atomic():
+        if archive is not None:
+            archive.save()
+        with connection.cursor() as cursor:
+            if has_partition:
+                cursor.execute(f'ALTER TABLE {TABLE} DETACH PARTITION {partition}')
+                cursor.execute(f'DROP TABLE {partition}')
+            else:
+                cursor.execute(f'DELETE FROM {TABLE} WHERE created_at >= %s AND created_at < %s', [start, end])
+    return archive
+
+
+def archive_before(cutoff, s3_client=None) -> list[AuditArchive]:
+    """Archive every whole month that ends on or before cutoff."""
+    cutoff = month_start(cutoff)
+    months = set()
+    oldest = AuditEvent.objects.filter(created_at__lt=cutoff).order_by('created_at').values_list('created_at', flat=True).first()
+    if oldest is not None:
+        start = month_start(oldest)
+        while start < cutoff:
+            months.add(start)
+            start = add_months(start, 1)
+    if is_partitioned():
+        # Old partitions with no rows left are dropped as well.
+        for name in attached_partitions() - {DEFAULT_PARTITION}:
+            start = datetime.strptime(name[len(TABLE) + 1:], 'y%Ym%m').replace(tzinfo=dt_timezone.utc)
+            if start < cutoff:
+                months.add(start)
+
+    archived = AuditArchive.objects.filter(period_start__in=months).values_list('period_start', flat=True)
+    months -= set(archived)
+    archives = []
+    for start in sorted(months):
+        archive = archive_month(start, s3_client=s3_client)
+        if archive is not None:
+            archives.append(archive)
+    return archives
+
+
+def iter_archived_events(archive: AuditArchive, s3_client=None):
+    """Yield the events of an archive as dicts, newest first."""
+    s3_client = s3_client or get_s3_client()
+    body = s3_client.get_object(Bucket=archive.bucket, Key=archive.object_key)['Body']
+    with gzip.GzipFile(fileobj=body, mode='rb') as gz:
+        for line in gz:
+            yield json.loads(line)
@@ -0,0 +1,175 @@
+"""
+Buffered writer for AuditEvent rows.
+
+Events recorded while a buffer is open are kept in memory and written with a
+single bulk_create when the buffer closes. A buffer belongs to the transaction
+depth it was opened at: an event recorded inside a deeper atomic block is
+written straight away, in that block, so it still rolls back with the change it
+describes. Rows are only ever inserted, never updated or deleted.
+"""
+import atexit
+import logging
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+from django.db import close_old_connections, connection
+
+from .models import AuditEvent
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+_flusher = None
+_flusher_lock = threading.Lock()
+_STOP = object()
+
+
+class _Buffer:
+    def __init__(self):
+        self.depth = len(connection.atomic_blocks)
+        self.events = []
+
+
+def _buffers() -> list:
+    if not hasattr(_local, 'buffers'):
+        _local.buffers = []
+    return _local.buffers
+
+
+def _write(events: list):
+    if events:
+        AuditEvent.objects.bulk_create(events)
+
+
+def record(event: AuditEvent) -> None:
+    """Queue an unsaved AuditEvent for writing."""
+    record_many([event])
+
+
+def record_many(events: list) -> None:
+    buffers = _buffers()
+    if buffers and buffers[-1].depth == len(connection.atomic_blocks):
+        buffers[-1].events.extend(events)
+        return
+    if not connection.in_atomic_block and _flusher is not None:
+        for event in events:
+            _flusher.put(event)
+        return
+    _write(events)
+
+
+@contextmanager
+def audit_buffer():
+    """Collect audit events recorded in this block and write them in one bulk_create on exit."""
+    buffers = _buffers()
+    if buffers and buffers[-1].depth == len(connection.atomic_blocks):
+        yield
+        return
+    buffer = _Buffer()
+    buffers.append(buffer)
+    try:
+        yield
+    finally:
+        buffers.pop()
+        # A transaction already marked for rollback cannot take more writes;
+        # its events describe changes that are being discarded anyway.
+        if not (connection.in_atomic_block and connection.needs_rollback):
+            _write(buffer.events)
+
+
+class AuditBufferMiddleware:
+    """Write the audit events of a request in one INSERT after the view returns."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with audit_buffer():
+            return self.get_response(request)
+
+
+class BackgroundFlusher(threading.Thread):
+    """Drain events recorded outside any request or transaction from a queue in batches."""
+
+    def __init__(self, interval: float = 1.0, batch_size: int = 500):
+        super().__init__(name='audit-flusher', daemon=True)
+        self.interval = interval
+        self.batch_size = batch_size
+        self._queue = queue.Queue()
+
+    def put(self, event: AuditEvent):
+        self._queue.put(event)
+
+    def run(self):
+        stopping = False
+        try:
+            while not (stopping and self._queue.empty()):
+                batch = []
+                deadline = time.monotonic() + self.interval
+                while len(batch) < self.batch_size:
+                    try:
+                        timeout = 0 if stopping else max(deadline - time.monotonic(), 0)
+                        event = self._queue.get(timeout=timeout)
+                    except queue.Empty:
+                        break
+                    if event is _STOP:
+                        stopping = True
+                        continue
+                    batch.append(event)
+                if batch:
+                    try:
+                        self._flush(batch)
+                    except Exception:
+                        # The thread must outlive any one batch, or later events would queue forever.
+                        logger.exception('Audit flush failed')
+                        connection.close()
+        finally:
+            connection.close()
+
+    def _flush(self, batch: list):
+        close_old_connections()
+        try:
+            _write(batch)
+            return
+        except Exception:
+            # Never drop audit rows silently: fall back to writing them one by one.
+            logger.exception('Bulk audit flush failed; retrying %s events individually', len(batch))
+            # A fresh connection, in case the failure broke this one.
+            connection.close()
+        for event in batch:
+            try:
+                event.save()
+            except Exception:
+                logger.exception(
+                    'Could not write audit event %s on %s %s',
+                    event.action, event.entity_type, event.entity_id,
+                )
+                connection.close()
+
+    def stop(self):
+        self._queue.put(_STOP)
+        self.join()
+
+
+def start_background_flusher(interval: float = 1.0, batch_size: int = 500) -> BackgroundFlusher:
+    """Route events recorded outside requests and transactions through a batching thread."""
+    global _flusher
+    with _flusher_lock:
+        if _flusher is None:
+            _flusher = BackgroundFlusher(interval=interval, batch_size=batch_size)
+            _flusher.start()
+        return _flusher
+
+
+def stop_background_flusher():
+    """Write everything still queued and stop the flusher thread."""
+    global _flusher
+    with _flusher_lock:
+        flusher, _flusher = _flusher, None
+    if flusher is not None:
+        flusher.stop()
+
+
+atexit.register(stop_background_flusher)
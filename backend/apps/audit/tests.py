@@ -1,3 +1,175 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import time
+from datetime import datetime, timezone as dt_timezone
+from unittest.mock import patch
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.management import call_command
+from django.db import DatabaseError, connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .models import AuditArchive, AuditEvent
+from .sink import BackgroundFlusher, audit_buffer, record
+
+
+def _event(action):
+    return AuditEvent(action=action, entity_type='Control', entity_id='1')
+
+
+class AuditSinkTests(TestCase):
+    def test_buffered_events_are_written_in_one_insert(self):
+        with CaptureQueriesContext(connection) as queries:
+            with audit_buffer():
+                for index in range(5):
+                    record(_event(f'ACTION_{index}'))
+                with audit_buffer():
+                    record(_event('NESTED'))
+                self.assertEqual(AuditEvent.objects.count(), 0)
+
+        inserts = [query for query in queries.captured_queries if query['sql'].startswith('INSERT')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(AuditEvent.objects.count(), 6)
+
+    def test_events_roll_back_with_their_transaction(self):
+        with audit_buffer():
+            record(_event('KEPT'))
+            try:
+                with transaction.atomic():
+                    record(_event('DISCARDED'))
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+
+        self.assertEqual(list(AuditEvent.objects.values_list('action', flat=True)), ['KEPT'])
+
+
+class BackgroundFlusherTests(TransactionTestCase):
+    def test_flusher_outlives_events_it_cannot_write(self):
+        save = AuditEvent.save
+
+        def save_unless_broken(event, *args, **kwargs):
+            if event.action == 'BROKEN':
+                raise DatabaseError('rejected')
+            return save(event, *args, **kwargs)
+
+        flusher = BackgroundFlusher(interval=0.01)
+        with patch('apps.audit.sink._write', side_effect=DatabaseError('bulk insert failed')), \
+                patch.object(AuditEvent, 'save', save_unless_broken), \
+                self.assertLogs('apps.audit.sink', 'ERROR') as logs:
+            flusher.start()
+            flusher.put(_event('BROKEN'))
+            flusher.put(_event('FIRST'))
+            while not flusher._queue.empty():
+                time.sleep(0.01)
+            time.sleep(0.05)
+            flusher.put(_event('LATER'))
+            flusher.stop()
+
+        self.assertEqual(set(AuditEvent.objects.values_list('action', flat=True)), {'FIRST', 'LATER'})
+        self.assertTrue(any('BROKEN' in message for message in logs.output))
+
+
+class AuditEventsListTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        user = get_user_model().objects.create_user(username='auditor', password='pass1234')
+        user.groups.add(Group.objects.get_or_create(name='AUDITOR')[0])
+        self.client.force_authenticate(user=user)
+
+    def test_cursor_walks_every_matching_event_once(self):
+        AuditEvent.objects.bulk_create(
+            [AuditEvent(action='UPDATE', entity_type='Control', entity_id='7') for _ in range(5)]
+            + [AuditEvent(action='UPDATE', entity_type='Control', entity_id='8')]
+        )
+        # Identical timestamps make the id tie-breaker decide the order.
+        AuditEvent.objects.update(created_at=timezone.now())
+        expected = list(
+            AuditEvent.objects.filter(entity_id='7').order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+
+        seen, cursor = [], None
+        while True:
+            params = {'entity_type': 'Control', 'entity_id': '7', 'limit': 2}
+            if cursor:
+                params['cursor'] = cursor
+            response = self.client.get('/api/v1/audit/events', params)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(event['id'] for event in response.json())
+            cursor = response.headers.get('X-Next-Cursor')
+            if not cursor:
+                break
+
+        self.assertEqual(seen, expected)
+        self.assertEqual(self.client.get('/api/v1/audit/events', {'cursor': 'not-a-cursor'}).status_code, 400)
+
+    def test_export_streams_all_matching_events(self):
+        AuditEvent.objects.bulk_create(
+            [AuditEvent(action='UPDATE', entity_type='Control', entity_id=str(i), after_json={'n': i}) for i in range(5)]
+            + [AuditEvent(action='UPDATE', entity_type='EvidenceItem', entity_id='x')]
+        )
+
+        response = self.client.get('/api/v1/audit/events/export', {'entity_type': 'Control'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode('utf-8'))))
+        self.assertEqual(sorted(row['entity_id'] for row in rows), ['0', '1', '2', '3', '4'])
+        self.assertEqual(json.loads(rows[0]['after_json']), {'n': int(rows[0]['entity_id'])})
+
+        response = self.client.get('/api/v1/audit/events/export', {'entity_type': 'Control', 'export_format': 'jsonl'})
+        lines = gzip.decompress(b''.join(response.streaming_content)).decode('utf-8').splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(json.loads(lines[0])['entity_type'], 'Control')
+        self.assertTrue(AuditEvent.objects.filter(action='AUDIT_EXPORTED').exists())
+
+
+class MemoryS3Client:
+    def __init__(self):
+        self.objects = {}
+
+    def head_bucket(self, Bucket):
+        return {}
+
+    def upload_fileobj(self, fileobj, bucket, key, ExtraArgs=None):
+        self.objects[(bucket, key)] = fileobj.read()
+
+    def get_object(self, Bucket, Key):
+        return {'Body': io.BytesIO(self.objects[(Bucket, Key)])}
+
+
+class AuditArchiveTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        user = get_user_model().objects.create_user(username='auditor', password='pass1234')
+        user.groups.add(Group.objects.get_or_create(name='AUDITOR')[0])
+        self.client.force_authenticate(user=user)
+        self.s3 = MemoryS3Client()
+        patcher = patch('apps.audit.partitions.get_s3_client', return_value=self.s3)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_old_months_are_archived_and_stay_queryable(self):
+        AuditEvent.objects.bulk_create([_event('OLD_1'), _event('OLD_2'), _event('RECENT')])
+        AuditEvent.objects.exclude(action='RECENT').update(created_at=datetime(2024, 3, 15, tzinfo=dt_timezone.utc))
+        expected = list(
+            AuditEvent.objects.exclude(action='RECENT').order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+
+        call_command('manage_audit_partitions', '--retain-months', '12', stdout=io.StringIO())
+
+        archive = AuditArchive.objects.get()
+        self.assertEqual(archive.row_count, 2)
+        self.assertEqual(archive.period_start, datetime(2024, 3, 1, tzinfo=dt_timezone.utc))
+        self.assertEqual(list(AuditEvent.objects.values_list('action', flat=True)), ['RECENT'])
+
+        url = f'/api/v1/audit/archives/{archive.pk}/events'
+        first = self.client.get(url, {'limit': 1})
+        second = self.client.get(url, {'limit': 1, 'cursor': first.headers['X-Next-Cursor']})
+        self.assertEqual([row['id'] for row in first.json() + second.json()], expected)
+        self.assertNotIn('X-Next-Cursor', second.headers)
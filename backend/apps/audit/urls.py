@@ -1,6 +1,9 @@
 from django.urls import path
-from .views import AuditEventsListView
+from .views import AuditArchiveEventsView, AuditArchivesListView, AuditEventsExportView, AuditEventsListView
 
 urlpatterns = [
     path('audit/events', AuditEventsListView.as_view(), name='audit-events-list'),
+    path('audit/events/export', AuditEventsExportView.as_view(), name='audit-events-export'),
+    path('audit/archives', AuditArchivesListView.as_view(), name='audit-archives-list'),
+    path('audit/archives/<int:archive_id>/events', AuditArchiveEventsView.as_view(), name='audit-archive-events'),
 ]
@@ -1,50 +1,271 @@
+import base64
+import binascii
+
 from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from apps.evidence.presign import presign_get_object
 from apps.users.permissions import CanViewAudit
-from .models import AuditEvent
+from apps.evidence.utils import create_audit_event
+from .exports import iter_csv, iter_jsonl_gz
+from .models import AuditArchive, AuditEvent
+from .partitions import iter_archived_events
+
+DEFAULT_PAGE_SIZE = 200
+MAX_PAGE_SIZE = 1000
+EXPORT_FORMATS = {
+    'csv': (iter_csv, 'text/csv', 'csv'),
+    'jsonl': (iter_jsonl_gz, 'application/gzip', 'jsonl.gz'),
+}
+
+
+def encode_cursor(created_at, pk) -> str:
+    raw = f'{created_at.isoformat()}|{pk}'
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor: str):
+    """Return the (created_at, id) position a cursor points at, or None if it is malformed."""
+    try:
+        created_at, pk = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split('|')
+        created_at = parse_datetime(created_at)
+        pk = int(pk)
+    except (binascii.Error, UnicodeError, ValueError):
+        return None
+    if created_at is None:
+        return None
+    return created_at, pk
+
+
+def _parse_bound(value):
+    parsed = parse_datetime(value) if value else None
+    if parsed is not None and timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _page_limit(request):
+    try:
+        limit = int(request.query_params.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        return None
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def _event_payload(pk, created_at, actor, action, entity_type, entity_id) -> dict:
+    return {
+        'id': pk,
+        'created_at': created_at.isoformat() if created_at else None,
+        'actor': actor,
+        'action': action,
+        'entity_type': entity_type,
+        'entity_id': entity_id[:20] + '...' if len(str(entity_id)) > 20 else str(entity_id),
+        'summary': f"{action} {entity_type} {entity_id}",
+    }
+
+
+def _paged_response(data: list, next_cursor: str | None) -> Response:
+    response = Response(data, status=200)
+    if next_cursor:
+        response['X-Next-Cursor'] = next_cursor
+    return response
+
+
+def _filter_events(qs, params):
+    """Apply the audit list filters, newest first; raises ValueError for invalid filters."""
+    action = params.get('action')
+    entity_type = params.get('entity_type')
+    entity_id = params.get('entity_id')
+    actor = params.get('actor')
+    after = params.get('after')
+    before = params.get('before')
+    q = params.get('q')
+
+    # Exact matches so the (entity_type, entity_id) and (actor, created_at) indexes apply.
+    if action:
+        qs = qs.filter(action=action)
+    if entity_type:
+        qs = qs.filter(entity_type=entity_type)
+    if entity_id:
+        qs = qs.filter(entity_id=entity_id)
+    if actor:
+        if not actor.isdigit():
+            raise ValueError('actor must be a user id.')
+        qs = qs.filter(actor_id=int(actor))
+    if after:
+        qs = qs.filter(created_at__gte=after)
+    if before:
+        qs = qs.filter(created_at__lte=before)
+    if q:
+        # Served by the trigram indexes on PostgreSQL when pg_trgm is available.
+        qs = qs.filter(
+            Q(action__icontains=q) |
+            Q(entity_type__icontains=q) |
+            Q(entity_id__icontains=q)
+        )
+    return qs.order_by('-created_at', '-id')
 
 
 class AuditEventsListView(APIView):
-    """GET /api/v1/audit/events - List audit events with filters."""
+    """
+    GET /api/v1/audit/events - List audit events with filters.
+
+    Pages are ordered newest first by (created_at, id). When more events match,
+    the X-Next-Cursor header holds the cursor to pass back as ?cursor= for the
+    next page.
+    """
     permission_classes = [CanViewAudit]
 
     def get(self, request):
-        qs = AuditEvent.objects.select_related('actor').order_by('-created_at')
-        action = request.query_params.get('action')
-        entity_type = request.query_params.get('entity_type')
-        after = request.query_params.get('after')
-        before = request.query_params.get('before')
-        q = request.query_params.get('q')
-
-        if action:
-            qs = qs.filter(action__icontains=action)
-        if entity_type:
-            qs = qs.filter(entity_type__icontains=entity_type)
-        if after:
-            qs = qs.filter(created_at__gte=after)
-        if before:
-            qs = qs.filter(created_at__lte=before)
-        if q:
-            qs = qs.filter(
-                Q(action__icontains=q) |
-                Q(entity_type__icontains=q) |
-                Q(entity_id__icontains=q)
+        cursor = request.query_params.get('cursor')
+        limit = _page_limit(request)
+        if limit is None:
+            return Response({'detail': 'limit must be an integer.'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            qs = _filter_events(AuditEvent.objects.select_related('actor'), request.query_params)
+        except ValueError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        if cursor:
+            position = decode_cursor(cursor)
+            if position is None:
+                return Response({'detail': 'Invalid cursor.'}, status=status.HTTP_400_BAD_REQUEST)
+            created_at, pk = position
+            qs = qs.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+
+        events = list(qs[:limit + 1])
+        next_cursor = None
+        if len(events) > limit:
+            next_cursor = encode_cursor(events[limit - 1].created_at, events[limit - 1].pk)
+        data = [
+            _event_payload(
+                e.pk,
+                e.created_at,
+                e.actor.username if e.actor else None,
+                e.action,
+                e.entity_type,
+                e.entity_id,
             )
+            for e in events[:limit]
+        ]
+        return _paged_response(data, next_cursor)
 
-        # Limit to 200 for performance
-        events = list(qs[:200])
+
+class AuditEventsExportView(APIView):
+    """
+    GET /api/v1/audit/events/export - Stream every matching event as a file.
+
+    Takes the list filters plus export_format=csv (default) or jsonl, which is
+    gzip-compressed. Rows are read from a server-side cursor and streamed as
+    they are fetched, so memory use does not grow with the number of events.
+    """
+    permission_classes = [CanViewAudit]
+
+    def get(self, request):
+        export_format = request.query_params.get('export_format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return Response({'detail': 'export_format must be csv or jsonl.'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            qs = _filter_events(AuditEvent.objects.all(), request.query_params)
+        except ValueError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        stream, content_type, extension = EXPORT_FORMATS[export_format]
+        filename = f"audit-events-{timezone.now():%Y%m%d-%H%M%S}.{extension}"
+        create_audit_event(
+            request=request,
+            action='AUDIT_EXPORTED',
+            entity_type='AuditEvent',
+            entity_id=filename,
+            after_json={
+                'export_format': export_format,
+                'filters': {key: value for key, value in request.query_params.items() if key != 'export_format'},
+            },
+        )
+        response = StreamingHttpResponse(stream(qs), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+class AuditArchivesListView(APIView):
+    """GET /api/v1/audit/archives - Months of audit events moved to object storage."""
+    permission_classes = [CanViewAudit]
+
+    def get(self, request):
         data = [
             {
-                'id': e.pk,
-                'created_at': e.created_at.isoformat() if e.created_at else None,
-                'actor': e.actor.username if e.actor else None,
-                'action': e.action,
-                'entity_type': e.entity_type,
-                'entity_id': e.entity_id[:20] + '...' if len(str(e.entity_id)) > 20 else str(e.entity_id),
-                'summary': f"{e.action} {e.entity_type} {e.entity_id}",
+                'id': archive.pk,
+                'period_start': archive.period_start.isoformat(),
+                'period_end': archive.period_end.isoformat(),
+                'row_count': archive.row_count,
+                'size_bytes': archive.size_bytes,
+                'sha256': archive.sha256,
+                'download_url': presign_get_object(archive.bucket, archive.object_key),
             }
-            for e in events
+            for archive in AuditArchive.objects.all()
         ]
         return Response(data, status=200)
+
+
+class AuditArchiveEventsView(APIView):
+    """
+    GET /api/v1/audit/archives/<id>/events - Query an archived month.
+
+    Accepts the same filters, limit and cursor as the live event list. The
+    archive is read from storage and filtered on the fly.
+    """
+    permission_classes = [CanViewAudit]
+
+    def get(self, request, archive_id):
+        archive = get_object_or_404(AuditArchive, pk=archive_id)
+        limit = _page_limit(request)
+        if limit is None:
+            return Response({'detail': 'limit must be an integer.'}, status=status.HTTP_400_BAD_REQUEST)
+        exact = {
+            field: request.query_params.get(field)
+            for field in ('action', 'entity_type', 'entity_id')
+            if request.query_params.get(field)
+        }
+        actor = request.query_params.get('actor')
+        if actor and not actor.isdigit():
+            return Response({'detail': 'actor must be a user id.'}, status=status.HTTP_400_BAD_REQUEST)
+        after = _parse_bound(request.query_params.get('after'))
+        before = _parse_bound(request.query_params.get('before'))
+        q = (request.query_params.get('q') or '').upper()
+        position = None
+        if request.query_params.get('cursor'):
+            position = decode_cursor(request.query_params['cursor'])
+            if position is None:
+                return Response({'detail': 'Invalid cursor.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows = []
+        # Archives are written newest first, matching the live list's order.
+        for row in iter_archived_events(archive):
+            created_at = parse_datetime(row['created_at'])
+            if position is not None and (created_at, row['id']) >= position:
+                continue
+            if any(row[field] != value for field, value in exact.items()):
+                continue
+            if actor and row['actor_id'] != int(actor):
+                continue
+            if (after and created_at < after) or (before and created_at > before):
+                continue
+            if q and not any(q in row[field].upper() for field in ('action', 'entity_type', 'entity_id')):
+                continue
+            rows.append((created_at, row))
+            if len(rows) > limit:
+                break
+
+        next_cursor = None
+        if len(rows) > limit:
+            next_cursor = encode_cursor(rows[limit - 1][0], rows[limit - 1][1]['id'])
+        data = [
+            _event_payload(row['id'], created_at, row['actor'], row['action'], row['entity_type'], row['entity_id'])
+            for created_at, row in rows[:limit]
+        ]
+        return _paged_response(data, next_cursor)
@@ -1,6 +1,14 @@
 from django.contrib import admin
 
-from apps.compliance.models import ComplianceAlert, ControlNote, ControlStatusCache, ControlVerification, EvidenceRule, ExportJob
+from apps.compliance.models import (
+    ComplianceAlert,
+    ControlNote,
+    ControlStatusCache,
+    ControlVerification,
+    EvidenceRule,
+    ExportJob,
+    StatusRollup,
+)
 
 
 @admin.register(EvidenceRule)
@@ -17,6 +25,12 @@ class ControlStatusCacheAdmin(admin.ModelAdmin):
     search_fields = ('control__control_code',)
 
 
+@admin.register(StatusRollup)
+class StatusRollupAdmin(admin.ModelAdmin):
+    list_display = ('standard_pack', 'section_code', 'total', 'not_started', 'in_progress', 'ready', 'verified', 'overdue', 'last_computed_at')
+    list_filter = ('standard_pack',)
+
+
 @admin.register(ControlVerification)
 class ControlVerificationAdmin(admin.ModelAdmin):
     list_display = ('id', 'control', 'status', 'verified_by', 'verified_at', 'evidence_snapshot_at')
@@ -1,30 +1,25 @@
+from collections import defaultdict
 from datetime import timedelta
-from typing import Any
+from typing import Any, Iterable
 
-from django.db.models import Max, Q, QuerySet
+from django.db import transaction
+from django.db.models import Max, QuerySet
 from django.utils import timezone
 
+from apps.compliance import rollups
 from apps.compliance.models import ComplianceAlert, ControlStatusCache, ControlVerification, EvidenceRule
+from apps.compliance.response_cache import bump_pack_versions
+from apps.compliance.rule_index import CompiledRule, get_rule_index
+from apps.compliance.rule_kernel import EvidenceColumns, evaluate_rules
 from apps.evidence.models import ControlEvidenceLink, EvidenceItem
 from apps.standards.models import Control
 
+BULK_CHUNK_SIZE = 500
+NEAR_DUE_WINDOW_DAYS = 14
 
-def get_section_code_from_control(control_code: str) -> str:
-    parts = (control_code or '').split('-')
-    if len(parts) == 3 and parts[0] and parts[1] and parts[2]:
-        return parts[1]
-    return 'UNK'
 
-
-def fetch_applicable_rules(control: Control) -> QuerySet[EvidenceRule]:
-    section_code = get_section_code_from_control(control.control_code)
-    return EvidenceRule.objects.filter(
-        standard_pack=control.standard_pack,
-        enabled=True,
-    ).filter(
-        Q(scope_type=EvidenceRule.SCOPE_CONTROL, control=control)
-        | Q(scope_type=EvidenceRule.SCOPE_SECTION, section_code=section_code)
-    )
+def fetch_applicable_rules(control: Control) -> tuple[CompiledRule, ...]:
+    return get_rule_index(control.standard_pack_id).rules_for(control.pk, control.section_code)
 
 
 def fetch_linked_evidence(control: Control) -> QuerySet[EvidenceItem]:
@@ -37,7 +32,7 @@ def fetch_linked_evidence(control: Control) -> QuerySet[EvidenceItem]:
     )
 
 
-def evaluate_rule(rule: EvidenceRule, evidence_items, today) -> dict[str, Any]:
+def evaluate_rule(rule: CompiledRule, evidence_items, today) -> dict[str, Any]:
     matched = list(evidence_items)
 
     if rule.acceptable_categories:
@@ -97,20 +92,32 @@ def evaluate_rule(rule: EvidenceRule, evidence_items, today) -> dict[str, Any]:
     return result
 
 
-def compute_control_status(control: Control) -> dict[str, Any]:
-    today = timezone.localdate()
-    rules = list(fetch_applicable_rules(control))
-    evidence_items = list(fetch_linked_evidence(control))
-
-    last_evidence_date = max((ev.event_date for ev in evidence_items), default=None)
-    latest_linked_at = (
-        ControlEvidenceLink.objects
-        .filter(control=control)
-        .aggregate(max_linked_at=Max('linked_at'))
-        .get('max_linked_at')
+def _is_verification_fresh(latest_verified, latest_linked_at) -> bool:
+    return bool(
+        latest_verified
+        and (
+            latest_linked_at is None
+            or (
+                latest_verified.evidence_snapshot_at is not None
+                and latest_verified.evidence_snapshot_at >= latest_linked_at
+            )
+        )
     )
 
-    rule_results = [evaluate_rule(rule, evidence_items, today) for rule in rules]
+
+def build_status_result(
+    control: Control,
+    rules,
+    evidence_items,
+    latest_linked_at,
+    latest_verified,
+    today,
+    rule_results: list[dict[str, Any]] | None = None,
+) -> dict[str, Any]:
+    last_evidence_date = max((ev.event_date for ev in evidence_items), default=None)
+    if rule_results is None:
+        rule_results = [evaluate_rule(rule, evidence_items, today) for rule in rules]
+    verification_fresh = _is_verification_fresh(latest_verified, latest_linked_at)
 
     if not evidence_items:
         computed_status = 'NOT_STARTED'
@@ -125,22 +132,6 @@ def compute_control_status(control: Control) -> dict[str, Any]:
             computed_status = 'OVERDUE'
         elif all_satisfied:
             if any(rule.requires_verification for rule in rules):
-                latest_verified = (
-                    ControlVerification.objects
-                    .filter(control=control, status=ControlVerification.STATUS_VERIFIED)
-                    .order_by('-verified_at')
-                    .first()
-                )
-                verification_fresh = bool(
-                    latest_verified
-                    and (
-                        latest_linked_at is None
-                        or (
-                            latest_verified.evidence_snapshot_at is not None
-                            and latest_verified.evidence_snapshot_at >= latest_linked_at
-                        )
-                    )
-                )
                 computed_status = 'VERIFIED' if verification_fresh else 'READY'
             else:
                 computed_status = 'READY'
@@ -150,25 +141,8 @@ def compute_control_status(control: Control) -> dict[str, Any]:
     due_dates = [rr['due_date'] for rr in rule_results if rr.get('due_date') is not None]
     next_due_date = min(due_dates) if due_dates else None
 
-    latest_verified = (
-        ControlVerification.objects
-        .filter(control=control, status=ControlVerification.STATUS_VERIFIED)
-        .order_by('-verified_at')
-        .first()
-    )
-    verification_fresh = bool(
-        latest_verified
-        and (
-            latest_linked_at is None
-            or (
-                latest_verified.evidence_snapshot_at is not None
-                and latest_verified.evidence_snapshot_at >= latest_linked_at
-            )
-        )
-    )
-
     details_json = {
-        'section_code': get_section_code_from_control(control.control_code),
+        'section_code': control.section_code,
         'last_evidence_date': last_evidence_date.isoformat() if last_evidence_date else None,
         'next_due_date': next_due_date.isoformat() if next_due_date else None,
         'rule_results': [
@@ -185,6 +159,7 @@ def compute_control_status(control: Control) -> dict[str, Any]:
 
     return {
         'control_id': control.id,
+        'standard_pack_id': control.standard_pack_id,
         'computed_status': computed_status,
         'last_evidence_date': last_evidence_date,
         'next_due_date': next_due_date,
@@ -192,27 +167,117 @@ def compute_control_status(control: Control) -> dict[str, Any]:
     }
 
 
+def compute_control_status(control: Control) -> dict[str, Any]:
+    today = timezone.localdate()
+    rules = list(fetch_applicable_rules(control))
+    evidence_items = list(fetch_linked_evidence(control))
+    latest_linked_at = (
+        ControlEvidenceLink.objects
+        .filter(control=control)
+        .aggregate(max_linked_at=Max('linked_at'))
+        .get('max_linked_at')
+    )
+    latest_verified = (
+        ControlVerification.objects
+        .filter(control=control, status=ControlVerification.STATUS_VERIFIED)
+        .order_by('-verified_at')
+        .first()
+    )
+    return build_status_result(control, rules, evidence_items, latest_linked_at, latest_verified, today)
+
+
+def _chunked(values: list, size: int):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def compute_control_statuses(controls: Iterable[Control], chunk_size: int = BULK_CHUNK_SIZE) -> dict[int, dict[str, Any]]:
+    """
+    Evaluate many controls with a fixed number of queries per chunk of controls.
+
+    Returns a mapping of control id to the same result dict that
+    compute_control_status() produces for that control.
+    """
+    controls = list(controls)
+    if not controls:
+        return {}
+
+    today = timezone.localdate()
+    pack_ids = {control.standard_pack_id for control in controls}
+
+    rule_indexes = {pack_id: get_rule_index(pack_id) for pack_id in pack_ids}
+
+    evidence_by_control = defaultdict(list)
+    latest_linked_by_control = {}
+    latest_verified_by_control = {}
+    control_ids = [control.id for control in controls]
+    for id_chunk in _chunked(control_ids, chunk_size):
+        links = (
+            ControlEvidenceLink.objects
+            .filter(control_id__in=id_chunk)
+            .select_related('evidence_item')
+            .order_by('-evidence_item__event_date', '-evidence_item__created_at')
+        )
+        for link in links:
+            evidence_by_control[link.control_id].append(link.evidence_item)
+            current = latest_linked_by_control.get(link.control_id)
+            if current is None or link.linked_at > current:
+                latest_linked_by_control[link.control_id] = link.linked_at
+
+        verifications = (
+            ControlVerification.objects
+            .filter(control_id__in=id_chunk, status=ControlVerification.STATUS_VERIFIED)
+            .only('id', 'control_id', 'verified_at', 'evidence_snapshot_at')
+            .order_by('control_id', '-verified_at')
+        )
+        for verification in verifications:
+            latest_verified_by_control.setdefault(verification.control_id, verification)
+
+    # Rules are evaluated on columnar copies of the evidence; see rule_kernel.
+    columns = EvidenceColumns()
+    results = {}
+    for control in controls:
+        rules = rule_indexes[control.standard_pack_id].rules_for(control.id, control.section_code)
+        evidence_items = evidence_by_control.get(control.id, [])
+        slot = columns.add(evidence_items)
+        results[control.id] = build_status_result(
+            control,
+            rules,
+            evidence_items,
+            latest_linked_by_control.get(control.id),
+            latest_verified_by_control.get(control.id),
+            today,
+            rule_results=evaluate_rules(columns, slot, rules, today),
+        )
+    return results
+
+
+def _alert_flags(computed_status: str, next_due_date, today) -> tuple[bool, bool]:
+    near_due_cutoff = today + timedelta(days=NEAR_DUE_WINDOW_DAYS)
+    is_overdue = computed_status == 'OVERDUE'
+    is_near_due = bool(
+        next_due_date is not None
+        and today <= next_due_date <= near_due_cutoff
+        and not is_overdue
+    )
+    return is_overdue, is_near_due
+
+
 def sync_alerts(control: Control, computed_status: str, next_due_date) -> None:
     now = timezone.now()
-    today = timezone.localdate()
-    near_due_cutoff = today + timedelta(days=14)
+    is_overdue, is_near_due = _alert_flags(computed_status, next_due_date, timezone.localdate())
 
     active_overdue = ComplianceAlert.objects.filter(
         control=control,
         alert_type=ComplianceAlert.TYPE_OVERDUE,
         cleared_at__isnull=True,
     )
-    if computed_status == 'OVERDUE':
+    if is_overdue:
         if not active_overdue.exists():
             ComplianceAlert.objects.create(control=control, alert_type=ComplianceAlert.TYPE_OVERDUE)
     else:
         active_overdue.update(cleared_at=now)
 
-    is_near_due = bool(
-        next_due_date is not None
-        and today <= next_due_date <= near_due_cutoff
-        and computed_status != 'OVERDUE'
-    )
     active_near_due = ComplianceAlert.objects.filter(
         control=control,
         alert_type=ComplianceAlert.TYPE_NEAR_DUE,
@@ -225,20 +290,109 @@ def sync_alerts(control: Control, computed_status: str, next_due_date) -> None:
         active_near_due.update(cleared_at=now)
 
 
+def sync_alerts_bulk(computed_results: list[dict[str, Any]]) -> None:
+    """Open and clear OVERDUE/NEAR_DUE alerts for many controls with set-based writes."""
+    if not computed_results:
+        return
+
+    now = timezone.now()
+    today = timezone.localdate()
+    wanted = {ComplianceAlert.TYPE_OVERDUE: set(), ComplianceAlert.TYPE_NEAR_DUE: set()}
+    for computed in computed_results:
+        is_overdue, is_near_due = _alert_flags(computed['computed_status'], computed['next_due_date'], today)
+        if is_overdue:
+            wanted[ComplianceAlert.TYPE_OVERDUE].add(computed['control_id'])
+        if is_near_due:
+            wanted[ComplianceAlert.TYPE_NEAR_DUE].add(computed['control_id'])
+
+    control_ids = [computed['control_id'] for computed in computed_results]
+    active = {ComplianceAlert.TYPE_OVERDUE: set(), ComplianceAlert.TYPE_NEAR_DUE: set()}
+    for control_id, alert_type in (
+        ComplianceAlert.objects
+        .filter(control_id__in=control_ids, cleared_at__isnull=True)
+        .order_by()
+        .values_list('control_id', 'alert_type')
+    ):
+        active.setdefault(alert_type, set()).add(control_id)
+
+    new_alerts = []
+    for alert_type, wanted_ids in wanted.items():
+        to_clear = active.get(alert_type, set()) - wanted_ids
+        if to_clear:
+            ComplianceAlert.objects.filter(
+                control_id__in=to_clear,
+                alert_type=alert_type,
+                cleared_at__isnull=True,
+            ).update(cleared_at=now)
+        new_alerts.extend(
+            ComplianceAlert(control_id=control_id, alert_type=alert_type)
+            for control_id in sorted(wanted_ids - active.get(alert_type, set()))
+        )
+    if new_alerts:
+        ComplianceAlert.objects.bulk_create(new_alerts)
+
+
 def recompute_and_persist(control: Control, computed: dict[str, Any] | None = None) -> ControlStatusCache:
     computed = computed or compute_control_status(control)
-    cache, _created = ControlStatusCache.objects.update_or_create(
-        control=control,
-        defaults={
-            'computed_status': computed['computed_status'],
-            'last_evidence_date': computed['last_evidence_date'],
-            'next_due_date': computed['next_due_date'],
-            'details_json': computed['details_json'],
-        },
-    )
+    with transaction.atomic(savepoint=False):
+        previous = rollups.snapshot_statuses([control.pk])
+        cache, _created = ControlStatusCache.objects.update_or_create(
+            control=control,
+            defaults={
+                'computed_status': computed['computed_status'],
+                'last_evidence_date': computed['last_evidence_date'],
+                'next_due_date': computed['next_due_date'],
+                'details_json': computed['details_json'],
+            },
+        )
+        rollups.apply_status_changes(previous, {control.pk: cache.computed_status})
     sync_alerts(
         control=control,
         computed_status=cache.computed_status,
         next_due_date=cache.next_due_date,
     )
+    bump_pack_versions([control.standard_pack_id])
     return cache
+
+
+def persist_computed_statuses(
+    computed_results: Iterable[dict[str, Any]],
+    chunk_size: int = BULK_CHUNK_SIZE,
+) -> list[ControlStatusCache]:
+    """
+    Write many computed results to ControlStatusCache and sync their alerts.
+
+    Each chunk costs one upsert for the caches plus a constant number of
+    alert queries, independent of how many controls it holds.
+    """
+    # One row per control: Postgres rejects an upsert that touches the same row twice.
+    unique_results = list({computed['control_id']: computed for computed in computed_results}.values())
+    caches = []
+    for chunk in _chunked(unique_results, chunk_size):
+        # No savepoint: this only needs the rollup locks held until the caches are written.
+        with transaction.atomic(savepoint=False):
+            previous = rollups.snapshot_statuses(computed['control_id'] for computed in chunk)
+            caches.extend(
+                ControlStatusCache.objects.bulk_create(
+                    [
+                        ControlStatusCache(
+                            control_id=computed['control_id'],
+                            computed_status=computed['computed_status'],
+                            last_evidence_date=computed['last_evidence_date'],
+                            next_due_date=computed['next_due_date'],
+                            details_json=computed['details_json'],
+                        )
+                        for computed in chunk
+                    ],
+                    update_conflicts=True,
+                    unique_fields=['control'],
+                    update_fields=['computed_status', 'last_evidence_date', 'next_due_date', 'computed_at', 'details_json'],
+                )
+            )
+            rollups.apply_status_changes(
+                previous,
+                {computed['control_id']: computed['computed_status'] for computed in chunk},
+            )
+        sync_alerts_bulk(chunk)
+    bump_pack_versions({computed['standard_pack_id'] for computed in unique_results})
+    return caches
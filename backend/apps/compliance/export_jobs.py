@@ -0,0 +1,302 @@
+import hashlib
+import json
+import tempfile
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Max, Q
+from django.utils import timezone
+
+from apps.compliance.export_service import write_controls_pdf
+from apps.compliance.models import ControlVerification, EvidenceRule, ExportJob
+from apps.compliance.serializers import ExportJobSerializer
+from apps.evidence.models import ControlEvidenceLink
+from apps.evidence.storage import HashingWriter, get_s3_client
+from apps.evidence.utils import create_audit_event
+from apps.standards.models import Control, StandardPack
+
+# Running jobs refresh heartbeat_at at least this often, so --stale-after in
+# run_export_worker must be comfortably longer.
+HEARTBEAT_INTERVAL_SECONDS = 30
+
+
+def _ensure_bucket_exists(s3_client, bucket_name: str):
+    try:
+        s3_client.head_bucket(Bucket=bucket_name)
+    except Exception:
+        s3_client.create_bucket(Bucket=bucket_name)
+
+
+def section_controls(pack: StandardPack, section_code: str):
+    return pack.controls.filter(section_code=section_code).order_by('sort_order')
+
+
+def _controls_queryset(job_type: str, pack: StandardPack, control: Control | None, section_code: str | None):
+    if job_type == ExportJob.JOB_CONTROL_PDF:
+        return Control.objects.filter(pk=control.pk)
+    if job_type == ExportJob.JOB_SECTION_PACK:
+        return section_controls(pack, section_code)
+    return pack.controls.order_by('sort_order')
+
+
+def compute_export_fingerprint(
+    job_type: str,
+    pack: StandardPack,
+    control: Control | None = None,
+    section_code: str | None = None,
+) -> str:
+    """
+    Hash everything an export PDF is rendered from.
+
+    Statuses are date dependent, so the fingerprint also changes every day.
+    """
+    controls = _controls_queryset(job_type, pack, control, section_code)
+    control_ids = controls.values('id')
+    links = ControlEvidenceLink.objects.filter(control_id__in=control_ids).aggregate(
+        count=Count('id'),
+        latest_linked_at=Max('linked_at'),
+        latest_evidence_update=Max('evidence_item__updated_at'),
+    )
+    verifications = ControlVerification.objects.filter(control_id__in=control_ids).aggregate(
+        count=Count('id'),
+        latest_verified_at=Max('verified_at'),
+    )
+    state = {
+        'job_type': job_type,
+        'pack': [pack.id, pack.authority_code, pack.name, pack.version],
+        'section_code': section_code,
+        'controls': list(controls.values_list('id', 'updated_at')),
+        'links': links,
+        'verifications': verifications,
+        'rules': list(
+            EvidenceRule.objects.filter(standard_pack=pack).order_by('id').values_list('id', 'updated_at')
+        ),
+        'date': timezone.localdate(),
+    }
+    return hashlib.sha256(json.dumps(state, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def _reuse_export_job(request, source: ExportJob) -> ExportJob:
+    now = timezone.now()
+    job = ExportJob.objects.create(
+        job_type=source.job_type,
+        status=ExportJob.STATUS_COMPLETED,
+        standard_pack_id=source.standard_pack_id,
+        control_id=source.control_id,
+        section_code=source.section_code,
+        filters_json=source.filters_json,
+        created_by=(request.user if request.user.is_authenticated else None),
+        started_at=now,
+        completed_at=now,
+        progress=100,
+        bucket=source.bucket,
+        object_key=source.object_key,
+        filename=source.filename,
+        size_bytes=source.size_bytes,
+        sha256=source.sha256,
+        fingerprint=source.fingerprint,
+    )
+    create_audit_event(
+        request=request,
+        action='EXPORT_REUSED',
+        entity_type='ExportJob',
+        entity_id=job.id,
+        before_json=ExportJobSerializer(source).data,
+        after_json=ExportJobSerializer(job).data,
+    )
+    return job
+
+
+def enqueue_export_job(
+    request,
+    job_type: str,
+    pack: StandardPack,
+    control: Control | None = None,
+    section_code: str | None = None,
+    force: bool = False,
+) -> ExportJob:
+    """
+    Queue an export, or return a completed copy of an earlier export rendered from identical state.
+
+    force=True always renders a fresh PDF.
+    """
+    fingerprint = compute_export_fingerprint(job_type, pack, control=control, section_code=section_code)
+    if not force:
+        cached = (
+            ExportJob.objects
+            .filter(fingerprint=fingerprint, status=ExportJob.STATUS_COMPLETED)
+            .order_by('-completed_at')
+            .first()
+        )
+        if cached is not None:
+            return _reuse_export_job(request, cached)
+
+    job_id = uuid.uuid4()
+    base_key = f'exports/{pack.authority_code}/{pack.version}'
+    if job_type == ExportJob.JOB_CONTROL_PDF:
+        object_key = f'{base_key}/controls/{control.control_code}/{job_id}.pdf'
+        filename = f'{control.control_code}-evidence-pack.pdf'
+    elif job_type == ExportJob.JOB_SECTION_PACK:
+        object_key = f'{base_key}/sections/{section_code}/{job_id}.pdf'
+        filename = f'{pack.authority_code}-{pack.version}-section-{section_code}.pdf'
+    else:
+        object_key = f'{base_key}/full/{job_id}.pdf'
+        filename = f'{pack.authority_code}-{pack.version}-full-pack.pdf'
+
+    job = ExportJob.objects.create(
+        id=job_id,
+        job_type=job_type,
+        status=ExportJob.STATUS_QUEUED,
+        standard_pack=pack,
+        control=control,
+        section_code=section_code,
+        filters_json={'section_code': section_code} if section_code else {},
+        created_by=(request.user if request.user.is_authenticated else None),
+        bucket=getattr(settings, 'MINIO_BUCKET_EXPORTS', 'exports'),
+        object_key=object_key,
+        filename=filename,
+        fingerprint=fingerprint,
+    )
+    create_audit_event(
+        request=request,
+        action='EXPORT_QUEUED',
+        entity_type='ExportJob',
+        entity_id=job.id,
+        after_json=ExportJobSerializer(job).data,
+    )
+    return job
+
+
+def claim_next_export_job() -> ExportJob | None:
+    """Move the oldest queued job to RUNNING; concurrent workers skip rows another worker holds."""
+    with transaction.atomic():
+        job = (
+            ExportJob.objects
+            .select_for_update(skip_locked=True)
+            .filter(status=ExportJob.STATUS_QUEUED)
+            .order_by('created_at')
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = ExportJob.STATUS_RUNNING
+        job.started_at = job.heartbeat_at = timezone.now()
+        job.attempts = F('attempts') + 1
+        job.progress = 0
+        job.save(update_fields=['status', 'started_at', 'heartbeat_at', 'attempts', 'progress'])
+    job.refresh_from_db()
+    return job
+
+
+def requeue_stale_export_jobs(stale_after_seconds: int, max_attempts: int = 3) -> tuple[int, int]:
+    """
+    Deal with RUNNING jobs whose worker has not reported in for stale_after_seconds.
+
+    Jobs with attempts left go back on the queue; the rest are marked FAILED,
+    so a job that keeps killing its worker stops being retried. Returns
+    (requeued, failed).
+    """
+    cutoff = timezone.now() - timedelta(seconds=stale_after_seconds)
+    stale = ExportJob.objects.filter(status=ExportJob.STATUS_RUNNING).filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff)
+    )
+    failed = stale.filter(attempts__gte=max_attempts).update(
+        status=ExportJob.STATUS_FAILED,
+        completed_at=timezone.now(),
+        error_text='Worker stopped responding on the last attempt',
+    )
+    requeued = stale.update(status=ExportJob.STATUS_QUEUED, error_text='Requeued after worker timeout')
+    return requeued, failed
+
+
+def _controls_for_job(job: ExportJob) -> tuple[list[Control], str]:
+    pack = job.standard_pack
+    controls = list(_controls_queryset(job.job_type, pack, job.control, job.section_code))
+    if job.job_type == ExportJob.JOB_CONTROL_PDF:
+        return controls, f'Control Pack - {job.control.control_code}'
+    if job.job_type == ExportJob.JOB_SECTION_PACK:
+        return controls, f'Section Pack - {job.section_code}'
+    return controls, f'Full Pack - {pack.authority_code} {pack.version}'
+
+
+def _heartbeat(job: ExportJob):
+    ExportJob.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now())
+
+
+def _progress_reporter(job: ExportJob):
+    last_reported = {'value': 0, 'at': time.monotonic()}
+
+    def report(done: int, total: int):
+        # 100 is left for run_export_job once the upload has finished.
+        value = min(int(done * 100 / total) if total else 99, 99)
+        # Throttle writes so large packs do not issue one UPDATE per control,
+        # but keep the heartbeat fresh while a slow step holds progress still.
+        advanced = value - last_reported['value'] >= 5 or (value == 99 and last_reported['value'] < 99)
+        if advanced or time.monotonic() - last_reported['at'] >= HEARTBEAT_INTERVAL_SECONDS:
+            last_reported.update(value=value, at=time.monotonic())
+            ExportJob.objects.filter(pk=job.pk).update(progress=value, heartbeat_at=timezone.now())
+
+    return report
+
+
+def run_export_job(job: ExportJob, max_attempts: int = 3) -> ExportJob:
+    """Render and upload a claimed job; failed attempts go back on the queue until max_attempts."""
+    try:
+        controls, title = _controls_for_job(job)
+        if not controls:
+            raise ValueError('No controls found for export')
+        # Fingerprint the state actually rendered; it may have moved on since the job was queued.
+        job.fingerprint = compute_export_fingerprint(job.job_type, job.standard_pack, job.control, job.section_code)
+        s3_client = get_s3_client()
+        _ensure_bucket_exists(s3_client, job.bucket)
+        # Spool to disk and hash while writing; upload_fileobj then streams the
+        # file to storage in multipart chunks instead of from an in-memory copy.
+        with tempfile.TemporaryFile(suffix='.pdf') as spool:
+            output = HashingWriter(spool)
+            write_controls_pdf(
+                output,
+                pack=job.standard_pack,
+                controls=controls,
+                title=title,
+                section_code=(job.section_code if job.job_type == ExportJob.JOB_SECTION_PACK else None),
+                progress_callback=_progress_reporter(job),
+            )
+            spool.seek(0)
+            _heartbeat(job)
+            s3_client.upload_fileobj(
+                spool,
+                job.bucket,
+                job.object_key,
+                ExtraArgs={'ContentType': 'application/pdf'},
+            )
+    except Exception as exc:
+        job.error_text = str(exc)
+        if job.attempts < max_attempts:
+            job.status = ExportJob.STATUS_QUEUED
+            job.save(update_fields=['status', 'error_text'])
+        else:
+            job.status = ExportJob.STATUS_FAILED
+            job.completed_at = timezone.now()
+            job.save(update_fields=['status', 'error_text', 'completed_at'])
+        return job
+
+    job.status = ExportJob.STATUS_COMPLETED
+    job.completed_at = timezone.now()
+    job.progress = 100
+    job.sha256 = output.sha256
+    job.size_bytes = output.size
+    job.error_text = None
+    job.save(update_fields=['status', 'completed_at', 'progress', 'sha256', 'size_bytes', 'error_text', 'fingerprint'])
+
+    create_audit_event(
+        request=None,
+        actor=job.created_by,
+        action='EXPORT_CREATED',
+        entity_type='ExportJob',
+        entity_id=job.id,
+        after_json=ExportJobSerializer(job).data,
+    )
+    return job
@@ -1,45 +1,62 @@
 import io
+import multiprocessing
+import os
+import tempfile
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
+from typing import Callable
 
+import django
+from django.conf import settings
 from django.utils import timezone
+from pypdf import PdfReader
+from pypdf.generic import (
+    ArrayObject,
+    DecodedStreamObject,
+    DictionaryObject,
+    IndirectObject,
+    NameObject,
+    PdfObject,
+    StreamObject,
+)
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
 from reportlab.lib.units import mm
-from reportlab.pdfgen import canvas
+from reportlab.pdfbase import pdfmetrics
 from reportlab.platypus import PageBreak, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
 
-from apps.compliance.engine import compute_control_status, fetch_linked_evidence, recompute_and_persist
+from apps.compliance.engine import BULK_CHUNK_SIZE, compute_control_statuses, persist_computed_statuses
+from apps.compliance.models import ControlVerification
+from apps.evidence.models import ControlEvidenceLink
 from apps.standards.models import Control, StandardPack
 
+# Progress units for rendering one control, against one for loading its snapshot.
+RENDER_PROGRESS_WEIGHT = 4
 
-class NumberedFooterCanvas(canvas.Canvas):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self._saved_page_states = []
 
-    def showPage(self):
-        self._saved_page_states.append(dict(self.__dict__))
-        self._startPage()
+FOOTER_FONT_SIZE = 9
 
-    def save(self):
-        page_count = len(self._saved_page_states)
-        for state in self._saved_page_states:
-            self.__dict__.update(state)
-            self.draw_footer(page_count)
-            super().showPage()
-        super().save()
 
-    def draw_footer(self, page_count):
-        self.setFont('Helvetica', 9)
-        self.setFillColor(colors.grey)
-        self.drawString(16 * mm, 10 * mm, 'Generated by AccrediVault')
-        self.drawRightString(195 * mm, 10 * mm, f'Page {self._pageNumber} of {page_count}')
+def _footer_content(page_number: int, page_count: int) -> bytes:
+    """Content stream drawing the page footer in the footer font resource /AVFooter."""
+    label = f'Page {page_number} of {page_count}'
+    right_x = 195 * mm - pdfmetrics.stringWidth(label, 'Helvetica', FOOTER_FONT_SIZE)
+    fill = ' '.join(f'{value:.3f}' for value in colors.grey.rgb())
+    return (
+        f'q {fill} rg '
+        f'BT /AVFooter {FOOTER_FONT_SIZE} Tf {16 * mm:.2f} {10 * mm:.2f} Td (Generated by AccrediVault) Tj ET '
+        f'BT /AVFooter {FOOTER_FONT_SIZE} Tf {right_x:.2f} {10 * mm:.2f} Td ({label}) Tj ET Q'
+    ).encode()
 
 
 @dataclass
 class ControlSnapshot:
-    control: Control
+    # Plain values only: snapshots are pickled to render worker processes.
+    control_id: int
+    control_code: str
+    indicator: str
     computed_status: str
     last_evidence_date: str | None
     next_due_date: str | None
@@ -96,39 +113,60 @@ def _status_fill(status_name: str):
     return colors.HexColor('#F1F5F9')
 
 
-def _verification_state_for(control: Control) -> str:
-    latest = control.verifications.order_by('-verified_at').first()
-    if latest is None:
-        return 'NOT_VERIFIED'
-    return latest.status
+def build_control_snapshots(controls: list[Control]) -> list[ControlSnapshot]:
+    """Recompute statuses and load evidence and verification state for many controls in batched queries."""
+    controls = list(controls)
+    caches = {
+        cache.control_id: cache
+        for cache in persist_computed_statuses(compute_control_statuses(controls).values())
+    }
+
+    evidence_rows = defaultdict(list)
+    verification_states = {}
+    control_ids = [control.id for control in controls]
+    for start in range(0, len(control_ids), BULK_CHUNK_SIZE):
+        id_chunk = control_ids[start:start + BULK_CHUNK_SIZE]
+        links = (
+            ControlEvidenceLink.objects
+            .filter(control_id__in=id_chunk)
+            .select_related('evidence_item')
+            .order_by('-evidence_item__event_date', '-evidence_item__created_at')
+        )
+        for link in links:
+            ev = link.evidence_item
+            evidence_rows[link.control_id].append([
+                _safe_text(ev.title),
+                _safe_text(ev.category),
+                _safe_text(ev.event_date),
+                _safe_text(ev.valid_until),
+            ])
+
+        verifications = (
+            ControlVerification.objects
+            .filter(control_id__in=id_chunk)
+            .order_by('control_id', '-verified_at')
+            .values_list('control_id', 'status')
+        )
+        for control_id, verification_status in verifications:
+            verification_states.setdefault(control_id, verification_status)
+
+    return [
+        ControlSnapshot(
+            control_id=control.id,
+            control_code=control.control_code,
+            indicator=control.indicator,
+            computed_status=caches[control.id].computed_status,
+            last_evidence_date=_safe_text(caches[control.id].last_evidence_date),
+            next_due_date=_safe_text(caches[control.id].next_due_date),
+            verification_state=verification_states.get(control.id, 'NOT_VERIFIED'),
+            evidence_rows=evidence_rows.get(control.id, []),
+        )
+        for control in controls
+    ]
 
 
 def build_control_snapshot(control: Control) -> ControlSnapshot:
-    cache = getattr(control, 'status_cache', None)
-    if cache is None:
-        cache = recompute_and_persist(control)
-    else:
-        computed = compute_control_status(control)
-        cache = recompute_and_persist(control, computed=computed)
-
-    evidence_items = fetch_linked_evidence(control)
-    evidence_rows = []
-    for ev in evidence_items:
-        evidence_rows.append([
-            _safe_text(ev.title),
-            _safe_text(ev.category),
-            _safe_text(ev.event_date),
-            _safe_text(ev.valid_until),
-        ])
-
-    return ControlSnapshot(
-        control=control,
-        computed_status=cache.computed_status,
-        last_evidence_date=_safe_text(cache.last_evidence_date),
-        next_due_date=_safe_text(cache.next_due_date),
-        verification_state=_verification_state_for(control),
-        evidence_rows=evidence_rows,
-    )
+    return build_control_snapshots([control])[0]
 
 
 def _add_cover_page(story, pack: StandardPack, title: str, styles):
@@ -226,13 +264,15 @@ def _add_section_summary_page(story, section_code: str, snapshots: list[ControlS
 
 def _add_control_pages(story, snapshots: list[ControlSnapshot], styles):
     for index, item in enumerate(snapshots):
-        control = item.control
-        story.append(Paragraph(f'Control: {_safe_text(control.control_code)}', ParagraphStyle('ControlTitle', parent=styles['Heading3'], textColor=colors.HexColor('#0F172A'))))
+        heading = Paragraph(f'Control: {_safe_text(item.control_code)}', ParagraphStyle('ControlTitle', parent=styles['Heading3'], textColor=colors.HexColor('#0F172A')))
+        # Lets _ProgressDocTemplate count controls as they are laid out.
+        heading.starts_control = True
+        story.append(heading)
         story.append(Spacer(1, 4))
 
         details = Table([
-            ['Control Code', _safe_text(control.control_code)],
-            ['Indicator', _safe_text(control.indicator)],
+            ['Control Code', _safe_text(item.control_code)],
+            ['Indicator', _safe_text(item.indicator)],
             ['Status', _safe_text(item.computed_status)],
             ['Last Evidence Date', _safe_text(item.last_evidence_date)],
             ['Next Due Date', _safe_text(item.next_due_date)],
@@ -280,13 +320,22 @@ def generate_control_pdf_bytes(control: Control) -> bytes:
     )
 
 
-def generate_controls_pdf_bytes(pack: StandardPack, controls: list[Control], title: str, section_code: str | None = None) -> bytes:
-    styles = getSampleStyleSheet()
-    snapshots = [build_control_snapshot(control) for control in controls]
+class _ProgressDocTemplate(SimpleDocTemplate):
+    def __init__(self, *args, on_control=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.on_control = on_control
+        self.controls_done = 0
 
-    buf = io.BytesIO()
-    doc = SimpleDocTemplate(
+    def afterFlowable(self, flowable):
+        if self.on_control is not None and getattr(flowable, 'starts_control', False):
+            self.controls_done += 1
+            self.on_control(self.controls_done)
+
+
+def _new_document(buf, on_control: Callable[[int], None] | None = None) -> SimpleDocTemplate:
+    return _ProgressDocTemplate(
         buf,
+        on_control=on_control,
         pagesize=A4,
         leftMargin=18 * mm,
         rightMargin=18 * mm,
@@ -294,11 +343,248 @@ def generate_controls_pdf_bytes(pack: StandardPack, controls: list[Control], tit
         bottomMargin=18 * mm,
     )
 
+
+def _render_control_chunk(snapshots: list[ControlSnapshot], on_control: Callable[[int], None] | None = None) -> str:
+    """Render control pages without footers to a temp file; also runs in worker processes."""
+    story = []
+    _add_control_pages(story, snapshots, getSampleStyleSheet())
+    with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as out:
+        _new_document(out, on_control=on_control).build(story)
+    return out.name
+
+
+class _PdfObjectWriter:
+    """Writes numbered PDF objects straight to a file object, keeping only their offsets."""
+
+    def __init__(self, output):
+        self.output = output
+        self.position = 0
+        self.offsets = [0]
+        self.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+
+    def write(self, data: bytes):
+        self.output.write(data)
+        self.position += len(data)
+
+    def reserve(self) -> IndirectObject:
+        self.offsets.append(None)
+        return IndirectObject(len(self.offsets) - 1, 0, None)
+
+    def write_object(self, ref: IndirectObject, obj: PdfObject):
+        buf = io.BytesIO()
+        obj.write_to_stream(buf)
+        self.write_raw_object(ref, buf.getvalue())
+
+    def write_raw_object(self, ref: IndirectObject, body: bytes):
+        self.offsets[ref.idnum] = self.position
+        self.write(b'%d 0 obj\n%s\nendobj\n' % (ref.idnum, body))
+
+    def finish(self, root: IndirectObject):
+        xref_position = self.position
+        self.write(f'xref\n0 {len(self.offsets)}\n0000000000 65535 f \n'.encode())
+        for offset in self.offsets[1:]:
+            self.write(b'%010d 00000 n \n' % offset)
+        self.write(f'trailer\n<< /Size {len(self.offsets)} /Root {root.idnum} 0 R >>\nstartxref\n{xref_position}\n%%EOF\n'.encode())
+
+
+def _stream(data: bytes) -> DecodedStreamObject:
+    stream = DecodedStreamObject()
+    stream.set_data(data)
+    return stream
+
+
+def _copy_part_pages(reader: PdfReader, writer: _PdfObjectWriter, targets: dict, first_page: int, page_count: int) -> list[int]:
+    """
+    Copy the pages of one rendered part, and everything they reference, to writer.
+
+    References are renumbered on the way; links to the part's catalog or page
+    tree are pointed at the output's own. Each page gets the footer content
+    stream appended, wrapped so the part's graphics state cannot leak into it.
+    """
+    numbers = {page.indirect_reference.idnum: writer.reserve() for page in reader.pages}
+    pending = []
+
+    def renumber(ref: IndirectObject) -> IndirectObject:
+        if ref.idnum not in numbers:
+            target = ref.get_object()
+            object_type = target.get('/Type') if isinstance(target, DictionaryObject) else None
+            if object_type in ('/Catalog', '/Pages'):
+                numbers[ref.idnum] = targets[object_type]
+            else:
+                numbers[ref.idnum] = writer.reserve()
+                pending.append(ref)
+        return numbers[ref.idnum]
+
+    def copy(obj):
+        if isinstance(obj, IndirectObject):
+            return renumber(obj)
+        if isinstance(obj, StreamObject):
+            stream = obj.__class__()
+            stream.update({key: copy(value) for key, value in dict.items(obj) if key != '/Length'})
+            stream._data = obj._data
+            return stream
+        if isinstance(obj, DictionaryObject):
+            return DictionaryObject({key: copy(value) for key, value in dict.items(obj)})
+        if isinstance(obj, ArrayObject):
+            return ArrayObject(copy(value) for value in obj)
+        return obj
+
+    page_numbers = []
+    rebuilt_keys = ('/Parent', '/Contents', '/Resources')
+    for page_number, page in enumerate(reader.pages, start=first_page):
+        page_copy = DictionaryObject({key: copy(value) for key, value in dict.items(page) if key not in rebuilt_keys})
+        page_copy[NameObject('/Parent')] = targets['/Pages']
+
+        source_resources = page.get('/Resources', DictionaryObject()).get_object()
+        resources = copy(source_resources)
+        fonts = copy(source_resources['/Font']) if '/Font' in source_resources else DictionaryObject()
+        fonts[NameObject('/AVFooter')] = targets['/Font']
+        resources[NameObject('/Font')] = fonts
+        page_copy[NameObject('/Resources')] = resources
+
+        contents = page.raw_get('/Contents') if '/Contents' in page else ArrayObject()
+        streams = contents.get_object()
+        if not isinstance(streams, ArrayObject):
+            streams = [contents]
+        footer = writer.reserve()
+        page_copy[NameObject('/Contents')] = ArrayObject(
+            [targets['q']] + [copy(item) for item in streams] + [targets['Q'], footer]
+        )
+
+        ref = numbers[page.indirect_reference.idnum]
+        writer.write_object(ref, page_copy)
+        writer.write_object(footer, _stream(_footer_content(page_number, page_count)))
+        page_numbers.append(ref.idnum)
+        while pending:
+            old = pending.pop()
+            writer.write_object(numbers[old.idnum], copy(old.get_object()))
+    return page_numbers
+
+
+def _write_numbered_pdf(part_paths: list[str], output):
+    """
+    Concatenate rendered parts into output, drawing 'Page n of total' on every page.
+
+    This is the second, stamping pass: the page total is only known once every
+    part has been rendered. Objects are copied one at a time straight to output,
+    so memory is bounded by the largest part; across the whole document only
+    object offsets and page object numbers are kept.
+    """
+    page_count = sum(len(PdfReader(path).pages) for path in part_paths)
+    writer = _PdfObjectWriter(output)
+    catalog, pages_root, font, save_state, restore_state = (writer.reserve() for _ in range(5))
+    writer.write_object(font, DictionaryObject({
+        NameObject('/Type'): NameObject('/Font'),
+        NameObject('/Subtype'): NameObject('/Type1'),
+        NameObject('/BaseFont'): NameObject('/Helvetica'),
+        NameObject('/Encoding'): NameObject('/WinAnsiEncoding'),
+    }))
+    writer.write_object(save_state, _stream(b'q'))
+    writer.write_object(restore_state, _stream(b'Q'))
+    targets = {'/Catalog': catalog, '/Pages': pages_root, '/Font': font, 'q': save_state, 'Q': restore_state}
+
+    page_numbers = []
+    for path in part_paths:
+        page_numbers.extend(_copy_part_pages(PdfReader(path), writer, targets, len(page_numbers) + 1, page_count))
+
+    kids = ' '.join(f'{number} 0 R' for number in page_numbers)
+    writer.write_raw_object(pages_root, f'<< /Type /Pages /Count {page_count} /Kids [ {kids} ] >>'.encode())
+    writer.write_raw_object(catalog, f'<< /Type /Catalog /Pages {pages_root.idnum} 0 R >>'.encode())
+    writer.finish(catalog)
+
+
+def _render_in_parallel(
+    part_paths: list[str],
+    snapshots: list[ControlSnapshot],
+    workers: int,
+    chunk_size: int,
+    on_rendered: Callable[[int], None] | None = None,
+):
+    """Render control pages in chunks on a process pool, appending each chunk's temp file to part_paths."""
+    rendered = 0
+    chunks = [snapshots[start:start + chunk_size] for start in range(0, len(snapshots), chunk_size)]
+    # spawn, not fork: exports run inside threaded workers and forked children would inherit their locks.
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(chunks)),
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=django.setup,
+    ) as pool:
+        # map() yields in chunk order as results arrive, so progress moves per rendered chunk.
+        for chunk, path in zip(chunks, pool.map(_render_control_chunk, chunks)):
+            part_paths.append(path)
+            rendered += len(chunk)
+            if on_rendered is not None:
+                on_rendered(rendered)
+
+
+def write_controls_pdf(
+    output,
+    pack: StandardPack,
+    controls: list[Control],
+    title: str,
+    section_code: str | None = None,
+    progress_callback: Callable[[int, int], None] | None = None,
+) -> None:
+    """
+    Render the export PDF into a writable file object.
+
+    Controls are rendered EXPORT_RENDER_CHUNK_SIZE at a time to temp files (on
+    EXPORT_RENDER_WORKERS processes when there is more than one chunk), and a
+    second pass streams them into output with page footers.
+
+    progress_callback(done, total) is called as snapshots load and as controls
+    are rendered. Rendering takes most of the time, so loading a control counts
+    one unit and rendering it RENDER_PROGRESS_WEIGHT units.
+    """
+    total_units = len(controls) * (1 + RENDER_PROGRESS_WEIGHT)
+
+    def on_rendered(count: int):
+        if progress_callback is not None:
+            progress_callback(len(controls) + count * RENDER_PROGRESS_WEIGHT, total_units)
+
+    styles = getSampleStyleSheet()
+    snapshots = []
+    for start in range(0, len(controls), BULK_CHUNK_SIZE):
+        snapshots.extend(build_control_snapshots(controls[start:start + BULK_CHUNK_SIZE]))
+        if progress_callback is not None:
+            progress_callback(len(snapshots), total_units)
+
     story = []
     _add_cover_page(story, pack, title, styles)
     if section_code is not None:
         _add_section_summary_page(story, section_code, snapshots, styles)
-    _add_control_pages(story, snapshots, styles)
 
-    doc.build(story, canvasmaker=NumberedFooterCanvas)
+    workers = getattr(settings, 'EXPORT_RENDER_WORKERS', 1)
+    chunk_size = getattr(settings, 'EXPORT_RENDER_CHUNK_SIZE', 200)
+    part_paths = []
+    try:
+        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as front:
+            part_paths.append(front.name)
+            _new_document(front).build(story)
+
+        if workers > 1 and len(snapshots) > chunk_size:
+            _render_in_parallel(part_paths, snapshots, workers, chunk_size, on_rendered=on_rendered)
+        else:
+            for start in range(0, len(snapshots), chunk_size):
+                part_paths.append(_render_control_chunk(
+                    snapshots[start:start + chunk_size],
+                    on_control=lambda count, start=start: on_rendered(start + count),
+                ))
+
+        _write_numbered_pdf(part_paths, output)
+    finally:
+        for path in part_paths:
+            if os.path.exists(path):
+                os.unlink(path)
+
+
+def generate_controls_pdf_bytes(
+    pack: StandardPack,
+    controls: list[Control],
+    title: str,
+    section_code: str | None = None,
+    progress_callback: Callable[[int, int], None] | None = None,
+) -> bytes:
+    buf = io.BytesIO()
+    write_controls_pdf(buf, pack, controls, title, section_code=section_code, progress_callback=progress_callback)
     return buf.getvalue()
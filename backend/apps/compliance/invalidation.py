@@ -0,0 +1,173 @@
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Iterable
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Subquery
+from django.utils import timezone
+
+from apps.compliance.engine import compute_control_statuses, persist_computed_statuses
+from apps.compliance.models import ControlStatusCache, ControlVerification, DirtyControl, EvidenceRule
+from apps.evidence.models import ControlEvidenceLink
+from apps.standards.models import Control
+
+
+_dirty_buffer = threading.local()
+
+
+@contextmanager
+def batch_dirty_marking():
+    """
+    Collect mark_controls_dirty() calls and write them as one upsert on exit.
+
+    Bulk operations that fire a signal per row use this so N rows cost one
+    marker write instead of N. Yields the set of control ids marked so far.
+    """
+    if getattr(_dirty_buffer, 'pending', None) is not None:
+        yield _dirty_buffer.pending
+        return
+    _dirty_buffer.pending = pending = {}
+    try:
+        yield pending
+    finally:
+        _dirty_buffer.pending = None
+    by_reason = {}
+    for control_id, reason in pending.items():
+        by_reason.setdefault(reason, []).append(control_id)
+    for reason, control_ids in by_reason.items():
+        mark_controls_dirty(control_ids, reason)
+
+
+def mark_controls_dirty(control_ids: Iterable[int], reason: str) -> None:
+    """
+    Record that the cached status of these controls is stale.
+
+    A control has at most one marker, so repeated edits before the next
+    recompute collapse into a single row whose marked_at tracks the latest edit.
+    """
+    control_ids = sorted({control_id for control_id in control_ids if control_id is not None})
+    if not control_ids:
+        return
+    pending = getattr(_dirty_buffer, 'pending', None)
+    if pending is not None:
+        pending.update(dict.fromkeys(control_ids, reason))
+        return
+    now = timezone.now()
+    DirtyControl.objects.bulk_create(
+        [DirtyControl(control_id=control_id, reason=reason, marked_at=now) for control_id in control_ids],
+        update_conflicts=True,
+        unique_fields=['control'],
+        update_fields=['reason', 'marked_at'],
+    )
+
+
+def controls_in_rule_scope(standard_pack_id, scope_type: str, control_id=None, section_code=None) -> list[int]:
+    if scope_type == EvidenceRule.SCOPE_CONTROL:
+        return [control_id] if control_id is not None else []
+    if scope_type == EvidenceRule.SCOPE_SECTION and section_code:
+        return list(
+            Control.objects
+            .filter(standard_pack_id=standard_pack_id, section_code=section_code)
+            .values_list('id', flat=True)
+        )
+    return []
+
+
+def mark_rule_scope_dirty(rule: EvidenceRule) -> None:
+    mark_controls_dirty(
+        controls_in_rule_scope(rule.standard_pack_id, rule.scope_type, rule.control_id, rule.section_code),
+        DirtyControl.REASON_RULE,
+    )
+
+
+def mark_evidence_dirty(evidence_item_ids: Iterable) -> None:
+    control_ids = (
+        ControlEvidenceLink.objects
+        .filter(evidence_item_id__in=list(evidence_item_ids))
+        .values_list('control_id', flat=True)
+    )
+    mark_controls_dirty(control_ids, DirtyControl.REASON_EVIDENCE)
+
+
+def recompute_controls(control_ids: Iterable[int]) -> dict[int, ControlStatusCache]:
+    """Recompute and persist the given controls now and clear their dirty markers."""
+    control_ids = sorted(set(control_ids))
+    if not control_ids:
+        return {}
+    started_at = timezone.now()
+    controls_by_id = {control.id: control for control in Control.objects.filter(id__in=control_ids)}
+    caches = persist_computed_statuses(compute_control_statuses(controls_by_id.values()).values())
+    # Markers written after we started describe edits this pass may not have seen.
+    DirtyControl.objects.filter(control_id__in=control_ids, marked_at__lte=started_at).delete()
+    for cache in caches:
+        cache.control = controls_by_id[cache.control_id]
+    return {cache.control_id: cache for cache in caches}
+
+
+def process_dirty_controls(batch_size: int = 500, settle_seconds: int = 0) -> int:
+    """
+    Recompute one batch of dirty controls and return how many markers were claimed.
+
+    Markers younger than settle_seconds are left alone so a burst of edits to
+    the same control is recomputed once, after the burst ends.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settle_seconds)
+    with transaction.atomic():
+        claimed = list(
+            DirtyControl.objects
+            .select_for_update(skip_locked=True)
+            .filter(marked_at__lte=cutoff)
+            .order_by('marked_at')
+            .values_list('control_id', flat=True)[:batch_size]
+        )
+        if claimed:
+            # Clears the claimed markers too, except ones written during the recompute.
+            recompute_controls(claimed)
+    return len(claimed)
+
+
+def status_freshness_annotations() -> dict:
+    """Annotations for a Control queryset that let is_status_cache_fresh() decide without extra queries."""
+    return {
+        'has_dirty_marker': Exists(DirtyControl.objects.filter(control_id=OuterRef('pk'))),
+        'latest_linked_at': Subquery(
+            ControlEvidenceLink.objects
+            .filter(control_id=OuterRef('pk'))
+            .order_by('-linked_at')
+            .values('linked_at')[:1]
+        ),
+        'latest_verification_at': Subquery(
+            ControlVerification.objects
+            .filter(control_id=OuterRef('pk'))
+            .order_by('-verified_at')
+            .values('verified_at')[:1]
+        ),
+        'latest_rule_change_at': Subquery(
+            EvidenceRule.objects
+            .filter(standard_pack_id=OuterRef('standard_pack_id'))
+            .order_by('-updated_at')
+            .values('updated_at')[:1]
+        ),
+    }
+
+
+def is_status_cache_fresh(control: Control) -> bool:
+    """
+    Check a control loaded with select_related('status_cache') and status_freshness_annotations().
+
+    Statuses are date dependent, so a cache computed on an earlier day is stale as well.
+    """
+    cache = getattr(control, 'status_cache', None)
+    if cache is None or control.has_dirty_marker:
+        return False
+    if timezone.localdate(cache.computed_at) < timezone.localdate():
+        return False
+    watermarks = [control.latest_linked_at, control.latest_verification_at, control.latest_rule_change_at]
+    return all(watermark is None or watermark <= cache.computed_at for watermark in watermarks)
+
+
+def get_status_cache(control: Control, refresh: bool = False) -> ControlStatusCache:
+    if not refresh and is_status_cache_fresh(control):
+        return control.status_cache
+    return recompute_controls([control.id])[control.id]
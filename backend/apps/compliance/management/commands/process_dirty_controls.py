@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.compliance.invalidation import process_dirty_controls
+
+
+class Command(BaseCommand):
+    help = 'Recompute ControlStatusCache for controls marked dirty by evidence, verification or rule changes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--settle-seconds', type=int, default=0)
+        parser.add_argument('--loop', action='store_true')
+        parser.add_argument('--interval', type=float, default=5.0)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        settle_seconds = options['settle_seconds']
+        loop = options['loop']
+        interval = options['interval']
+
+        if batch_size <= 0:
+            raise CommandError('--batch-size must be > 0')
+        if settle_seconds < 0:
+            raise CommandError('--settle-seconds must be >= 0')
+
+        total = 0
+        while True:
+            processed = process_dirty_controls(batch_size=batch_size, settle_seconds=settle_seconds)
+            total += processed
+            if processed:
+                continue
+            if not loop:
+                break
+            time.sleep(interval)
+
+        self.stdout.write(self.style.SUCCESS(f'Recomputed {total} dirty controls'))
@@ -4,7 +4,7 @@ from datetime import timedelta
 from django.core.management.base import BaseCommand, CommandError
 from django.utils import timezone
 
-from apps.compliance.engine import compute_control_status, recompute_and_persist
+from apps.compliance.engine import compute_control_statuses, persist_computed_statuses
 from apps.standards.models import StandardPack
 
 
@@ -55,9 +55,12 @@ class Command(BaseCommand):
         counts = Counter()
         total = 0
         overdue_found = False
+        selected = []
+
+        computed_by_control = compute_control_statuses(controls)
 
         for control in controls:
-            computed = compute_control_status(control)
+            computed = computed_by_control[control.id]
             due_date = computed.get('next_due_date')
             is_near_due = bool(
                 due_date is not None
@@ -70,12 +73,8 @@ class Command(BaseCommand):
             if only_near_due is not None and not is_near_due:
                 continue
 
-            if dry_run:
-                status_name = computed['computed_status']
-            else:
-                cache = recompute_and_persist(control, computed=computed)
-                status_name = cache.computed_status
-
+            selected.append(computed)
+            status_name = computed['computed_status']
             counts[status_name] += 1
             if is_near_due:
                 counts['NEAR_DUE'] += 1
@@ -83,6 +82,9 @@ class Command(BaseCommand):
                 overdue_found = True
             total += 1
 
+        if not dry_run:
+            persist_computed_statuses(selected)
+
         mode_text = 'dry-run ' if dry_run else ''
         self.stdout.write(self.style.SUCCESS(f'Recomputed {mode_text}statuses for {total} controls in pack {pack.version}'))
         self.stdout.write(f'total: {total}')
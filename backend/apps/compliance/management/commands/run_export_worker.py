@@ -0,0 +1,107 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+
+from apps.audit.sink import start_background_flusher, stop_background_flusher
+from apps.compliance.export_jobs import claim_next_export_job, requeue_stale_export_jobs, run_export_job
+from apps.compliance.models import ExportJob
+
+
+class Command(BaseCommand):
+    help = 'Process queued ExportJob rows. Workers claim jobs with SELECT ... FOR UPDATE SKIP LOCKED.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=1)
+        parser.add_argument('--max-attempts', type=int, default=3)
+        parser.add_argument('--poll-interval', type=float, default=2.0)
+        parser.add_argument(
+            '--stale-after',
+            type=int,
+            default=1800,
+            help='Seconds without a heartbeat after which a RUNNING job is requeued, or failed once out of attempts',
+        )
+        parser.add_argument(
+            '--requeue-interval',
+            type=float,
+            default=60.0,
+            help='Seconds between checks for RUNNING jobs whose worker died',
+        )
+        parser.add_argument('--once', action='store_true', help='Exit when the queue is empty')
+
+    def handle(self, *args, **options):
+        concurrency = options['concurrency']
+        max_attempts = options['max_attempts']
+        self.poll_interval = options['poll_interval']
+        self.once = options['once']
+        self.max_attempts = max_attempts
+        self.stale_after = options['stale_after']
+        self.requeue_interval = options['requeue_interval']
+        self._requeue_lock = threading.Lock()
+        self._next_requeue_at = 0.0
+
+        if concurrency <= 0:
+            raise CommandError('--concurrency must be > 0')
+        if max_attempts <= 0:
+            raise CommandError('--max-attempts must be > 0')
+
+        # Audit events written between jobs are batched off the worker threads.
+        start_background_flusher()
+        try:
+            self._run(concurrency, max_attempts)
+        finally:
+            stop_background_flusher()
+
+    def _run(self, concurrency, max_attempts):
+        if concurrency == 1:
+            self._work(max_attempts)
+            return
+
+        threads = [
+            threading.Thread(target=self._work_in_thread, args=(max_attempts,), name=f'export-worker-{index}', daemon=True)
+            for index in range(concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def _work_in_thread(self, max_attempts):
+        try:
+            self._work(max_attempts)
+        finally:
+            connection.close()
+
+    def _requeue_stale_jobs(self):
+        # Other workers' jobs can be orphaned at any time, not just when this one starts.
+        with self._requeue_lock:
+            now = time.monotonic()
+            if now < self._next_requeue_at:
+                return
+            self._next_requeue_at = now + self.requeue_interval
+        requeued, failed = requeue_stale_export_jobs(self.stale_after, max_attempts=self.max_attempts)
+        if requeued:
+            self.stdout.write(self.style.WARNING(f'Requeued {requeued} stale export jobs'))
+        if failed:
+            self.stdout.write(self.style.ERROR(f'Failed {failed} stale export jobs that were out of attempts'))
+
+    def _work(self, max_attempts):
+        while True:
+            if not connection.in_atomic_block:
+                close_old_connections()
+            self._requeue_stale_jobs()
+            job = claim_next_export_job()
+            if job is None:
+                if self.once:
+                    return
+                time.sleep(self.poll_interval)
+                continue
+
+            job = run_export_job(job, max_attempts=max_attempts)
+            if job.status == ExportJob.STATUS_COMPLETED:
+                self.stdout.write(self.style.SUCCESS(f'Completed export {job.id} ({job.job_type}, {job.size_bytes} bytes)'))
+            elif job.status == ExportJob.STATUS_QUEUED:
+                self.stdout.write(self.style.WARNING(f'Export {job.id} failed attempt {job.attempts}, requeued: {job.error_text}'))
+            else:
+                self.stdout.write(self.style.ERROR(f'Export {job.id} failed: {job.error_text}'))
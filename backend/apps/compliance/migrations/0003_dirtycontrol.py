@@ -0,0 +1,27 @@
+# Generated by Django 5.1.14 on 2026-10-17 02:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('compliance', '0002_compliancealert_controlnote'),
+        ('standards', '0002_alter_control_control_code_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DirtyControl',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reason', models.CharField(choices=[('LINK', 'Evidence Linked'), ('UNLINK', 'Evidence Unlinked'), ('VERIFICATION', 'Verification'), ('RULE', 'Rule Changed'), ('EVIDENCE', 'Evidence Changed')], max_length=20)),
+                ('marked_at', models.DateTimeField(db_index=True)),
+                ('control', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='dirty_marker', to='standards.control')),
+            ],
+            options={
+                'ordering': ['marked_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.14 on 2026-10-17 03:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('compliance', '0004_exportjob_queue_fields'),
+        ('standards', '0002_alter_control_control_code_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exportjob',
+            name='fingerprint',
+            field=models.CharField(blank=True, help_text='Hash of the state the export was rendered from', max_length=64, null=True),
+        ),
+        migrations.AlterField(
+            model_name='exportjob',
+            name='object_key',
+            field=models.CharField(max_length=1024),
+        ),
+        migrations.AddIndex(
+            model_name='exportjob',
+            index=models.Index(fields=['fingerprint', 'status'], name='compliance__fingerp_dba7ab_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.14 on 2026-10-17 03:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('compliance', '0005_exportjob_fingerprint'),
+        ('standards', '0003_control_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatusRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('section_code', models.CharField(max_length=10)),
+                ('total', models.IntegerField(default=0)),
+                ('not_started', models.IntegerField(default=0)),
+                ('in_progress', models.IntegerField(default=0)),
+                ('ready', models.IntegerField(default=0)),
+                ('verified', models.IntegerField(default=0)),
+                ('overdue', models.IntegerField(default=0)),
+                ('last_computed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['section_code'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='controlstatuscache',
+            index=models.Index(fields=['next_due_date'], name='compliance__next_du_cf5aba_idx'),
+        ),
+        migrations.AddField(
+            model_name='statusrollup',
+            name='standard_pack',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_rollups', to='standards.standardpack'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='statusrollup',
+            unique_together={('standard_pack', 'section_code')},
+        ),
+    ]
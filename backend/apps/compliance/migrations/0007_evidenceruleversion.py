@@ -0,0 +1,22 @@
+# Generated by Django 5.1.14 on 2026-10-17 04:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('compliance', '0006_statusrollup'),
+        ('standards', '0004_control_section_code'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EvidenceRuleVersion',
+            fields=[
+                ('standard_pack', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='rule_version', serialize=False, to='standards.standardpack')),
+                ('version', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -104,11 +104,38 @@ class ControlStatusCache(models.Model):
 
     class Meta:
         ordering = ['-computed_at']
+        indexes = [
+            models.Index(fields=['next_due_date']),
+        ]
 
     def __str__(self):
         return f"{self.control_id}:{self.computed_status}"
 
 
+class StatusRollup(models.Model):
+    """
+    Per-section control counts by computed status, kept in step with ControlStatusCache.
+
+    Controls with no cache row count as NOT_STARTED. See apps.compliance.rollups.
+    """
+    standard_pack = models.ForeignKey(StandardPack, on_delete=models.CASCADE, related_name='status_rollups')
+    section_code = models.CharField(max_length=10)
+    total = models.IntegerField(default=0)
+    not_started = models.IntegerField(default=0)
+    in_progress = models.IntegerField(default=0)
+    ready = models.IntegerField(default=0)
+    verified = models.IntegerField(default=0)
+    overdue = models.IntegerField(default=0)
+    last_computed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['section_code']
+        unique_together = [['standard_pack', 'section_code']]
+
+    def __str__(self):
+        return f"{self.standard_pack_id}:{self.section_code}:{self.total}"
+
+
 class ControlVerification(models.Model):
     STATUS_VERIFIED = 'VERIFIED'
     STATUS_REJECTED = 'REJECTED'
@@ -165,14 +192,24 @@ class ExportJob(models.Model):
     completed_at = models.DateTimeField(null=True, blank=True)
 
     bucket = models.CharField(max_length=255)
-    object_key = models.CharField(max_length=1024, unique=True)
+    # Jobs served from the export cache share the object of the job they reuse.
+    object_key = models.CharField(max_length=1024)
     filename = models.CharField(max_length=255)
     size_bytes = models.BigIntegerField(null=True, blank=True)
     sha256 = models.CharField(max_length=64, null=True, blank=True, db_index=True)
     error_text = models.TextField(null=True, blank=True)
+    attempts = models.IntegerField(default=0)
+    progress = models.IntegerField(default=0, help_text='Percent of controls rendered')
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True, help_text='Last time the worker running the job reported in')
+    fingerprint = models.CharField(max_length=64, null=True, blank=True, help_text='Hash of the state the export was rendered from')
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['fingerprint', 'status']),
+        ]
 
     def __str__(self):
         return f"{self.job_type}:{self.status}:{self.id}"
@@ -230,3 +267,58 @@ class ComplianceAlert(models.Model):
 
     def __str__(self):
         return f"{self.control_id}:{self.alert_type}:{'active' if self.cleared_at is None else 'cleared'}"
+
+
+class DirtyControl(models.Model):
+    REASON_LINK = 'LINK'
+    REASON_UNLINK = 'UNLINK'
+    REASON_VERIFICATION = 'VERIFICATION'
+    REASON_RULE = 'RULE'
+    REASON_EVIDENCE = 'EVIDENCE'
+    REASON_CHOICES = [
+        (REASON_LINK, 'Evidence Linked'),
+        (REASON_UNLINK, 'Evidence Unlinked'),
+        (REASON_VERIFICATION, 'Verification'),
+        (REASON_RULE, 'Rule Changed'),
+        (REASON_EVIDENCE, 'Evidence Changed'),
+    ]
+
+    # No database constraint: markers are written from signal handlers that can run while
+    # the control itself is being cascade-deleted. Orphaned markers are dropped when processed.
+    control = models.OneToOneField(
+        Control,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='dirty_marker',
+    )
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    marked_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        ordering = ['marked_at']
+
+    def __str__(self):
+        return f"{self.control_id}:{self.reason}:{self.marked_at.isoformat()}"
+
+
+class EvidenceRuleVersion(models.Model):
+    """
+    Per-pack counter of evidence rule changes.
+
+    Bumped in the same transaction as each rule save or delete, so every
+    process sees a new value exactly when the change commits; the compiled
+    rule index is keyed on it (see apps.compliance.rule_index).
+    """
+    # No database constraint, like DirtyControl: rule deletes cascading from a
+    # pack delete still bump the pack's counter.
+    standard_pack = models.OneToOneField(
+        StandardPack,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        primary_key=True,
+        related_name='rule_version',
+    )
+    version = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.standard_pack_id}:v{self.version}"
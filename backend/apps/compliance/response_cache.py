@@ -0,0 +1,109 @@
+"""
+Cached, conditional responses for read-mostly endpoints (dashboard, alerts,
+control list).
+
+Every pack has a version token in the cache, plus one token covering all
+packs. Writes that change what these endpoints show (status caches, alerts,
+controls, packs) replace the tokens once their transaction commits. A
+response is cached under the token it was built from, so a new token makes
+old entries unreachable without deleting them. The token also doubles as the
+ETag and Last-Modified value, which lets a conditional GET be answered with
+304 before any of the response is rebuilt.
+"""
+import hashlib
+import time
+from typing import Callable, Iterable
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+
+KEY_PREFIX = 'response-cache'
+ALL_PACKS = 'all'
+
+
+def _timeout() -> int:
+    return getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 60)
+
+
+def _version_key(scope) -> str:
+    return f'{KEY_PREFIX}:version:{scope}'
+
+
+def _new_version() -> str:
+    return format(time.time_ns(), 'x')
+
+
+def get_version(scope=ALL_PACKS) -> str:
+    """Current token for a pack id, or for all packs; started on first use."""
+    key = _version_key(scope)
+    version = cache.get(key)
+    if version is None:
+        version = _new_version()
+        # add() so two readers starting the same scope agree on one token.
+        if not cache.add(key, version, _timeout()):
+            version = cache.get(key) or version
+    return version
+
+
+def bump_pack_versions(pack_ids: Iterable[int]):
+    """Invalidate cached responses for these packs and for all-pack listings, on commit."""
+    scopes = {pack_id for pack_id in pack_ids if pack_id is not None}
+    if not scopes:
+        return
+    scopes.add(ALL_PACKS)
+
+    def bump():
+        version = _new_version()
+        cache.set_many({_version_key(scope): version for scope in scopes}, _timeout())
+
+    transaction.on_commit(bump)
+
+
+def _last_modified(version: str) -> int:
+    # Tokens are the nanosecond time they were made.
+    return int(version, 16) // 10**9
+
+
+def _not_modified(request, etag: str, last_modified: int) -> bool:
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match:
+        # Weak comparison: proxies that re-encode the body mark the tag W/.
+        etags = {tag.removeprefix('W/') for tag in parse_etags(if_none_match)}
+        return '*' in etags or etag in etags
+    # If-Modified-Since only counts without If-None-Match, and has whole-second
+    # precision: a change later in the same second still has that Last-Modified,
+    # so only a strictly later date proves the client's copy is current.
+    if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+    return if_modified_since is not None and last_modified < if_modified_since
+
+
+def cached_response(request, name: str, version: str, build: Callable[[], object], vary: str = '') -> Response:
+    """
+    Answer a GET from the cache, building and storing the data on a miss.
+
+    The key covers the view name, the version token, the full request URL and
+    `vary` (anything else the data depends on); the user is not part of it, so
+    only use this for data that is the same for everyone allowed to see it.
+    """
+    digest = hashlib.sha256(f'{request.build_absolute_uri()}|{vary}'.encode('utf-8')).hexdigest()[:16]
+    etag = f'"{name}-{version}-{digest}"'
+    last_modified = _last_modified(version)
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(last_modified),
+        # Let browsers keep a copy but check back each time; the 304 is cheap.
+        'Cache-Control': 'private, no-cache',
+    }
+    if _not_modified(request, etag, last_modified):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    key = f'{KEY_PREFIX}:{name}:{version}:{digest}'
+    data = cache.get(key)
+    if data is None:
+        data = build()
+        cache.set(key, data, _timeout())
+    return Response(data, status=status.HTTP_200_OK, headers=headers)
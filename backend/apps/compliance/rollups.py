@@ -0,0 +1,131 @@
+"""
+Dashboard rollups: StatusRollup rows hold per-section control counts by status.
+
+A pack's rows are built from scratch the first time they are needed, then kept
+current by applying per-control status changes as ControlStatusCache rows are
+written, and dropped when the pack's controls change.
+"""
+from collections import defaultdict
+from typing import Iterable
+
+from django.db import transaction
+from django.db.models import Count, F, Max
+from django.utils import timezone
+
+from apps.compliance.models import StatusRollup
+from apps.standards.models import Control, StandardPack
+
+NOT_STARTED = 'NOT_STARTED'
+STATUS_FIELDS = {
+    'NOT_STARTED': 'not_started',
+    'IN_PROGRESS': 'in_progress',
+    'READY': 'ready',
+    'VERIFIED': 'verified',
+    'OVERDUE': 'overdue',
+}
+
+
+def _lock_packs(pack_ids):
+    """
+    Lock StandardPack rows in pk order. Rollup builds and status writers of a
+    pack take this lock, so counts are never taken while statuses change.
+    """
+    list(StandardPack.objects.select_for_update().filter(pk__in=pack_ids).order_by('pk').values_list('pk', flat=True))
+
+
+def rebuild_status_rollups(pack_id: int) -> list[StatusRollup]:
+    """
+    Count a pack's rollups from its controls and their status caches.
+
+    Runs under the pack lock; if another request built the rows while this
+    one waited for it, those are returned instead of counting again.
+    """
+    with transaction.atomic():
+        _lock_packs([pack_id])
+        existing = list(StatusRollup.objects.filter(standard_pack_id=pack_id))
+        if existing:
+            return existing
+
+        rows = {}
+        counts = (
+            Control.objects
+            .filter(standard_pack_id=pack_id)
+            .order_by()
+            .values_list('section_code', 'status_cache__computed_status')
+            .annotate(count=Count('id'), last_computed_at=Max('status_cache__computed_at'))
+        )
+        for section_code, computed_status, count, computed_at in counts:
+            row = rows.get(section_code)
+            if row is None:
+                row = rows[section_code] = StatusRollup(standard_pack_id=pack_id, section_code=section_code)
+            row.total += count
+            field = STATUS_FIELDS.get(computed_status or NOT_STARTED)
+            if field:
+                setattr(row, field, getattr(row, field) + count)
+            if computed_at and (row.last_computed_at is None or computed_at > row.last_computed_at):
+                row.last_computed_at = computed_at
+
+        # The lock already serializes builds; ignoring conflicts covers
+        # databases where select_for_update() is a no-op.
+        StatusRollup.objects.bulk_create(rows.values(), ignore_conflicts=True)
+    return list(StatusRollup.objects.filter(standard_pack_id=pack_id))
+
+
+def get_status_rollups(pack) -> list[StatusRollup]:
+    rollups = list(StatusRollup.objects.filter(standard_pack=pack))
+    if not rollups:
+        rollups = rebuild_status_rollups(pack.pk)
+    return rollups
+
+
+def invalidate_status_rollups(pack_id: int):
+    with transaction.atomic():
+        # Wait for a build in progress, whose counts may predate this change.
+        _lock_packs([pack_id])
+        StatusRollup.objects.filter(standard_pack_id=pack_id).delete()
+
+
+def snapshot_statuses(control_ids: Iterable[int]) -> dict[int, tuple[int, str, str]]:
+    """
+    Lock the packs these controls belong to and return each control's
+    (pack_id, section_code, current status).
+
+    Call inside a transaction, before the status caches are written, and pass
+    the result to apply_status_changes afterwards. The lock keeps concurrent
+    writers for the same pack from applying changes against the same old
+    status, and rollup builds from counting statuses about to change.
+    Controls of packs without rollups are left out; those are built on demand.
+    """
+    control_ids = list(control_ids)
+    _lock_packs(Control.objects.filter(id__in=control_ids).values('standard_pack_id'))
+    rows = (
+        Control.objects
+        .filter(id__in=control_ids, standard_pack_id__in=StatusRollup.objects.values('standard_pack_id'))
+        .order_by()
+        .values_list('id', 'standard_pack_id', 'section_code', 'status_cache__computed_status')
+    )
+    return {
+        control_id: (pack_id, section_code, computed_status or NOT_STARTED)
+        for control_id, pack_id, section_code, computed_status in rows
+    }
+
+
+def apply_status_changes(previous: dict[int, tuple[int, str, str]], new_statuses: dict[int, str]):
+    """Move each recomputed control from its old status count to its new one."""
+    deltas = defaultdict(lambda: defaultdict(int))
+    for control_id, (pack_id, section_code, old_status) in previous.items():
+        new_status = new_statuses.get(control_id)
+        section = deltas[(pack_id, section_code)]
+        if new_status is None or new_status == old_status:
+            continue
+        if old_status in STATUS_FIELDS:
+            section[STATUS_FIELDS[old_status]] -= 1
+        if new_status in STATUS_FIELDS:
+            section[STATUS_FIELDS[new_status]] += 1
+
+    now = timezone.now()
+    for (pack_id, section_code), changes in deltas.items():
+        StatusRollup.objects.filter(standard_pack_id=pack_id, section_code=section_code).update(
+            last_computed_at=now,
+            **{field: F(field) + delta for field, delta in changes.items() if delta},
+        )
@@ -0,0 +1,179 @@
+"""
+Compiled, per-process index of each standard pack's enabled evidence rules.
+
+Rules change far less often than statuses are computed, so a pack's rules are
+loaded once, bucketed by control id and by section code, and kept in this
+process until the pack's EvidenceRuleVersion counter moves. Rule saves and
+deletes bump the counter in their own transaction, so the change and the new
+version become visible to every process together, whatever cache each one is
+configured with.
+"""
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Iterable
+
+from django.db import transaction
+from django.db.models import F
+
+from apps.compliance.models import EvidenceRule, EvidenceRuleVersion
+
+_indexes: dict[int, 'PackRuleIndex'] = {}
+_indexes_lock = threading.Lock()
+# Packs whose rules this thread changed in a transaction that has not committed yet.
+_uncommitted = threading.local()
+# Indexes already looked up inside this thread's batch_rule_indexes() block.
+_batch = threading.local()
+
+
+@dataclass(frozen=True)
+class CompiledRule:
+    """The parts of an EvidenceRule that evaluation reads, with the category and subtype lists as sets."""
+    id: object
+    position: int
+    rule_type: str
+    min_items: int
+    frequency_days: int | None
+    window_days: int | None
+    requires_verification: bool
+    acceptable_categories: frozenset
+    acceptable_subtypes: frozenset
+
+    @classmethod
+    def from_rule(cls, rule: EvidenceRule, position: int) -> 'CompiledRule':
+        return cls(
+            id=rule.id,
+            position=position,
+            rule_type=rule.rule_type,
+            min_items=rule.min_items,
+            frequency_days=rule.frequency_days,
+            window_days=rule.window_days,
+            requires_verification=rule.requires_verification,
+            acceptable_categories=frozenset(rule.acceptable_categories or ()),
+            acceptable_subtypes=frozenset(rule.acceptable_subtypes or ()),
+        )
+
+
+@dataclass(frozen=True)
+class PackRuleIndex:
+    pack_id: int
+    version: int
+    by_control: dict[int, tuple[CompiledRule, ...]] = field(default_factory=dict)
+    by_section: dict[str, tuple[CompiledRule, ...]] = field(default_factory=dict)
+
+    def rules_for(self, control_id: int, section_code: str) -> tuple[CompiledRule, ...]:
+        """The control's own and section rules, in EvidenceRule's model ordering."""
+        control_rules = self.by_control.get(control_id, ())
+        section_rules = self.by_section.get(section_code, ())
+        if not control_rules:
+            return section_rules
+        if not section_rules:
+            return control_rules
+        return tuple(sorted(control_rules + section_rules, key=lambda rule: rule.position))
+
+
+def _uncommitted_packs() -> set:
+    packs = getattr(_uncommitted, 'packs', None)
+    if packs is None:
+        packs = _uncommitted.packs = set()
+    return packs
+
+
+def _current_version(pack_id: int) -> int:
+    # A pack whose rules never changed has no row yet.
+    return EvidenceRuleVersion.objects.filter(standard_pack_id=pack_id).values_list('version', flat=True).first() or 0
+
+
+def compile_rule_index(pack_id: int, version: int = 0) -> PackRuleIndex:
+    by_control, by_section = {}, {}
+    # Model ordering, so rules come out in the order fetch_applicable_rules() always used.
+    for position, rule in enumerate(EvidenceRule.objects.filter(standard_pack_id=pack_id, enabled=True)):
+        if rule.scope_type == EvidenceRule.SCOPE_CONTROL and rule.control_id is not None:
+            by_control.setdefault(rule.control_id, []).append(CompiledRule.from_rule(rule, position))
+        elif rule.scope_type == EvidenceRule.SCOPE_SECTION and rule.section_code:
+            by_section.setdefault(rule.section_code, []).append(CompiledRule.from_rule(rule, position))
+    return PackRuleIndex(
+        pack_id=pack_id,
+        version=version,
+        by_control={key: tuple(rules) for key, rules in by_control.items()},
+        by_section={key: tuple(rules) for key, rules in by_section.items()},
+    )
+
+
+@contextmanager
+def batch_rule_indexes():
+    """
+    Read each pack's rule version once for the whole block.
+
+    get_rule_index() otherwise checks the version on every call; code that
+    evaluates controls one at a time wraps the loop in this.
+    """
+    if getattr(_batch, 'indexes', None) is not None:
+        yield
+        return
+    _batch.indexes = {}
+    try:
+        yield
+    finally:
+        _batch.indexes = None
+
+
+def get_rule_index(pack_id: int) -> PackRuleIndex:
+    """
+    Return the pack's index; one query reads its version, one more recompiles it if the version moved.
+
+    Inside batch_rule_indexes() the version is read on the first call per pack only.
+    """
+    batch = getattr(_batch, 'indexes', None)
+    if batch is not None and pack_id in batch:
+        return batch[pack_id]
+    index = _load_rule_index(pack_id)
+    if batch is not None:
+        batch[pack_id] = index
+    return index
+
+
+def _load_rule_index(pack_id: int) -> PackRuleIndex:
+    version = _current_version(pack_id)
+    index = _indexes.get(pack_id)
+    if index is not None and index.version == version:
+        return index
+
+    index = compile_rule_index(pack_id, version)
+    pending = _uncommitted_packs()
+    if pack_id in pending and transaction.get_connection().in_atomic_block:
+        # Built from this transaction's own uncommitted rule changes; it may
+        # still roll back, so use the index for this call without keeping it.
+        return index
+    pending.discard(pack_id)
+    with _indexes_lock:
+        _indexes[pack_id] = index
+    return index
+
+
+def reset_rule_indexes():
+    """Forget every compiled index in this process (tests roll back and reuse pack ids)."""
+    with _indexes_lock:
+        _indexes.clear()
+
+
+def bump_rule_index_versions(pack_ids: Iterable[int]):
+    """Move these packs' rule versions on, in the current transaction."""
+    pack_ids = {pack_id for pack_id in pack_ids if pack_id is not None}
+    if not pack_ids:
+        return
+
+    def committed():
+        _uncommitted_packs().difference_update(pack_ids)
+
+    _uncommitted_packs().update(pack_ids)
+    batch = getattr(_batch, 'indexes', None)
+    if batch is not None:
+        for pack_id in pack_ids:
+            batch.pop(pack_id, None)
+    EvidenceRuleVersion.objects.bulk_create(
+        [EvidenceRuleVersion(standard_pack_id=pack_id) for pack_id in pack_ids],
+        ignore_conflicts=True,
+    )
+    EvidenceRuleVersion.objects.filter(standard_pack_id__in=pack_ids).update(version=F('version') + 1)
+    transaction.on_commit(committed)
@@ -52,6 +52,10 @@ class ExportJobSerializer(serializers.ModelSerializer):
             'size_bytes',
             'sha256',
             'error_text',
+            'attempts',
+            'progress',
+            'started_at',
+            'fingerprint',
         ]
 
 
@@ -0,0 +1,85 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from apps.compliance.invalidation import (
+    controls_in_rule_scope,
+    mark_controls_dirty,
+    mark_evidence_dirty,
+    mark_rule_scope_dirty,
+)
+from apps.compliance.models import ControlVerification, DirtyControl, EvidenceRule
+from apps.compliance.response_cache import bump_pack_versions
+from apps.compliance.rollups import invalidate_status_rollups
+from apps.compliance.rule_index import bump_rule_index_versions
+from apps.evidence.models import ControlEvidenceLink, EvidenceItem
+from apps.standards.models import Control, StandardPack
+
+
+@receiver(post_save, sender=ControlEvidenceLink)
+def mark_linked_control_dirty(sender, instance, created, **kwargs):
+    if created:
+        mark_controls_dirty([instance.control_id], DirtyControl.REASON_LINK)
+
+
+@receiver(post_delete, sender=ControlEvidenceLink)
+def mark_unlinked_control_dirty(sender, instance, **kwargs):
+    mark_controls_dirty([instance.control_id], DirtyControl.REASON_UNLINK)
+
+
+@receiver(post_save, sender=ControlVerification)
+def mark_verified_control_dirty(sender, instance, **kwargs):
+    mark_controls_dirty([instance.control_id], DirtyControl.REASON_VERIFICATION)
+
+
+@receiver(pre_save, sender=EvidenceRule)
+def mark_previous_rule_scope_dirty(sender, instance, raw=False, **kwargs):
+    # A rule edit can move it to another control or section; the old scope is stale too.
+    if raw or instance._state.adding:
+        return
+    previous = (
+        EvidenceRule.objects
+        .filter(pk=instance.pk)
+        .values('standard_pack_id', 'scope_type', 'control_id', 'section_code')
+        .first()
+    )
+    if previous is not None:
+        # mark_rule_dirty bumps the rule index of this pack with the new one.
+        instance._previous_standard_pack_id = previous['standard_pack_id']
+        mark_controls_dirty(controls_in_rule_scope(**previous), DirtyControl.REASON_RULE)
+
+
+@receiver(post_save, sender=EvidenceRule)
+@receiver(post_delete, sender=EvidenceRule)
+def mark_rule_dirty(sender, instance, **kwargs):
+    if kwargs.get('raw'):
+        return
+    previous_pack_id = instance.__dict__.pop('_previous_standard_pack_id', None)
+    bump_rule_index_versions([instance.standard_pack_id, previous_pack_id])
+    mark_rule_scope_dirty(instance)
+
+
+@receiver(post_save, sender=EvidenceItem)
+def mark_edited_evidence_dirty(sender, instance, created, raw=False, **kwargs):
+    if created or raw:
+        return
+    mark_evidence_dirty([instance.pk])
+
+
+@receiver(post_save, sender=Control)
+@receiver(post_delete, sender=Control)
+def invalidate_pack_rollups(sender, instance, **kwargs):
+    # Added, removed or recoded controls change section totals; recount on next read.
+    if kwargs.get('raw'):
+        return
+    invalidate_status_rollups(instance.standard_pack_id)
+    bump_pack_versions([instance.standard_pack_id])
+
+
+@receiver(post_save, sender=StandardPack)
+@receiver(post_delete, sender=StandardPack)
+def invalidate_pack_responses(sender, instance, **kwargs):
+    # Imports bulk-create controls after saving the pack; the bump runs on
+    # commit, so it covers them too.
+    if kwargs.get('raw'):
+        return
+    bump_pack_versions([instance.pk])
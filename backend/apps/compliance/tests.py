@@ -1,14 +1,42 @@
+import hashlib
+import random
+import threading
+import uuid
 from datetime import timedelta
+from io import BytesIO, StringIO
+from types import SimpleNamespace
+from unittest import skipUnless
 from unittest.mock import patch
 
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group
+from django.core.cache import cache
 from django.core.management import call_command
-from django.test import TestCase
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
 from django.utils import timezone
+from django.utils.http import http_date, parse_http_date
+from pypdf import PdfReader
 from rest_framework.test import APIClient
 
-from apps.compliance.models import ComplianceAlert, ControlNote, ControlVerification, EvidenceRule, ExportJob
+from apps.compliance import rollups
+from apps.compliance.engine import compute_control_status, compute_control_statuses, evaluate_rule, persist_computed_statuses
+from apps.compliance.export_jobs import _progress_reporter, claim_next_export_job, requeue_stale_export_jobs
+from apps.compliance.export_service import build_control_snapshots, generate_controls_pdf_bytes
+from apps.compliance.invalidation import process_dirty_controls
+from apps.compliance.rule_index import CompiledRule, batch_rule_indexes, get_rule_index, reset_rule_indexes
+from apps.compliance.rule_kernel import EvidenceColumns, evaluate_rules
+from apps.compliance.models import (
+    ComplianceAlert,
+    ControlNote,
+    ControlStatusCache,
+    ControlVerification,
+    DirtyControl,
+    EvidenceRule,
+    EvidenceRuleVersion,
+    ExportJob,
+    StatusRollup,
+)
 from apps.evidence.models import EvidenceItem
 from apps.standards.models import Control, StandardPack
 
@@ -38,6 +66,8 @@ class DummyS3Client:
 
 class ComplianceEngineAndApiTests(TestCase):
     def setUp(self):
+        cache.clear()
+        reset_rule_indexes()
         self.client = APIClient()
         self.user = User.objects.create_user(username='compliance_tester', password='pass1234')
         Group.objects.get_or_create(name='MANAGER')
@@ -132,35 +162,93 @@ class ComplianceEngineAndApiTests(TestCase):
         verify_response = self.client.post(f'/api/v1/controls/{self.control.id}/verify', {'remarks': 'Looks good'}, format='json')
         self.assertEqual(verify_response.status_code, 201)
         self.assertEqual(verify_response.json()['status_cache']['computed_status'], 'VERIFIED')
+        self.assertFalse(DirtyControl.objects.filter(control=self.control).exists())
 
         self._create_and_link_evidence(control=self.control, event_date=timezone.localdate())
         stale_status = self.client.get(f'/api/v1/controls/{self.control.id}/status')
         self.assertEqual(stale_status.status_code, 200)
         self.assertEqual(stale_status.json()['computed_status'], 'READY')
 
-    @patch('apps.compliance.views.get_s3_client')
-    def test_export_creation_and_download(self, mock_s3_client):
+    def _run_export_worker(self):
+        call_command('run_export_worker', '--once', stdout=StringIO())
+
+    @patch('apps.evidence.presign.get_s3_client')
+    @patch('apps.compliance.export_jobs.get_s3_client')
+    def test_export_creation_and_download(self, mock_worker_s3_client, mock_s3_client):
         dummy_s3 = DummyS3Client()
+        mock_worker_s3_client.return_value = dummy_s3
         mock_s3_client.return_value = dummy_s3
 
         self._create_and_link_evidence(control=self.control, event_date=timezone.localdate())
 
         export_response = self.client.post(f'/api/v1/exports/control/{self.control.id}', {}, format='json')
-        self.assertEqual(export_response.status_code, 201)
+        self.assertEqual(export_response.status_code, 202)
         payload = export_response.json()
-        self.assertEqual(payload['job']['status'], 'COMPLETED')
-        self.assertTrue(payload['job']['sha256'])
-        self.assertEqual(payload['download']['url'], 'http://example.com/presigned-download')
+        self.assertEqual(payload['job']['status'], 'QUEUED')
+        self.assertEqual(len(dummy_s3.uploads), 0)
+
+        pending = self.client.get(f'/api/v1/exports/{payload["job"]["id"]}/download')
+        self.assertEqual(pending.status_code, 400)
+
+        self._run_export_worker()
         self.assertEqual(len(dummy_s3.uploads), 1)
 
         job = ExportJob.objects.get(pk=payload['job']['id'])
         self.assertEqual(job.status, ExportJob.STATUS_COMPLETED)
+        self.assertEqual(job.attempts, 1)
+        self.assertEqual(job.progress, 100)
         self.assertIsNotNone(job.sha256)
 
+        detail_response = self.client.get(f'/api/v1/exports/{job.id}')
+        self.assertEqual(detail_response.status_code, 200)
+        self.assertEqual(detail_response.json()['job']['status'], 'COMPLETED')
+        self.assertTrue(detail_response.json()['job']['sha256'])
+        self.assertEqual(detail_response.json()['download']['url'], 'http://example.com/presigned-download')
+
         dl_response = self.client.get(f'/api/v1/exports/{job.id}/download')
         self.assertEqual(dl_response.status_code, 200)
         self.assertEqual(dl_response.json()['url'], 'http://example.com/presigned-download')
 
+    @patch('apps.compliance.export_jobs.get_s3_client')
+    def test_export_worker_retries_then_fails(self, mock_s3_client):
+        mock_s3_client.side_effect = RuntimeError('minio unavailable')
+
+        response = self.client.post(f'/api/v1/exports/control/{self.control.id}', {}, format='json')
+        self.assertEqual(response.status_code, 202)
+
+        call_command('run_export_worker', '--once', '--max-attempts', '2', stdout=StringIO())
+        job = ExportJob.objects.get(pk=response.json()['job']['id'])
+        self.assertEqual(job.status, ExportJob.STATUS_FAILED)
+        self.assertEqual(job.attempts, 2)
+        self.assertEqual(job.error_text, 'minio unavailable')
+
+    def test_stale_jobs_are_judged_by_heartbeat(self):
+        response = self.client.post(f'/api/v1/exports/control/{self.control.id}', {}, format='json')
+        job = claim_next_export_job()
+        long_ago = timezone.now() - timedelta(hours=2)
+        ExportJob.objects.filter(pk=job.pk).update(started_at=long_ago, heartbeat_at=long_ago)
+
+        # A long-running export that still reports progress keeps its worker.
+        _progress_reporter(job)(10, 100)
+        self.assertEqual(requeue_stale_export_jobs(1800), (0, 0))
+        self.assertEqual(ExportJob.objects.get(pk=response.json()['job']['id']).status, ExportJob.STATUS_RUNNING)
+
+        ExportJob.objects.filter(pk=job.pk).update(heartbeat_at=long_ago)
+        self.assertEqual(requeue_stale_export_jobs(1800), (1, 0))
+        self.assertEqual(ExportJob.objects.get(pk=job.pk).status, ExportJob.STATUS_QUEUED)
+
+    def test_stale_job_out_of_attempts_is_failed(self):
+        self.client.post(f'/api/v1/exports/control/{self.control.id}', {}, format='json')
+        job = claim_next_export_job()
+        long_ago = timezone.now() - timedelta(hours=2)
+        ExportJob.objects.filter(pk=job.pk).update(heartbeat_at=long_ago, attempts=3)
+
+        self.assertEqual(requeue_stale_export_jobs(1800, max_attempts=3), (0, 1))
+        job.refresh_from_db()
+        self.assertEqual(job.status, ExportJob.STATUS_FAILED)
+        self.assertIsNotNone(job.completed_at)
+        self.assertIsNone(claim_next_export_job())
+
     def test_scheduled_recompute_flags_overdue_correctly(self):
         EvidenceRule.objects.create(
             standard_pack=self.pack,
@@ -214,34 +302,99 @@ class ComplianceEngineAndApiTests(TestCase):
         self.assertEqual(payload['totals']['READY'], 1)
         self.assertEqual(payload['totals']['OVERDUE'], 1)
 
-    @patch('apps.compliance.views.get_s3_client')
+        # Later status changes are applied to the rollups in place.
+        self._create_and_link_evidence(control=control2, event_date=timezone.localdate())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(f'/api/v1/controls/{control2.id}/status')
+        rollup = StatusRollup.objects.get(standard_pack=self.pack, section_code='ROM')
+        self.assertEqual((rollup.total, rollup.ready, rollup.overdue), (2, 2, 0))
+        payload = self.client.get('/api/v1/dashboard/summary').json()
+        self.assertEqual(payload['sections'], [{'section_code': 'ROM', 'total': 2, 'READY': 2, 'VERIFIED': 0, 'OVERDUE': 0}])
+
+    def test_cached_responses_revalidate_and_invalidate(self):
+        self._assign_role(self.user, 'AUDITOR')
+        EvidenceRule.objects.create(
+            standard_pack=self.pack,
+            scope_type=EvidenceRule.SCOPE_CONTROL,
+            control=self.control,
+            rule_type=EvidenceRule.RULE_FREQUENCY,
+            frequency_days=30,
+            min_items=1,
+            enabled=True,
+        )
+
+        for url in ['/api/v1/dashboard/summary', '/api/v1/alerts', '/api/v1/controls/']:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('Last-Modified', response)
+            etag = response['ETag']
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+            # The same second may hold later changes; only a later date is a match.
+            same_second = response['Last-Modified']
+            next_second = http_date(parse_http_date(same_second) + 1)
+            self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=same_second).status_code, 200)
+            self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=next_second).status_code, 304)
+            # If-None-Match wins over If-Modified-Since.
+            stale = self.client.get(url, HTTP_IF_NONE_MATCH='"stale"', HTTP_IF_MODIFIED_SINCE=next_second)
+            self.assertEqual(stale.status_code, 200)
+
+        etag = self.client.get('/api/v1/alerts')['ETag']
+        self._create_and_link_evidence(control=self.control, event_date=timezone.localdate() - timedelta(days=40))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(f'/api/v1/controls/{self.control.id}/status')
+
+        response = self.client.get('/api/v1/alerts', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([alert['alert_type'] for alert in response.json()], [ComplianceAlert.TYPE_OVERDUE])
+        self.assertEqual(self.client.get('/api/v1/dashboard/summary').json()['totals']['OVERDUE'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.control.indicator = 'Records are kept for five years'
+            self.control.save()
+        controls = self.client.get('/api/v1/controls/').json()['results']
+        self.assertEqual(controls[0]['indicator'], 'Records are kept for five years')
+
+    @patch('apps.compliance.export_jobs.get_s3_client')
     def test_section_export_creates_valid_export_job(self, mock_s3_client):
         dummy_s3 = DummyS3Client()
         mock_s3_client.return_value = dummy_s3
 
         self._create_and_link_evidence(control=self.control, event_date=timezone.localdate())
         response = self.client.post('/api/v1/exports/section/ROM', {}, format='json')
-        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.status_code, 202)
 
         payload = response.json()
         self.assertEqual(payload['job']['job_type'], ExportJob.JOB_SECTION_PACK)
-        self.assertEqual(payload['job']['status'], ExportJob.STATUS_COMPLETED)
+        self.assertEqual(payload['job']['status'], ExportJob.STATUS_QUEUED)
         self.assertIn('/sections/ROM/', payload['job']['object_key'])
 
-    @patch('apps.compliance.views.get_s3_client')
+        self._run_export_worker()
+        job = ExportJob.objects.get(pk=payload['job']['id'])
+        self.assertEqual(job.status, ExportJob.STATUS_COMPLETED)
+        self.assertEqual(dummy_s3.uploads[0][1], job.object_key)
+
+    @patch('apps.compliance.export_jobs.get_s3_client')
     def test_full_export_creates_valid_export_job(self, mock_s3_client):
         dummy_s3 = DummyS3Client()
         mock_s3_client.return_value = dummy_s3
 
         self._create_and_link_evidence(control=self.control, event_date=timezone.localdate())
         response = self.client.post('/api/v1/exports/full', {}, format='json')
-        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.status_code, 202)
 
         payload = response.json()
         self.assertEqual(payload['job']['job_type'], ExportJob.JOB_FULL_PACK)
-        self.assertEqual(payload['job']['status'], ExportJob.STATUS_COMPLETED)
+        self.assertEqual(payload['job']['status'], ExportJob.STATUS_QUEUED)
         self.assertIn('/full/', payload['job']['object_key'])
 
+        self._run_export_worker()
+        job = ExportJob.objects.get(pk=payload['job']['id'])
+        self.assertEqual(job.status, ExportJob.STATUS_COMPLETED)
+        payload_bytes = dummy_s3.uploads[0][3]
+        self.assertTrue(payload_bytes.startswith(b'%PDF'))
+        self.assertEqual(job.sha256, hashlib.sha256(payload_bytes).hexdigest())
+        self.assertEqual(job.size_bytes, len(payload_bytes))
+
     def test_control_note_crud(self):
         manager = User.objects.create_user(username='manager1', password='pass1234')
         self._assign_role(manager, 'MANAGER')
@@ -305,3 +458,402 @@ class ComplianceEngineAndApiTests(TestCase):
         self._assign_role(self.user, 'AUDITOR')
         alerts_response = self.client.get('/api/v1/alerts')
         self.assertEqual(alerts_response.status_code, 200)
+
+    def test_bulk_status_computation_matches_per_control_engine(self):
+        today = timezone.localdate()
+        controls = [self.control]
+        for index in range(2, 6):
+            controls.append(
+                Control.objects.create(
+                    standard_pack=self.pack,
+                    control_code=f'PHC-ROM-00{index}',
+                    section='Records',
+                    standard='Maintain records',
+                    indicator='Records are maintained',
+                    sort_order=index,
+                    active=True,
+                )
+            )
+
+        EvidenceRule.objects.create(
+            standard_pack=self.pack,
+            scope_type=EvidenceRule.SCOPE_SECTION,
+            section_code='ROM',
+            rule_type=EvidenceRule.RULE_FREQUENCY,
+            frequency_days=30,
+            min_items=1,
+            enabled=True,
+        )
+        EvidenceRule.objects.create(
+            standard_pack=self.pack,
+            scope_type=EvidenceRule.SCOPE_CONTROL,
+            control=controls[1],
+            rule_type=EvidenceRule.RULE_EXPIRY,
+            min_items=1,
+            requires_verification=True,
+            enabled=True,
+        )
+        EvidenceRule.objects.create(
+            standard_pack=self.pack,
+            scope_type=EvidenceRule.SCOPE_CONTROL,
+            control=controls[2],
+            rule_type=EvidenceRule.RULE_COUNT_IN_WINDOW,
+            window_days=60,
+            min_items=2,
+            acceptable_categories=['policy'],
+            enabled=True,
+        )
+
+        self._create_and_link_evidence(control=controls[0], event_date=today - timedelta(days=3))
+        self._create_and_link_evidence(control=controls[1], event_date=today, valid_until=today + timedelta(days=10))
+        self._create_and_link_evidence(control=controls[2], event_date=today - timedelta(days=90))
+        self._create_and_link_evidence(control=controls[2], event_date=today - timedelta(days=10))
+        self._create_and_link_evidence(control=controls[3], event_date=today - timedelta(days=45))
+        self.client.post(f'/api/v1/controls/{controls[1].id}/verify', {}, format='json')
+
+        expected = {control.id: compute_control_status(control) for control in controls}
+        with self.assertNumQueries(4):
+            actual = compute_control_statuses(controls)
+        self.assertEqual(actual, expected)
+        self.assertEqual(actual[controls[1].id]['computed_status'], 'VERIFIED')
+        self.assertEqual(actual[controls[4].id]['computed_status'], 'NOT_STARTED')
+
+    def test_rule_index_is_reused_until_rules_change(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            rule = EvidenceRule.objects.create(
+                standard_pack=self.pack,
+                scope_type=EvidenceRule.SCOPE_SECTION,
+                section_code='ROM',
+                rule_type=EvidenceRule.RULE_ONE_TIME,
+                min_items=1,
+                acceptable_categories=['policy', 'sop'],
+                enabled=True,
+            )
+
+        index = get_rule_index(self.pack.id)
+        # Only the version is read while the rules are unchanged, once per batch.
+        with self.assertNumQueries(1):
+            self.assertIs(get_rule_index(self.pack.id), index)
+            rules = index.rules_for(self.control.id, self.control.section_code)
+        with self.assertNumQueries(1), batch_rule_indexes():
+            for _control in range(3):
+                self.assertIs(get_rule_index(self.pack.id), index)
+        self.assertEqual([compiled.id for compiled in rules], [rule.id])
+        self.assertEqual(rules[0].acceptable_categories, frozenset({'policy', 'sop'}))
+
+        version = EvidenceRuleVersion.objects.get(standard_pack=self.pack).version
+        with self.captureOnCommitCallbacks(execute=True):
+            rule.enabled = False
+            rule.save()
+        self.assertEqual(EvidenceRuleVersion.objects.get(standard_pack=self.pack).version, version + 1)
+        self.assertEqual(get_rule_index(self.pack.id).rules_for(self.control.id, 'ROM'), ())
+
+        # An uncommitted rule change is seen by its own transaction, even
+        # inside a batch that already looked the pack up, but not cached.
+        with batch_rule_indexes():
+            get_rule_index(self.pack.id)
+            EvidenceRule.objects.create(
+                standard_pack=self.pack,
+                scope_type=EvidenceRule.SCOPE_CONTROL,
+                control=self.control,
+                rule_type=EvidenceRule.RULE_ONE_TIME,
+                min_items=1,
+                enabled=True,
+            )
+            self.assertEqual(len(get_rule_index(self.pack.id).rules_for(self.control.id, 'ROM')), 1)
+        for _attempt in range(2):
+            with self.assertNumQueries(2):
+                self.assertEqual(len(get_rule_index(self.pack.id).rules_for(self.control.id, 'ROM')), 1)
+
+    def test_bulk_persist_writes_caches_and_alert_transitions(self):
+        today = timezone.localdate()
+        controls = [self.control] + [
+            Control.objects.create(
+                standard_pack=self.pack,
+                control_code=f'PHC-ROM-00{index}',
+                section='Records',
+                standard='Maintain records',
+                indicator='Records are maintained',
+                sort_order=index,
+                active=True,
+            )
+            for index in range(2, 5)
+        ]
+        EvidenceRule.objects.create(
+            standard_pack=self.pack,
+            scope_type=EvidenceRule.SCOPE_SECTION,
+            section_code='ROM',
+            rule_type=EvidenceRule.RULE_FREQUENCY,
+            frequency_days=30,
+            min_items=1,
+            enabled=True,
+        )
+        self._create_and_link_evidence(control=controls[0], event_date=today - timedelta(days=40))
+        self._create_and_link_evidence(control=controls[1], event_date=today - timedelta(days=20))
+        ControlStatusCache.objects.all().delete()
+        ComplianceAlert.objects.all().delete()
+
+        computed = compute_control_statuses(controls)
+        with self.assertNumQueries(5):
+            caches = persist_computed_statuses(computed.values())
+        self.assertEqual(len(caches), 4)
+        self.assertEqual(ControlStatusCache.objects.get(control=controls[0]).computed_status, 'OVERDUE')
+        self.assertEqual(
+            set(ComplianceAlert.objects.filter(cleared_at__isnull=True).values_list('control_id', 'alert_type')),
+            {(controls[0].id, 'OVERDUE'), (controls[1].id, 'NEAR_DUE')},
+        )
+
+        self._create_and_link_evidence(control=controls[0], event_date=today)
+        persist_computed_statuses(compute_control_statuses(controls).values())
+        self.assertEqual(ControlStatusCache.objects.count(), 4)
+        self.assertEqual(ControlStatusCache.objects.get(control=controls[0]).computed_status, 'READY')
+        self.assertEqual(
+            set(ComplianceAlert.objects.filter(cleared_at__isnull=True).values_list('control_id', 'alert_type')),
+            {(controls[1].id, 'NEAR_DUE')},
+        )
+
+    def test_dirty_tracking_recomputes_only_affected_controls(self):
+        today = timezone.localdate()
+        control2 = Control.objects.create(
+            standard_pack=self.pack,
+            control_code='PHC-ROM-002',
+            section='Records',
+            standard='Maintain register',
+            indicator='Register present',
+            sort_order=2,
+            active=True,
+        )
+        evidence = self._create_and_link_evidence(control=self.control, event_date=today)
+        self.assertEqual(
+            DirtyControl.objects.get(control=self.control).reason,
+            DirtyControl.REASON_LINK,
+        )
+        self.assertFalse(DirtyControl.objects.filter(control=control2).exists())
+
+        self.assertEqual(process_dirty_controls(), 1)
+        self.assertFalse(DirtyControl.objects.exists())
+        self.assertEqual(ControlStatusCache.objects.get(control=self.control).computed_status, 'IN_PROGRESS')
+        self.assertFalse(ControlStatusCache.objects.filter(control=control2).exists())
+
+        rule = EvidenceRule.objects.create(
+            standard_pack=self.pack,
+            scope_type=EvidenceRule.SCOPE_SECTION,
+            section_code='ROM',
+            rule_type=EvidenceRule.RULE_FREQUENCY,
+            frequency_days=30,
+            min_items=1,
+            enabled=True,
+        )
+        self.assertEqual(set(DirtyControl.objects.values_list('control_id', flat=True)), {self.control.id, control2.id})
+        process_dirty_controls()
+        self.assertEqual(ControlStatusCache.objects.get(control=self.control).computed_status, 'READY')
+
+        evidence.event_date = today - timedelta(days=60)
+        evidence.save()
+        self.assertEqual(list(DirtyControl.objects.values_list('control_id', flat=True)), [self.control.id])
+        process_dirty_controls()
+        self.assertEqual(ControlStatusCache.objects.get(control=self.control).computed_status, 'OVERDUE')
+
+        rule.enabled = False
+        rule.save()
+        link = self.control.evidence_links.get()
+        unlink_response = self.client.delete(f'/api/v1/controls/{self.control.id}/unlink-evidence/{link.id}')
+        self.assertEqual(unlink_response.status_code, 204)
+        self.assertEqual(DirtyControl.objects.get(control=self.control).reason, DirtyControl.REASON_UNLINK)
+        call_command('process_dirty_controls', stdout=StringIO())
+        self.assertEqual(ControlStatusCache.objects.get(control=self.control).computed_status, 'NOT_STARTED')
+        self.assertFalse(DirtyControl.objects.exists())
+
+    def test_status_get_serves_fresh_cache_without_writes(self):
+        self._create_and_link_evidence(control=self.control, event_date=timezone.localdate())
+        first = self.client.get(f'/api/v1/controls/{self.control.id}/status')
+        self.assertEqual(first.json()['computed_status'], 'IN_PROGRESS')
+
+        with self.assertNumQueries(1):
+            cached = self.client.get(f'/api/v1/controls/{self.control.id}/status')
+        self.assertEqual(cached.json()['computed_at'], first.json()['computed_at'])
+
+        refreshed = self.client.get(f'/api/v1/controls/{self.control.id}/status?refresh=1')
+        self.assertNotEqual(refreshed.json()['computed_at'], first.json()['computed_at'])
+
+        EvidenceRule.objects.create(
+            standard_pack=self.pack,
+            scope_type=EvidenceRule.SCOPE_CONTROL,
+            control=self.control,
+            rule_type=EvidenceRule.RULE_ONE_TIME,
+            min_items=1,
+            enabled=True,
+        )
+        DirtyControl.objects.all().delete()
+        stale = self.client.get(f'/api/v1/controls/{self.control.id}/status')
+        self.assertEqual(stale.json()['computed_status'], 'READY')
+
+    def test_parallel_pdf_render_matches_serial_page_count(self):
+        controls = [self.control]
+        for index in range(2, 6):
+            controls.append(Control.objects.create(
+                standard_pack=self.pack,
+                control_code=f'PHC-ROM-00{index}',
+                section='Records',
+                standard='Maintain records',
+                indicator='Records are maintained',
+                sort_order=index,
+                active=True,
+            ))
+        self._create_and_link_evidence(control=self.control, event_date=timezone.localdate())
+
+        with self.assertNumQueries(10):
+            snapshots = build_control_snapshots(controls)
+        self.assertEqual([item.control_code for item in snapshots], [control.control_code for control in controls])
+        self.assertEqual(len(snapshots[0].evidence_rows), 1)
+
+        serial_progress, parallel_progress = [], []
+        serial = generate_controls_pdf_bytes(
+            self.pack, controls, 'Full Pack', section_code='ROM',
+            progress_callback=lambda done, total: serial_progress.append(done * 100 // total),
+        )
+        with self.settings(EXPORT_RENDER_WORKERS=2, EXPORT_RENDER_CHUNK_SIZE=2):
+            parallel = generate_controls_pdf_bytes(
+                self.pack, controls, 'Full Pack', section_code='ROM',
+                progress_callback=lambda done, total: parallel_progress.append(done * 100 // total),
+            )
+        # Loading snapshots fills a fifth of the bar; rendering moves it the rest of the way.
+        self.assertEqual(serial_progress[0], 20)
+        self.assertEqual(serial_progress[1:], [36, 52, 68, 84, 100])
+        self.assertEqual(parallel_progress, [20, 52, 84, 100])
+
+        serial_reader = PdfReader(BytesIO(serial))
+        parallel_reader = PdfReader(BytesIO(parallel))
+        self.assertEqual(len(parallel_reader.pages), len(serial_reader.pages))
+        last_page = len(parallel_reader.pages)
+        self.assertIn(f'Page {last_page} of {last_page}', parallel_reader.pages[-1].extract_text())
+        self.assertIn(f'Page 2 of {last_page}', serial_reader.pages[1].extract_text())
+
+    @patch('apps.evidence.presign.get_s3_client')
+    @patch('apps.compliance.export_jobs.get_s3_client')
+    def test_unchanged_export_reuses_completed_object(self, mock_worker_s3_client, mock_s3_client):
+        dummy_s3 = DummyS3Client()
+        mock_worker_s3_client.return_value = dummy_s3
+        mock_s3_client.return_value = dummy_s3
+
+        self._create_and_link_evidence(control=self.control, event_date=timezone.localdate())
+        first = self.client.post('/api/v1/exports/full', {}, format='json')
+        self.assertEqual(first.status_code, 202)
+        self._run_export_worker()
+        source = ExportJob.objects.get(pk=first.json()['job']['id'])
+
+        reused = self.client.post('/api/v1/exports/full', {}, format='json')
+        self.assertEqual(reused.status_code, 200)
+        payload = reused.json()
+        self.assertNotEqual(payload['job']['id'], str(source.id))
+        self.assertEqual(payload['job']['status'], ExportJob.STATUS_COMPLETED)
+        self.assertEqual(payload['job']['object_key'], source.object_key)
+        self.assertEqual(payload['job']['sha256'], source.sha256)
+        self.assertIn('url', payload['download'])
+        self.assertEqual(len(dummy_s3.uploads), 1)
+
+        forced = self.client.post('/api/v1/exports/full', {'force': True}, format='json')
+        self.assertEqual(forced.status_code, 202)
+
+        self._create_and_link_evidence(control=self.control, event_date=timezone.localdate())
+        changed = self.client.post('/api/v1/exports/full', {}, format='json')
+        self.assertEqual(changed.status_code, 202)
+        self.assertNotEqual(changed.json()['job']['fingerprint'], source.fingerprint)
+
+
+# The in-memory SQLite test database locks whole tables across threads.
+@skipUnless(connection.vendor == 'postgresql', 'needs row locks')
+class StatusRollupConcurrencyTests(TransactionTestCase):
+    def test_concurrent_first_loads_build_rollups_once(self):
+        pack = StandardPack.objects.create(
+            authority_code='PHC',
+            name='PHC Lab Licensing Checklist',
+            version='1.0',
+            status='draft',
+            checksum='rollup-concurrency-checksum',
+        )
+        for index, control_code in enumerate(['PHC-ROM-001', 'PHC-ROM-002', 'PHC-SAF-003'], start=1):
+            Control.objects.create(
+                standard_pack=pack,
+                control_code=control_code,
+                section='Section',
+                standard='Standard',
+                indicator='Indicator',
+                sort_order=index,
+                active=True,
+            )
+
+        # Both requests find no rollups before either starts building them.
+        both_missing = threading.Barrier(2)
+        rebuild = rollups.rebuild_status_rollups
+        results, errors = [], []
+
+        def rebuild_after_barrier(pack_id):
+            both_missing.wait(timeout=5)
+            return rebuild(pack_id)
+
+        def load():
+            try:
+                results.append([(row.section_code, row.total) for row in rollups.get_status_rollups(pack)])
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        with patch('apps.compliance.rollups.rebuild_status_rollups', side_effect=rebuild_after_barrier):
+            threads = [threading.Thread(target=load) for _ in range(2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(results, [[('ROM', 2), ('SAF', 1)]] * 2)
+        self.assertEqual(StatusRollup.objects.filter(standard_pack=pack).count(), 2)
+
+
+class RuleKernelParityTests(SimpleTestCase):
+    def test_columnar_kernel_matches_evaluate_rule(self):
+        rng = random.Random(20260101)
+        today = timezone.localdate()
+        categories = ['policy', 'sop', 'certificate', 'log']
+        subtypes = [None, 'annual', 'calibration']
+        rule_shapes = [
+            (EvidenceRule.RULE_ONE_TIME, {}),
+            (EvidenceRule.RULE_FREQUENCY, {'frequency_days': 30}),
+            (EvidenceRule.RULE_ROLLING_WINDOW, {'window_days': 90}),
+            (EvidenceRule.RULE_COUNT_IN_WINDOW, {'window_days': 60}),
+            (EvidenceRule.RULE_EXPIRY, {}),
+        ]
+
+        columns = EvidenceColumns()
+        for _control in range(200):
+            evidence_items = [
+                SimpleNamespace(
+                    event_date=today - timedelta(days=rng.randint(0, 400)),
+                    valid_until=rng.choice([None, today + timedelta(days=rng.randint(-60, 60))]),
+                    category=rng.choice(categories),
+                    subtype=rng.choice(subtypes),
+                )
+                for _item in range(rng.randint(0, 8))
+            ]
+            rules = []
+            for position in range(rng.randint(1, 5)):
+                rule_type, days = rng.choice(rule_shapes)
+                rules.append(CompiledRule(
+                    id=uuid.uuid4(),
+                    position=position,
+                    rule_type=rule_type,
+                    min_items=rng.randint(1, 3),
+                    frequency_days=days.get('frequency_days'),
+                    window_days=days.get('window_days'),
+                    requires_verification=False,
+                    acceptable_categories=frozenset(rng.sample(categories + ['unused'], rng.randint(0, 2))),
+                    acceptable_subtypes=frozenset(rng.sample(subtypes, rng.randint(0, 1))),
+                ))
+
+            slot = columns.add(evidence_items)
+            self.assertEqual(
+                evaluate_rules(columns, slot, rules, today),
+                [evaluate_rule(rule, evidence_items, today) for rule in rules],
+            )
@@ -10,6 +10,7 @@ from apps.compliance.views import (
     ControlVerifyView,
     DashboardSummaryView,
     ExportDownloadView,
+    ExportJobDetailView,
     FullPackExportView,
     SectionExportView,
 )
@@ -25,5 +26,6 @@ urlpatterns = [
     path('exports/control/<int:control_id>', ControlExportView.as_view(), name='control-export'),
     path('exports/section/<str:section_code>', SectionExportView.as_view(), name='section-export'),
     path('exports/full', FullPackExportView.as_view(), name='full-export'),
+    path('exports/<uuid:job_id>', ExportJobDetailView.as_view(), name='export-job-detail'),
     path('exports/<uuid:job_id>/download', ExportDownloadView.as_view(), name='export-download'),
 ]
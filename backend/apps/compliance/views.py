@@ -1,9 +1,6 @@
-import hashlib
-import io
 from datetime import timedelta
 
-from django.conf import settings
-from django.db.models import Max
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from rest_framework import status
@@ -13,9 +10,16 @@ from apps.users.permissions import CanExport, CanVerifyControls, CanViewAudit
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from apps.compliance.engine import get_section_code_from_control, recompute_and_persist
-from apps.compliance.export_service import generate_control_pdf_bytes, generate_controls_pdf_bytes
+from apps.compliance.export_jobs import enqueue_export_job, section_controls
+from apps.compliance.invalidation import (
+    batch_dirty_marking,
+    get_status_cache,
+    recompute_controls,
+    status_freshness_annotations,
+)
 from apps.compliance.models import ComplianceAlert, ControlNote, ControlStatusCache, ControlVerification, ExportJob
+from apps.compliance.response_cache import cached_response, get_version
+from apps.compliance.rollups import STATUS_FIELDS, get_status_rollups
 from apps.compliance.serializers import (
     ComplianceAlertSerializer,
     ControlNoteSerializer,
@@ -24,26 +28,27 @@ from apps.compliance.serializers import (
     ExportJobSerializer,
 )
 from apps.evidence.models import ControlEvidenceLink
-from apps.evidence.storage import get_s3_client
+from apps.evidence.presign import DEFAULT_EXPIRES_IN, presign_get_object
 from apps.evidence.utils import create_audit_event
 from apps.standards.models import Control, StandardPack
 
 
-def _ensure_bucket_exists(s3_client, bucket_name: str):
-    try:
-        s3_client.head_bucket(Bucket=bucket_name)
-    except Exception:
-        s3_client.create_bucket(Bucket=bucket_name)
+def _export_download_payload(bucket: str, object_key: str):
+    expires_in = DEFAULT_EXPIRES_IN
+    return {'url': presign_get_object(bucket, object_key, expires_in), 'expires_in': expires_in}
+
+
+def _is_truthy(value) -> bool:
+    return str(value).lower() in {'1', 'true', 'yes'}
 
 
-def _export_download_payload(s3_client, bucket: str, object_key: str):
-    expires_in = 600
-    download_url = s3_client.generate_presigned_url(
-        'get_object',
-        Params={'Bucket': bucket, 'Key': object_key},
-        ExpiresIn=expires_in,
-    )
-    return {'url': download_url, 'expires_in': expires_in}
+def _export_job_response(job: ExportJob):
+    """202 for queued jobs; jobs served from the export cache are complete and downloadable straight away."""
+    payload = {'job': ExportJobSerializer(job).data}
+    if job.status != ExportJob.STATUS_COMPLETED:
+        return Response(payload, status=status.HTTP_202_ACCEPTED)
+    payload['download'] = _export_download_payload(job.bucket, job.object_key)
+    return Response(payload, status=status.HTTP_200_OK)
 
 
 def _latest_pack_or_404():
@@ -53,43 +58,16 @@ def _latest_pack_or_404():
     return pack
 
 
-def _run_export_job(request, job: ExportJob, object_key: str, pdf_bytes: bytes):
-    s3_client = get_s3_client()
-    _ensure_bucket_exists(s3_client, job.bucket)
-    s3_client.upload_fileobj(
-        io.BytesIO(pdf_bytes),
-        job.bucket,
-        object_key,
-        ExtraArgs={'ContentType': 'application/pdf'},
-    )
-
-    job.status = ExportJob.STATUS_COMPLETED
-    job.completed_at = timezone.now()
-    job.object_key = object_key
-    job.sha256 = hashlib.sha256(pdf_bytes).hexdigest()
-    job.size_bytes = len(pdf_bytes)
-    job.save(update_fields=['status', 'completed_at', 'object_key', 'sha256', 'size_bytes'])
-
-    create_audit_event(
-        request=request,
-        action='EXPORT_CREATED',
-        entity_type='ExportJob',
-        entity_id=job.id,
-        after_json=ExportJobSerializer(job).data,
-    )
-
-    return {
-        'job': ExportJobSerializer(job).data,
-        'download': _export_download_payload(s3_client, job.bucket, object_key),
-    }
-
-
 class ControlStatusView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, control_id):
-        control = get_object_or_404(Control, pk=control_id)
-        cache = recompute_and_persist(control)
+        control = get_object_or_404(
+            Control.objects.select_related('status_cache').annotate(**status_freshness_annotations()),
+            pk=control_id,
+        )
+        refresh = _is_truthy(request.query_params.get('refresh', ''))
+        cache = get_status_cache(control, refresh=refresh)
         return Response(ControlStatusCacheSerializer(cache).data, status=status.HTTP_200_OK)
 
 
@@ -108,22 +86,28 @@ class ControlVerifyView(APIView):
             .first()
         )
 
-        verification = ControlVerification.objects.create(
-            control=control,
-            status=self.verification_status,
-            remarks=request.data.get('remarks'),
-            verified_by=(request.user if request.user.is_authenticated else None),
-            evidence_snapshot_at=latest_linked_at,
-        )
-        create_audit_event(
-            request=request,
-            action=self.audit_action,
-            entity_type='ControlVerification',
-            entity_id=verification.id,
-            after_json=ControlVerificationSerializer(verification).data,
-        )
+        # The verification marks the control dirty (signals) like a link does.
+        with transaction.atomic(), batch_dirty_marking() as affected:
+            verification = ControlVerification.objects.create(
+                control=control,
+                status=self.verification_status,
+                remarks=request.data.get('remarks'),
+                verified_by=(request.user if request.user.is_authenticated else None),
+                evidence_snapshot_at=latest_linked_at,
+            )
+            create_audit_event(
+                request=request,
+                action=self.audit_action,
+                entity_type='ControlVerification',
+                entity_id=verification.id,
+                after_json=ControlVerificationSerializer(verification).data,
+            )
+            affected_ids = set(affected)
 
-        cache = recompute_and_persist(control)
+        # The response carries the resulting status, which the reviewer acts on
+        # straight away, so the marked control is recomputed now instead of
+        # waiting for process_dirty_controls.
+        cache = recompute_controls(affected_ids | {control.id})[control.id]
         return Response(
             {
                 'verification': ControlVerificationSerializer(verification).data,
@@ -151,40 +135,14 @@ class ControlExportView(APIView):
 
     def post(self, request, control_id):
         control = get_object_or_404(Control, pk=control_id)
-        pack = control.standard_pack
-        bucket = getattr(settings, 'MINIO_BUCKET_EXPORTS', 'exports')
-        placeholder_key = f"exports/pending/{timezone.now().strftime('%Y%m%d%H%M%S')}-{control.id}.pdf"
-
-        job = ExportJob.objects.create(
+        job = enqueue_export_job(
+            request=request,
             job_type=ExportJob.JOB_CONTROL_PDF,
-            status=ExportJob.STATUS_RUNNING,
-            standard_pack=pack,
+            pack=control.standard_pack,
             control=control,
-            filters_json={},
-            created_by=(request.user if request.user.is_authenticated else None),
-            bucket=bucket,
-            object_key=placeholder_key,
-            filename=f'{control.control_code}-evidence-pack.pdf',
+            force=_is_truthy(request.data.get('force', '')),
         )
-        object_key = f'exports/{pack.authority_code}/{pack.version}/controls/{control.control_code}/{job.id}.pdf'
-
-        try:
-            payload = _run_export_job(
-                request=request,
-                job=job,
-                object_key=object_key,
-                pdf_bytes=generate_control_pdf_bytes(control),
-            )
-            return Response(payload, status=status.HTTP_201_CREATED)
-        except Exception as exc:
-            job.status = ExportJob.STATUS_FAILED
-            job.error_text = str(exc)
-            job.completed_at = timezone.now()
-            job.save(update_fields=['status', 'error_text', 'completed_at'])
-            return Response(
-                {'detail': 'Export failed', 'job': ExportJobSerializer(job).data},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            )
+        return _export_job_response(job)
 
 
 class SectionExportView(APIView):
@@ -196,43 +154,17 @@ class SectionExportView(APIView):
             return Response({'detail': 'No standard pack found'}, status=status.HTTP_404_NOT_FOUND)
 
         normalized_code = section_code.strip().upper()
-        controls = list(pack.controls.filter(control_code__icontains=f'-{normalized_code}-').order_by('sort_order'))
-        if not controls:
+        if not section_controls(pack, normalized_code).exists():
             return Response({'detail': 'No controls found for section'}, status=status.HTTP_404_NOT_FOUND)
 
-        bucket = getattr(settings, 'MINIO_BUCKET_EXPORTS', 'exports')
-        placeholder_key = f"exports/pending/{timezone.now().strftime('%Y%m%d%H%M%S')}-section-{normalized_code}.pdf"
-        job = ExportJob.objects.create(
+        job = enqueue_export_job(
+            request=request,
             job_type=ExportJob.JOB_SECTION_PACK,
-            status=ExportJob.STATUS_RUNNING,
-            standard_pack=pack,
+            pack=pack,
             section_code=normalized_code,
-            filters_json={'section_code': normalized_code},
-            created_by=(request.user if request.user.is_authenticated else None),
-            bucket=bucket,
-            object_key=placeholder_key,
-            filename=f'{pack.authority_code}-{pack.version}-section-{normalized_code}.pdf',
+            force=_is_truthy(request.data.get('force', '')),
         )
-        object_key = f'exports/{pack.authority_code}/{pack.version}/sections/{normalized_code}/{job.id}.pdf'
-
-        try:
-            pdf_bytes = generate_controls_pdf_bytes(
-                pack=pack,
-                controls=controls,
-                title=f'Section Pack - {normalized_code}',
-                section_code=normalized_code,
-            )
-            payload = _run_export_job(request=request, job=job, object_key=object_key, pdf_bytes=pdf_bytes)
-            return Response(payload, status=status.HTTP_201_CREATED)
-        except Exception as exc:
-            job.status = ExportJob.STATUS_FAILED
-            job.error_text = str(exc)
-            job.completed_at = timezone.now()
-            job.save(update_fields=['status', 'error_text', 'completed_at'])
-            return Response(
-                {'detail': 'Section export failed', 'job': ExportJobSerializer(job).data},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            )
+        return _export_job_response(job)
 
 
 class FullPackExportView(APIView):
@@ -243,41 +175,27 @@ class FullPackExportView(APIView):
         if pack is None:
             return Response({'detail': 'No standard pack found'}, status=status.HTTP_404_NOT_FOUND)
 
-        controls = list(pack.controls.order_by('sort_order'))
-        if not controls:
+        if not pack.controls.exists():
             return Response({'detail': 'No controls found in selected pack'}, status=status.HTTP_404_NOT_FOUND)
 
-        bucket = getattr(settings, 'MINIO_BUCKET_EXPORTS', 'exports')
-        placeholder_key = f"exports/pending/{timezone.now().strftime('%Y%m%d%H%M%S')}-full.pdf"
-        job = ExportJob.objects.create(
+        job = enqueue_export_job(
+            request=request,
             job_type=ExportJob.JOB_FULL_PACK,
-            status=ExportJob.STATUS_RUNNING,
-            standard_pack=pack,
-            filters_json={},
-            created_by=(request.user if request.user.is_authenticated else None),
-            bucket=bucket,
-            object_key=placeholder_key,
-            filename=f'{pack.authority_code}-{pack.version}-full-pack.pdf',
+            pack=pack,
+            force=_is_truthy(request.data.get('force', '')),
         )
-        object_key = f'exports/{pack.authority_code}/{pack.version}/full/{job.id}.pdf'
+        return _export_job_response(job)
 
-        try:
-            pdf_bytes = generate_controls_pdf_bytes(
-                pack=pack,
-                controls=controls,
-                title=f'Full Pack - {pack.authority_code} {pack.version}',
-            )
-            payload = _run_export_job(request=request, job=job, object_key=object_key, pdf_bytes=pdf_bytes)
-            return Response(payload, status=status.HTTP_201_CREATED)
-        except Exception as exc:
-            job.status = ExportJob.STATUS_FAILED
-            job.error_text = str(exc)
-            job.completed_at = timezone.now()
-            job.save(update_fields=['status', 'error_text', 'completed_at'])
-            return Response(
-                {'detail': 'Full export failed', 'job': ExportJobSerializer(job).data},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            )
+
+class ExportJobDetailView(APIView):
+    permission_classes = [CanExport]
+
+    def get(self, request, job_id):
+        job = get_object_or_404(ExportJob, pk=job_id)
+        payload = {'job': ExportJobSerializer(job).data}
+        if job.status == ExportJob.STATUS_COMPLETED:
+            payload['download'] = _export_download_payload(job.bucket, job.object_key)
+        return Response(payload, status=status.HTTP_200_OK)
 
 
 class ExportDownloadView(APIView):
@@ -288,8 +206,7 @@ class ExportDownloadView(APIView):
         if job.status != ExportJob.STATUS_COMPLETED:
             return Response({'detail': 'Export is not completed.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        s3_client = get_s3_client()
-        return Response(_export_download_payload(s3_client, job.bucket, job.object_key), status=status.HTTP_200_OK)
+        return Response(_export_download_payload(job.bucket, job.object_key), status=status.HTTP_200_OK)
 
 
 class DashboardSummaryView(APIView):
@@ -300,83 +217,81 @@ class DashboardSummaryView(APIView):
         if pack is None:
             return Response({'detail': 'No standard pack found'}, status=status.HTTP_404_NOT_FOUND)
 
-        controls = list(pack.controls.select_related('status_cache').order_by('sort_order'))
         today = timezone.localdate()
-        near_due_cutoff = today + timedelta(days=14)
-
-        totals = {
-            'total_controls': len(controls),
-            'NOT_STARTED': 0,
-            'IN_PROGRESS': 0,
-            'READY': 0,
-            'VERIFIED': 0,
-            'OVERDUE': 0,
-            'NEAR_DUE': 0,
-        }
-        section_totals = {}
-        upcoming_due = []
-
-        for control in controls:
-            cache = getattr(control, 'status_cache', None)
-            status_name = cache.computed_status if cache else 'NOT_STARTED'
-            totals[status_name] = totals.get(status_name, 0) + 1
-
-            section_code = get_section_code_from_control(control.control_code)
-            if section_code not in section_totals:
-                section_totals[section_code] = {
-                    'section_code': section_code,
-                    'total': 0,
-                    'READY': 0,
-                    'VERIFIED': 0,
-                    'OVERDUE': 0,
-                }
-            section_totals[section_code]['total'] += 1
-            if status_name in ('READY', 'VERIFIED', 'OVERDUE'):
-                section_totals[section_code][status_name] += 1
-
-            if cache and cache.next_due_date and status_name != 'OVERDUE' and today <= cache.next_due_date <= near_due_cutoff:
-                totals['NEAR_DUE'] += 1
-                upcoming_due.append(
-                    {
-                        'control_id': control.id,
-                        'control_code': control.control_code,
-                        'section_code': section_code,
-                        'next_due_date': cache.next_due_date,
-                    }
-                )
-
-        last_computed_at = (
-            ControlStatusCache.objects
-            .filter(control__standard_pack=pack)
-            .aggregate(value=Max('computed_at'))
-            .get('value')
+        # Near-due counts move with the date even when nothing is written.
+        return cached_response(
+            request,
+            'dashboard-summary',
+            get_version(pack.pk),
+            lambda: self.build_summary(pack, today),
+            vary=today.isoformat(),
         )
 
-        upcoming_due.sort(key=lambda row: row['next_due_date'])
+    def build_summary(self, pack, today):
+        rollups = get_status_rollups(pack)
+        near_due_cutoff = today + timedelta(days=14)
 
-        return Response(
+        totals = {'total_controls': sum(rollup.total for rollup in rollups)}
+        for status_name, field in STATUS_FIELDS.items():
+            totals[status_name] = sum(getattr(rollup, field) for rollup in rollups)
+        sections = [
             {
-                'pack_version': pack.version,
-                'totals': totals,
-                'sections': sorted(section_totals.values(), key=lambda row: row['section_code']),
-                'upcoming_due': upcoming_due[:20],
-                'last_computed_at': last_computed_at,
-            },
-            status=status.HTTP_200_OK,
+                'section_code': rollup.section_code,
+                'total': rollup.total,
+                'READY': rollup.ready,
+                'VERIFIED': rollup.verified,
+                'OVERDUE': rollup.overdue,
+            }
+            for rollup in rollups
+        ]
+
+        # Near-due depends on today's date, so it is read from the indexed
+        # next_due_date column instead of being kept in the rollups.
+        near_due = (
+            ControlStatusCache.objects
+            .filter(control__standard_pack=pack, next_due_date__range=(today, near_due_cutoff))
+            .exclude(computed_status='OVERDUE')
         )
+        totals['NEAR_DUE'] = near_due.count()
+        upcoming_due = [
+            {
+                'control_id': control_id,
+                'control_code': control_code,
+                'section_code': section_code,
+                'next_due_date': next_due_date,
+            }
+            for control_id, control_code, section_code, next_due_date in (
+                near_due
+                .order_by('next_due_date', 'control__sort_order')
+                .values_list('control_id', 'control__control_code', 'control__section_code', 'next_due_date')[:20]
+            )
+        ]
+        computed_times = [rollup.last_computed_at for rollup in rollups if rollup.last_computed_at]
+        last_computed_at = max(computed_times) if computed_times else None
+
+        return {
+            'pack_version': pack.version,
+            'totals': totals,
+            'sections': sections,
+            'upcoming_due': upcoming_due,
+            'last_computed_at': last_computed_at,
+        }
 
 
 class AlertsListView(APIView):
     permission_classes = [CanViewAudit]
 
     def get(self, request):
+        return cached_response(request, 'alerts', get_version(), self.build_alerts)
+
+    def build_alerts(self):
         alerts = (
             ComplianceAlert.objects
             .filter(cleared_at__isnull=True)
             .select_related('control')
             .order_by('-triggered_at')
         )
-        return Response(ComplianceAlertSerializer(alerts, many=True).data, status=status.HTTP_200_OK)
+        return ComplianceAlertSerializer(alerts, many=True).data
 
 
 class ControlNotesView(APIView):
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import EvidenceItem, EvidenceFile, ControlEvidenceLink
+from .models import EvidenceBlob, EvidenceItem, EvidenceFile, ControlEvidenceLink
 
 
 @admin.register(EvidenceItem)
@@ -17,6 +17,13 @@ class EvidenceFileAdmin(admin.ModelAdmin):
     readonly_fields = ['uploaded_at']
 
 
+@admin.register(EvidenceBlob)
+class EvidenceBlobAdmin(admin.ModelAdmin):
+    list_display = ['sha256', 'size_bytes', 'ref_count', 'created_at']
+    search_fields = ['sha256', 'object_key']
+    readonly_fields = ['sha256', 'bucket', 'object_key', 'size_bytes', 'ref_count', 'created_at']
+
+
 @admin.register(ControlEvidenceLink)
 class ControlEvidenceLinkAdmin(admin.ModelAdmin):
     list_display = ['control', 'evidence_item', 'linked_at']
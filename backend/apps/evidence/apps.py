@@ -5,3 +5,6 @@ class EvidenceConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.evidence'
     verbose_name = 'Evidence'
+
+    def ready(self):
+        from apps.evidence import signals  # noqa: F401
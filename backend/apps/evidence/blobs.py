@@ -0,0 +1,92 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import EvidenceBlob, EvidenceFile
+from .storage import get_s3_client
+
+
+def _delete_object_on_commit(bucket: str, object_key: str):
+    def delete():
+        try:
+            get_s3_client().delete_object(Bucket=bucket, Key=object_key)
+        except Exception:
+            pass
+
+    transaction.on_commit(delete)
+
+
+def find_blob(sha256: str, size_bytes: int) -> EvidenceBlob | None:
+    return EvidenceBlob.objects.filter(sha256=sha256, size_bytes=size_bytes).first()
+
+
+def acquire_blob(sha256: str, size_bytes: int, bucket: str, object_key: str) -> EvidenceBlob:
+    """
+    Take a reference on the blob for this content.
+
+    The caller has just stored the content at bucket/object_key. If a blob for
+    the same SHA-256 already exists, that object is redundant and is deleted
+    once the transaction commits; the caller should point its file at the
+    returned blob's object instead.
+    """
+    with transaction.atomic():
+        blob = EvidenceBlob.objects.select_for_update().filter(sha256=sha256).first()
+        if blob is None:
+            try:
+                with transaction.atomic():
+                    return EvidenceBlob.objects.create(
+                        sha256=sha256,
+                        bucket=bucket,
+                        object_key=object_key,
+                        size_bytes=size_bytes,
+                        ref_count=1,
+                    )
+            except IntegrityError:
+                # A concurrent upload of the same content created the blob first.
+                blob = EvidenceBlob.objects.select_for_update().get(sha256=sha256)
+        blob.ref_count = F('ref_count') + 1
+        blob.save(update_fields=['ref_count'])
+        blob.refresh_from_db()
+
+    if (blob.bucket, blob.object_key) != (bucket, object_key):
+        _delete_object_on_commit(bucket, object_key)
+    return blob
+
+
+def reference_blob(blob_id) -> EvidenceBlob | None:
+    """
+    Take another reference on a blob whose object the caller did not upload.
+
+    Returns None if the blob was released in the meantime; the lock keeps a
+    concurrent release_blob() from deleting it while the reference is taken.
+    """
+    with transaction.atomic():
+        blob = EvidenceBlob.objects.select_for_update().filter(pk=blob_id).first()
+        if blob is None:
+            return None
+        blob.ref_count = F('ref_count') + 1
+        blob.save(update_fields=['ref_count'])
+        blob.refresh_from_db()
+    return blob
+
+
+def release_blob(evidence_file: EvidenceFile) -> None:
+    """Drop the reference held by a deleted file and delete objects nothing references any more."""
+    if evidence_file.blob_id is None:
+        # A direct upload still awaiting verification owns its object, unless
+        # verification gave that object to a blob after this file was loaded.
+        if not EvidenceBlob.objects.filter(bucket=evidence_file.bucket, object_key=evidence_file.object_key).exists():
+            _delete_object_on_commit(evidence_file.bucket, evidence_file.object_key)
+        return
+    with transaction.atomic():
+        blob = EvidenceBlob.objects.select_for_update().filter(pk=evidence_file.blob_id).first()
+        if blob is None:
+            return
+        # Files backfilled from before dedup may still own a private copy of the content.
+        if (evidence_file.bucket, evidence_file.object_key) != (blob.bucket, blob.object_key):
+            _delete_object_on_commit(evidence_file.bucket, evidence_file.object_key)
+        if blob.ref_count > 1:
+            blob.ref_count = F('ref_count') - 1
+            blob.save(update_fields=['ref_count'])
+            return
+        _delete_object_on_commit(blob.bucket, blob.object_key)
+        blob.delete()
@@ -0,0 +1,318 @@
+import base64
+import hashlib
+import logging
+import math
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .blobs import acquire_blob, find_blob
+from .models import EvidenceFile
+from .storage import build_object_key, hash_stored_object, sha256_hex_to_base64
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_TOKEN_SALT = 'evidence.direct-upload'
+MAX_MULTIPART_PARTS = 10000
+SHA256_HEX_RE = re.compile(r'^[0-9a-f]{64}$')
+
+
+class DirectUploadError(ValueError):
+    pass
+
+
+def _url_expires_in() -> int:
+    return getattr(settings, 'EVIDENCE_DIRECT_UPLOAD_EXPIRES', 3600)
+
+
+def _part_size(size_bytes: int) -> int:
+    part_size = getattr(settings, 'EVIDENCE_UPLOAD_PART_SIZE', 8 * 1024 * 1024)
+    return max(part_size, math.ceil(size_bytes / MAX_MULTIPART_PARTS))
+
+
+def composite_sha256(part_digests: list[str]) -> str:
+    """The checksum storage reports for a multipart object: SHA-256 of the part digests, then -<part count>."""
+    combined = hashlib.sha256(b''.join(bytes.fromhex(digest) for digest in part_digests)).digest()
+    return f"{base64.b64encode(combined).decode('ascii')}-{len(part_digests)}"
+
+
+def _parse_part_digests(part_sha256, part_count: int) -> list[str]:
+    if not isinstance(part_sha256, list) or len(part_sha256) != part_count:
+        raise DirectUploadError(f'part_sha256 must list the SHA-256 of each of the {part_count} parts.')
+    digests = [str(digest).lower() for digest in part_sha256]
+    if not all(SHA256_HEX_RE.match(digest) for digest in digests):
+        raise DirectUploadError('part_sha256 entries must be 64 character hex digests.')
+    return digests
+
+
+def initiate_direct_upload(
+    s3_client,
+    evidence_item,
+    filename: str,
+    content_type: str,
+    size_bytes: int,
+    sha256: str,
+    part_size: int | None = None,
+    part_sha256: list | None = None,
+) -> dict:
+    """
+    Hand out presigned URLs so the client sends the file straight to storage.
+
+    Content that is already stored needs no upload at all. Files up to one part
+    are a single PUT that carries the SHA-256 as a signed checksum header, so
+    storage itself rejects a body that does not match. Larger files use a
+    multipart upload with one presigned URL per part; each URL signs that
+    part's SHA-256 (part_sha256, hashed with the client's part_size), so
+    storage checks every part as it arrives.
+    """
+    if not filename:
+        raise DirectUploadError('filename is required.')
+    if not isinstance(size_bytes, int) or size_bytes <= 0:
+        raise DirectUploadError('size_bytes must be a positive integer.')
+    sha256 = (sha256 or '').lower()
+    if not SHA256_HEX_RE.match(sha256):
+        raise DirectUploadError('sha256 must be a 64 character hex digest.')
+    min_part_size = _part_size(size_bytes)
+    if part_size is None:
+        part_size = min_part_size
+    elif not isinstance(part_size, int) or part_size < min_part_size:
+        raise DirectUploadError(f'part_size must be an integer of at least {min_part_size}.')
+
+    bucket = getattr(settings, 'AWS_STORAGE_BUCKET_NAME', 'evidence')
+    object_key = build_object_key(evidence_item.id, filename)
+    content_type = content_type or 'application/octet-stream'
+    expires_in = _url_expires_in()
+    state = {
+        'evidence_item_id': str(evidence_item.id),
+        'bucket': bucket,
+        'object_key': object_key,
+        'filename': filename,
+        'content_type': content_type,
+        'size_bytes': size_bytes,
+        'sha256': sha256,
+        'upload_id': None,
+        'composite_sha256': None,
+        'blob_id': None,
+    }
+
+    # Every authenticated user can already download any evidence file, so
+    # trusting a declared digest here does not widen access to content.
+    blob = find_blob(sha256, size_bytes)
+    if blob is not None:
+        state['blob_id'] = str(blob.id)
+        return {
+            'upload_token': signing.dumps(state, salt=UPLOAD_TOKEN_SALT),
+            'method': 'EXISTING',
+        }
+
+    if size_bytes <= part_size:
+        checksum = sha256_hex_to_base64(sha256)
+        url = s3_client.generate_presigned_url(
+            'put_object',
+            Params={'Bucket': bucket, 'Key': object_key, 'ContentType': content_type, 'ChecksumSHA256': checksum},
+            ExpiresIn=expires_in,
+        )
+        return {
+            'upload_token': signing.dumps(state, salt=UPLOAD_TOKEN_SALT),
+            'method': 'PUT',
+            'url': url,
+            'headers': {'Content-Type': content_type, 'x-amz-checksum-sha256': checksum},
+            'expires_in': expires_in,
+        }
+
+    part_digests = _parse_part_digests(part_sha256, math.ceil(size_bytes / part_size))
+    upload_id = s3_client.create_multipart_upload(
+        Bucket=bucket,
+        Key=object_key,
+        ContentType=content_type,
+        ChecksumAlgorithm='SHA256',
+    )['UploadId']
+    state['upload_id'] = upload_id
+    state['composite_sha256'] = composite_sha256(part_digests)
+    parts = []
+    for part_number, digest in enumerate(part_digests, start=1):
+        checksum = sha256_hex_to_base64(digest)
+        parts.append({
+            'part_number': part_number,
+            'url': s3_client.generate_presigned_url(
+                'upload_part',
+                Params={
+                    'Bucket': bucket,
+                    'Key': object_key,
+                    'UploadId': upload_id,
+                    'PartNumber': part_number,
+                    'ChecksumSHA256': checksum,
+                },
+                ExpiresIn=expires_in,
+            ),
+            'headers': {'x-amz-checksum-sha256': checksum},
+        })
+    return {
+        'upload_token': signing.dumps(state, salt=UPLOAD_TOKEN_SALT),
+        'method': 'MULTIPART',
+        'part_size': part_size,
+        'parts': parts,
+        'expires_in': expires_in,
+    }
+
+
+def load_upload_token(token: str, evidence_item_id) -> dict:
+    try:
+        # Leave the client a full URL lifetime to finish after the last part is sent.
+        state = signing.loads(token or '', salt=UPLOAD_TOKEN_SALT, max_age=2 * _url_expires_in())
+    except signing.BadSignature:
+        raise DirectUploadError('Invalid or expired upload token.')
+    if state['evidence_item_id'] != str(evidence_item_id):
+        raise DirectUploadError('Upload token does not belong to this evidence item.')
+    return state
+
+
+def _discard(s3_client, state: dict):
+    try:
+        s3_client.delete_object(Bucket=state['bucket'], Key=state['object_key'])
+    except Exception:
+        pass
+
+
+def complete_direct_upload(s3_client, state: dict, parts=None) -> bool:
+    """
+    Finish the upload and check the stored object against the declared size and checksums.
+
+    Storage has already checked the bytes against the signed checksums. A
+    single PUT was signed with the file's SHA-256, so returns True: the
+    declared digest is verified. A multipart object is only known to match its
+    part digests, so returns False: the whole-file SHA-256 is left to
+    verify_pending_files(), which streams the object outside the request.
+    Objects that fail verification are deleted.
+    """
+    if state['blob_id']:
+        return True
+    bucket, object_key = state['bucket'], state['object_key']
+
+    if state['upload_id']:
+        try:
+            ordered_parts = sorted(
+                (
+                    {
+                        'PartNumber': int(part['part_number']),
+                        'ETag': part['etag'],
+                        'ChecksumSHA256': sha256_hex_to_base64(part['sha256']),
+                    }
+                    for part in parts or []
+                ),
+                key=lambda part: part['PartNumber'],
+            )
+        except (KeyError, TypeError, ValueError):
+            raise DirectUploadError('parts must be a list of {part_number, etag, sha256}.')
+        if not ordered_parts:
+            raise DirectUploadError('parts are required to complete a multipart upload.')
+        part_digests = [base64.b64decode(part['ChecksumSHA256']).hex() for part in ordered_parts]
+        if composite_sha256(part_digests) != state['composite_sha256']:
+            raise DirectUploadError('parts do not match the part checksums the upload was started with.')
+        try:
+            completed = s3_client.complete_multipart_upload(
+                Bucket=bucket,
+                Key=object_key,
+                UploadId=state['upload_id'],
+                MultipartUpload={'Parts': ordered_parts},
+            )
+        except Exception as exc:
+            s3_client.abort_multipart_upload(Bucket=bucket, Key=object_key, UploadId=state['upload_id'])
+            raise DirectUploadError(f'Could not complete multipart upload: {exc}')
+        if completed.get('ChecksumSHA256') != state['composite_sha256']:
+            _discard(s3_client, state)
+            raise DirectUploadError('Uploaded object checksum does not match the declared part checksums.')
+        checksum, verified = None, False
+    else:
+        checksum = sha256_hex_to_base64(state['sha256'])
+        verified = True
+
+    try:
+        head = s3_client.head_object(Bucket=bucket, Key=object_key, ChecksumMode='ENABLED')
+    except Exception:
+        raise DirectUploadError('Uploaded object not found.')
+    if head['ContentLength'] != state['size_bytes']:
+        _discard(s3_client, state)
+        raise DirectUploadError('Uploaded object size does not match the declared size.')
+    if checksum is not None and head.get('ChecksumSHA256') != checksum:
+        if head.get('ChecksumSHA256') is not None:
+            _discard(s3_client, state)
+            raise DirectUploadError('Uploaded object checksum does not match the declared sha256.')
+        # Storage without checksum support: check the content later, like a multipart upload.
+        verified = False
+    return verified
+
+
+def verify_pending_files(s3_client, limit: int = 100) -> int:
+    """
+    Hash direct uploads registered before their whole-file SHA-256 was checked.
+
+    Such files have no blob and keep their own object. Each one is streamed
+    from storage and then given the blob of the digest actually stored, so a
+    wrong declared digest can never be used to match other uploads. A failed
+    read is recorded on the file and sends it behind files tried fewer times,
+    so unreadable objects cannot hold up newer uploads. Returns the number of
+    files checked.
+    """
+    checked = 0
+    pending = EvidenceFile.objects.filter(blob__isnull=True).order_by('verify_attempts', 'uploaded_at')
+    for evidence_file in pending[:limit]:
+        try:
+            sha256, size_bytes = hash_stored_object(s3_client, evidence_file.bucket, evidence_file.object_key)
+        except Exception as exc:
+            logger.exception('Could not read %s to verify evidence file %s', evidence_file.object_key, evidence_file.pk)
+            EvidenceFile.objects.filter(pk=evidence_file.pk).update(
+                verify_attempts=F('verify_attempts') + 1,
+                verify_error=str(exc) or exc.__class__.__name__,
+            )
+            continue
+        with transaction.atomic():
+            # Skip files deleted or verified by another run while the object was read.
+            locked = EvidenceFile.objects.select_for_update().filter(pk=evidence_file.pk, blob__isnull=True).first()
+            if locked is None:
+                continue
+            if sha256 != locked.sha256:
+                logger.warning(
+                    'Evidence file %s was declared as %s but stores %s; recording the stored digest',
+                    locked.pk, locked.sha256, sha256,
+                )
+            blob = acquire_blob(sha256, size_bytes, locked.bucket, locked.object_key)
+            EvidenceFile.objects.filter(pk=locked.pk).update(
+                blob=blob,
+                bucket=blob.bucket,
+                object_key=blob.object_key,
+                sha256=sha256,
+                size_bytes=size_bytes,
+                verify_error='',
+            )
+        checked += 1
+    return checked
+
+
+def abort_abandoned_uploads(s3_client, bucket: str | None = None) -> int:
+    """
+    Abort multipart uploads that nobody can complete any more.
+
+    An upload token stops being accepted after twice the URL lifetime, so
+    parts of older uploads would otherwise sit in storage forever. Returns the
+    number of uploads aborted.
+    """
+    bucket = bucket or getattr(settings, 'AWS_STORAGE_BUCKET_NAME', 'evidence')
+    cutoff = timezone.now() - timedelta(seconds=2 * _url_expires_in())
+    aborted = 0
+    paginator = s3_client.get_paginator('list_multipart_uploads')
+    for page in paginator.paginate(Bucket=bucket):
+        for upload in page.get('Uploads', []):
+            if upload['Initiated'] >= cutoff:
+                continue
+            try:
+                s3_client.abort_multipart_upload(Bucket=bucket, Key=upload['Key'], UploadId=upload['UploadId'])
+                aborted += 1
+            except Exception:
+                logger.exception('Could not abort multipart upload %s of %s', upload['UploadId'], upload['Key'])
+    return aborted
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.evidence.direct_upload import abort_abandoned_uploads, verify_pending_files
+from apps.evidence.storage import get_s3_client
+
+
+class Command(BaseCommand):
+    help = 'Verify the SHA-256 of direct uploads registered unverified and abort abandoned multipart uploads.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size <= 0:
+            raise CommandError('--batch-size must be > 0')
+
+        s3_client = get_s3_client()
+        verified = verify_pending_files(s3_client, limit=batch_size)
+        aborted = abort_abandoned_uploads(s3_client)
+        self.stdout.write(self.style.SUCCESS(f'Verified {verified} uploaded files; aborted {aborted} abandoned multipart uploads'))
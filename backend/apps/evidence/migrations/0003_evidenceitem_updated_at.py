@@ -0,0 +1,18 @@
+# Generated by Django 5.1.14 on 2026-10-17 03:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evidence', '0002_rename_evidence_co_control_0d9b84_idx_evidence_co_control_cc08cf_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='evidenceitem',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
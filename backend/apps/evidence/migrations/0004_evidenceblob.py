@@ -0,0 +1,37 @@
+# Generated by Django 5.1.14 on 2026-10-17 03:08
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evidence', '0003_evidenceitem_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EvidenceBlob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('bucket', models.CharField(max_length=255)),
+                ('object_key', models.CharField(max_length=1024)),
+                ('size_bytes', models.BigIntegerField()),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='evidencefile',
+            name='object_key',
+            field=models.CharField(db_index=True, max_length=1024),
+        ),
+        migrations.AddField(
+            model_name='evidencefile',
+            name='blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='files', to='evidence.evidenceblob'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+from django.db import migrations
+
+
+def backfill_blobs(apps, schema_editor):
+    """Give every distinct existing file content a blob, backed by its earliest stored object."""
+    EvidenceBlob = apps.get_model('evidence', 'EvidenceBlob')
+    EvidenceFile = apps.get_model('evidence', 'EvidenceFile')
+
+    files_by_sha = {}
+    for evidence_file in EvidenceFile.objects.filter(blob__isnull=True).order_by('uploaded_at').iterator():
+        files_by_sha.setdefault(evidence_file.sha256, []).append(evidence_file)
+
+    for sha256, files in files_by_sha.items():
+        first = files[0]
+        blob = EvidenceBlob.objects.create(
+            sha256=sha256,
+            bucket=first.bucket,
+            object_key=first.object_key,
+            size_bytes=first.size_bytes,
+            ref_count=len(files),
+        )
+        # Existing duplicates keep pointing at their own objects; only new uploads share.
+        EvidenceFile.objects.filter(pk__in=[evidence_file.pk for evidence_file in files]).update(blob=blob)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evidence', '0004_evidenceblob'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_blobs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.1.14 on 2026-10-17 03:27
+
+from django.db import migrations, models
+
+
+def add_search_vector(apps, schema_editor):
+    # Same approach as standards.Control: a generated, weighted tsvector with a
+    # GIN index on PostgreSQL; other databases search with LIKE.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        """
+        ALTER TABLE evidence_evidenceitem ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('english'::regconfig, coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('english'::regconfig, coalesce(notes, '')), 'B')
+        ) STORED
+        """
+    )
+    schema_editor.execute('CREATE INDEX evidence_evidenceitem_search_vector ON evidence_evidenceitem USING gin (search_vector)')
+
+
+def remove_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('ALTER TABLE evidence_evidenceitem DROP COLUMN IF EXISTS search_vector')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evidence', '0005_backfill_evidence_blobs'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='evidenceitem',
+            index=models.Index(fields=['category', 'subtype', 'event_date'], name='evidence_ev_categor_88d496_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='evidenceitem',
+            index=models.Index(fields=['valid_until'], name='evidence_ev_valid_u_1e1958_idx'),
+        ),
+        migrations.RunPython(add_search_vector, remove_search_vector),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.14 on 2026-10-17 04:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evidence', '0006_evidenceitem_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='evidencefile',
+            name='verify_attempts',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='evidencefile',
+            name='verify_error',
+            field=models.TextField(blank=True),
+        ),
+    ]
@@ -23,17 +23,39 @@ class EvidenceItem(models.Model):
         related_name='evidence_items',
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-event_date', '-created_at']
         indexes = [
             models.Index(fields=['category', 'event_date']),
+            models.Index(fields=['category', 'subtype', 'event_date']),
+            models.Index(fields=['valid_until']),
         ]
 
     def __str__(self):
         return f"{self.title} ({self.category})"
 
 
+class EvidenceBlob(models.Model):
+    """
+    One stored object per distinct file content.
+
+    EvidenceFile rows with the same SHA-256 share a blob; ref_count tracks how
+    many files reference it so the object is deleted only with the last one.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    sha256 = models.CharField(max_length=64, unique=True)
+    bucket = models.CharField(max_length=255)
+    object_key = models.CharField(max_length=1024)
+    size_bytes = models.BigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.sha256} x{self.ref_count}"
+
+
 class EvidenceFile(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     evidence_item = models.ForeignKey(
@@ -41,8 +63,21 @@ class EvidenceFile(models.Model):
         on_delete=models.CASCADE,
         related_name='files',
     )
+    # Null while a direct upload's whole-file SHA-256 is unverified; the file
+    # then owns its object (see direct_upload.verify_pending_files).
+    blob = models.ForeignKey(
+        EvidenceBlob,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='files',
+    )
+    # Failed reads of an unverified file; verification takes the least tried first.
+    verify_attempts = models.PositiveIntegerField(default=0)
+    verify_error = models.TextField(blank=True)
     bucket = models.CharField(max_length=255)
-    object_key = models.CharField(max_length=1024, unique=True)
+    # Mirrors blob.object_key; several files may point at the same object.
+    object_key = models.CharField(max_length=1024, db_index=True)
     filename = models.CharField(max_length=255)
     content_type = models.CharField(max_length=255)
     size_bytes = models.BigIntegerField()
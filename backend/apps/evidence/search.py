@@ -0,0 +1,67 @@
+from django.contrib.postgres.search import SearchRank, SearchVectorField
+from django.db.models import Exists, OuterRef, Q
+from django.db.models.expressions import RawSQL
+from django.utils.dateparse import parse_date
+
+from apps.standards.search import full_text_search_enabled, prefix_query
+from .models import ControlEvidenceLink, EvidenceItem
+
+TRUTHY = {'1', 'true', 'yes', 'on'}
+
+
+def _date_param(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        parsed = parse_date(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValueError(f'{name} must be a date (YYYY-MM-DD).')
+    return parsed
+
+
+def search_evidence_items(queryset, params):
+    """
+    Filter evidence items by the evidence list query parameters.
+
+    q searches title and notes (ranked full text on PostgreSQL); category and
+    subtype match exactly; event_date_from/event_date_to and
+    expires_after/expires_before bound event_date and valid_until; unlinked=true
+    keeps items not linked to any control. Raises ValueError for malformed dates.
+    """
+    category = params.get('category')
+    subtype = params.get('subtype')
+    if category:
+        queryset = queryset.filter(category=category)
+    if subtype:
+        queryset = queryset.filter(subtype=subtype)
+
+    ranges = [
+        ('event_date_from', 'event_date__gte'),
+        ('event_date_to', 'event_date__lte'),
+        ('expires_after', 'valid_until__gte'),
+        ('expires_before', 'valid_until__lte'),
+    ]
+    for param, lookup in ranges:
+        value = _date_param(params, param)
+        if value is not None:
+            queryset = queryset.filter(**{lookup: value})
+
+    if (params.get('unlinked') or '').lower() in TRUTHY:
+        queryset = queryset.filter(~Exists(ControlEvidenceLink.objects.filter(evidence_item=OuterRef('pk'))))
+
+    q = params.get('q')
+    query = prefix_query(q) if q and full_text_search_enabled() else None
+    if query is not None:
+        vector = RawSQL(f'{EvidenceItem._meta.db_table}.search_vector', [], output_field=SearchVectorField())
+        return (
+            queryset.annotate(search_vector=vector)
+            .filter(search_vector=query)
+            .annotate(search_rank=SearchRank(vector, query))
+            .order_by('-search_rank', '-event_date', '-created_at')
+        )
+    if q:
+        queryset = queryset.filter(Q(title__icontains=q) | Q(notes__icontains=q))
+    return queryset.order_by('-event_date', '-created_at')
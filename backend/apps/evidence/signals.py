@@ -0,0 +1,10 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from apps.evidence.blobs import release_blob
+from apps.evidence.models import EvidenceFile
+
+
+@receiver(post_delete, sender=EvidenceFile)
+def evidence_file_deleted(sender, instance, **kwargs):
+    release_blob(instance)
@@ -1,22 +1,93 @@
+import base64
 import hashlib
 import os
 import re
+import threading
 import uuid
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from django.conf import settings
 
 
-def get_s3_client():
-    return boto3.client(
+_s3_clients = {}
+_s3_clients_lock = threading.Lock()
+
+
+def _s3_client_profile() -> tuple:
+    return (
+        getattr(settings, 'AWS_S3_ENDPOINT_URL', None),
+        getattr(settings, 'AWS_ACCESS_KEY_ID', None),
+        getattr(settings, 'AWS_SECRET_ACCESS_KEY', None),
+        getattr(settings, 'AWS_S3_REGION_NAME', None),
+        getattr(settings, 'AWS_S3_VERIFY', True),
+        getattr(settings, 'AWS_S3_SIGNATURE_VERSION', 's3v4'),
+        getattr(settings, 'AWS_S3_MAX_POOL_CONNECTIONS', 20),
+        getattr(settings, 'AWS_S3_CONNECT_TIMEOUT', 5),
+        getattr(settings, 'AWS_S3_READ_TIMEOUT', 60),
+        getattr(settings, 'AWS_S3_MAX_ATTEMPTS', 3),
+    )
+
+
+def _build_s3_client(profile: tuple):
+    (
+        endpoint_url, access_key, secret_key, region, verify, signature_version,
+        max_pool_connections, connect_timeout, read_timeout, max_attempts,
+    ) = profile
+    # A private session: the default boto3 session is not safe to build clients from concurrently.
+    return boto3.session.Session().client(
         's3',
-        endpoint_url=getattr(settings, 'AWS_S3_ENDPOINT_URL', None),
-        aws_access_key_id=getattr(settings, 'AWS_ACCESS_KEY_ID', None),
-        aws_secret_access_key=getattr(settings, 'AWS_SECRET_ACCESS_KEY', None),
-        region_name=getattr(settings, 'AWS_S3_REGION_NAME', None),
-        verify=getattr(settings, 'AWS_S3_VERIFY', True),
+        endpoint_url=endpoint_url,
+        aws_access_key_id=access_key,
+        aws_secret_access_key=secret_key,
+        region_name=region,
+        verify=verify,
+        config=Config(
+            # SigV4 signs the x-amz-checksum-sha256 header of presigned uploads, so storage enforces it.
+            signature_version=signature_version,
+            max_pool_connections=max_pool_connections,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            retries={'max_attempts': max_attempts, 'mode': 'standard'},
+            tcp_keepalive=True,
+        ),
     )
 
 
+def get_s3_client():
+    """
+    Return the process-wide S3 client for the current storage settings.
+
+    boto3 clients are thread-safe and expensive to build, so one client (and its
+    connection pool) is shared per distinct settings profile.
+    """
+    profile = _s3_client_profile()
+    client = _s3_clients.get(profile)
+    if client is None:
+        with _s3_clients_lock:
+            client = _s3_clients.get(profile)
+            if client is None:
+                client = _s3_clients[profile] = _build_s3_client(profile)
+    return client
+
+
+def reset_s3_clients():
+    """Drop cached clients, e.g. between tests that change storage settings."""
+    with _s3_clients_lock:
+        _s3_clients.clear()
+
+
+def _reset_s3_clients_after_fork():
+    # The parent's pooled sockets and possibly-held lock must not be used in a forked child.
+    global _s3_clients, _s3_clients_lock
+    _s3_clients = {}
+    _s3_clients_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_s3_clients_after_fork)
+
+
 def sanitize_filename(filename: str) -> str:
     base = os.path.basename(filename or '')
     if not base:
@@ -30,8 +101,87 @@ def build_object_key(evidence_item_id, filename: str) -> str:
     return f"evidence/{evidence_item_id}/{str(uuid.uuid4())}_{safe_name}"
 
 
-def compute_sha256(uploaded_file) -> str:
+def evidence_transfer_config() -> TransferConfig:
+    part_size = getattr(settings, 'EVIDENCE_UPLOAD_PART_SIZE', 8 * 1024 * 1024)
+    return TransferConfig(
+        multipart_threshold=part_size,
+        multipart_chunksize=part_size,
+        max_concurrency=getattr(settings, 'EVIDENCE_UPLOAD_MAX_CONCURRENCY', 4),
+    )
+
+
+class HashingWriter:
+    """Write-through file wrapper that computes SHA-256 and size of everything written."""
+
+    def __init__(self, fileobj):
+        self._fileobj = fileobj
+        self._hasher = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data) -> int:
+        self._hasher.update(data)
+        self.size += len(data)
+        return self._fileobj.write(data)
+
+    def tell(self) -> int:
+        return self._fileobj.tell()
+
+    def flush(self):
+        self._fileobj.flush()
+
+    @property
+    def sha256(self) -> str:
+        return self._hasher.hexdigest()
+
+
+class HashingReader:
+    """
+    Read-only wrapper that computes SHA-256 and size of everything read through it.
+
+    It deliberately exposes no seek/tell, so boto3 treats it as a non-seekable
+    stream and reads it once, front to back, in part-sized chunks.
+    """
+
+    def __init__(self, fileobj):
+        self._fileobj = fileobj
+        self._hasher = hashlib.sha256()
+        self.size = 0
+
+    def read(self, size=-1) -> bytes:
+        data = self._fileobj.read(size)
+        self._hasher.update(data)
+        self.size += len(data)
+        return data
+
+    @property
+    def sha256(self) -> str:
+        return self._hasher.hexdigest()
+
+
+def upload_with_sha256(s3_client, fileobj, bucket: str, object_key: str, content_type: str) -> HashingReader:
+    """Stream fileobj to storage in one pass; the returned reader carries its sha256 and size."""
+    reader = HashingReader(fileobj)
+    s3_client.upload_fileobj(
+        reader,
+        bucket,
+        object_key,
+        ExtraArgs={'ContentType': content_type},
+        Config=evidence_transfer_config(),
+    )
+    return reader
+
+
+def sha256_hex_to_base64(hexdigest: str) -> str:
+    """S3 checksum headers carry the raw digest base64-encoded rather than hex."""
+    return base64.b64encode(bytes.fromhex(hexdigest)).decode('ascii')
+
+
+def hash_stored_object(s3_client, bucket: str, object_key: str) -> tuple[str, int]:
+    """Stream an object back from storage and return its sha256 and size."""
+    body = s3_client.get_object(Bucket=bucket, Key=object_key)['Body']
     hasher = hashlib.sha256()
-    for chunk in uploaded_file.chunks():
+    size = 0
+    for chunk in body.iter_chunks(chunk_size=1024 * 1024):
         hasher.update(chunk)
-    return hasher.hexdigest()
+        size += len(chunk)
+    return hasher.hexdigest(), size
@@ -1,12 +1,25 @@
+import base64
 import hashlib
+from datetime import datetime, timedelta, timezone as dt_timezone
+from types import SimpleNamespace
 from unittest.mock import patch
-from django.test import TestCase
+import boto3
+from botocore.config import Config
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group
 from django.core.files.uploadedfile import SimpleUploadedFile
 from rest_framework.test import APIClient
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from apps.audit.models import AuditEvent
+from apps.compliance.models import ControlStatusCache, DirtyControl
+from apps.compliance.rule_index import get_rule_index, reset_rule_indexes
 from apps.standards.models import StandardPack, Control
-from .models import EvidenceItem, EvidenceFile, ControlEvidenceLink
+from .direct_upload import abort_abandoned_uploads, verify_pending_files
+from .presign import presign_get_object
+from .storage import get_s3_client, reset_s3_clients
+from .models import EvidenceBlob, EvidenceItem, EvidenceFile, ControlEvidenceLink
 
 User = get_user_model()
 
@@ -21,7 +34,8 @@ class DummyS3Client:
         self.uploads = []
         self.presigned_urls = []
 
-    def upload_fileobj(self, fileobj, bucket, key, ExtraArgs=None):
+    def upload_fileobj(self, fileobj, bucket, key, ExtraArgs=None, Config=None):
+        fileobj.read()
         self.uploads.append((bucket, key, ExtraArgs))
 
     def generate_presigned_url(self, *args, **kwargs):
@@ -29,8 +43,58 @@ class DummyS3Client:
         return 'http://example.com/presigned'
 
 
+class DirectUploadS3Client(DummyS3Client):
+    """Keeps objects in memory so the client side of a direct upload can be simulated."""
+
+    def __init__(self):
+        super().__init__()
+        self.objects = {}
+        self.multipart = {}
+        self.deleted = []
+
+    def put(self, key, body):
+        self.objects[key] = body
+
+    def head_object(self, Bucket, Key, ChecksumMode=None):
+        body = self.objects[Key]
+        return {
+            'ContentLength': len(body),
+            'ChecksumSHA256': base64.b64encode(hashlib.sha256(body).digest()).decode('ascii'),
+        }
+
+    def get_object(self, Bucket, Key):
+        body = self.objects[Key]
+        return {'Body': SimpleNamespace(iter_chunks=lambda chunk_size: iter([body[i:i + chunk_size] for i in range(0, len(body), chunk_size)]))}
+
+    def delete_object(self, Bucket, Key):
+        self.deleted.append(Key)
+        self.objects.pop(Key, None)
+
+    def create_multipart_upload(self, Bucket, Key, ContentType=None, ChecksumAlgorithm=None):
+        self.multipart['upload-1'] = {}
+        return {'UploadId': 'upload-1'}
+
+    def upload_part(self, key, upload_id, part_number, body):
+        self.multipart[upload_id][part_number] = body
+        return f'etag-{part_number}'
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        parts = self.multipart.pop(UploadId)
+        digests = [hashlib.sha256(parts[part['PartNumber']]).digest() for part in MultipartUpload['Parts']]
+        for part, digest in zip(MultipartUpload['Parts'], digests):
+            if part['ChecksumSHA256'] != base64.b64encode(digest).decode('ascii'):
+                raise ValueError('InvalidPart')
+        self.objects[Key] = b''.join(parts[part['PartNumber']] for part in MultipartUpload['Parts'])
+        composite = base64.b64encode(hashlib.sha256(b''.join(digests)).digest()).decode('ascii')
+        return {'ChecksumSHA256': f'{composite}-{len(digests)}'}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.multipart.pop(UploadId, None)
+
+
 class EvidenceAPITests(TestCase):
     def setUp(self):
+        reset_rule_indexes()
         self.client = APIClient()
         self.user = User.objects.create_user(username='tester', password='pass1234')
         _assign_role(self.user, 'DATA_ENTRY')
@@ -65,6 +129,29 @@ class EvidenceAPITests(TestCase):
         self.assertEqual(EvidenceItem.objects.count(), 1)
         self.assertEqual(EvidenceItem.objects.first().title, 'Calibration Certificate')
 
+    def test_search_evidence_items(self):
+        calibration = EvidenceItem.objects.create(
+            title='Calibration Certificate', category='certificate', subtype='balance',
+            notes='Annual calibration of the analytical balance', event_date='2024-01-15', valid_until='2025-01-15',
+        )
+        linked = EvidenceItem.objects.create(
+            title='Calibration Report', category='certificate', subtype='pipette',
+            event_date='2024-03-01', valid_until='2024-06-01',
+        )
+        EvidenceItem.objects.create(title='Fire drill log', category='log', event_date='2024-02-01')
+        ControlEvidenceLink.objects.create(control=self.control, evidence_item=linked)
+
+        def ids(params):
+            response = self.client.get('/api/v1/evidence-items', params)
+            self.assertEqual(response.status_code, 200)
+            return [row['id'] for row in response.json()['results']]
+
+        self.assertCountEqual(ids({'q': 'calibr'}), [str(linked.id), str(calibration.id)])
+        self.assertEqual(ids({'category': 'certificate', 'subtype': 'balance'}), [str(calibration.id)])
+        self.assertEqual(ids({'expires_after': '2024-12-01', 'expires_before': '2025-02-01'}), [str(calibration.id)])
+        self.assertEqual(ids({'q': 'calibration', 'unlinked': 'true'}), [str(calibration.id)])
+        self.assertEqual(self.client.get('/api/v1/evidence-items', {'event_date_from': 'soon'}).status_code, 400)
+
     @patch('apps.evidence.views.get_s3_client')
     def test_upload_file(self, mock_s3_client):
         evidence = EvidenceItem.objects.create(
@@ -91,6 +178,263 @@ class EvidenceAPITests(TestCase):
         self.assertEqual(evidence_file.sha256, expected_sha)
         self.assertEqual(len(dummy_s3.uploads), 1)
 
+    @patch('apps.evidence.views.get_s3_client')
+    def test_upload_multiple_files_hashes_each_stream(self, mock_s3_client):
+        evidence = EvidenceItem.objects.create(
+            title='Test Evidence',
+            category='report',
+            event_date='2024-02-01',
+            created_by=self.user,
+        )
+        dummy_s3 = DummyS3Client()
+        mock_s3_client.return_value = dummy_s3
+
+        contents = {'a.txt': b'first file', 'b.txt': b'second file, a bit longer', 'c.txt': b'third'}
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                f'/api/v1/evidence-items/{evidence.id}/files',
+                {'files': [SimpleUploadedFile(name, body, content_type='text/plain') for name, body in contents.items()]},
+                format='multipart',
+            )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(dummy_s3.uploads), 3)
+        audit_inserts = [
+            query for query in queries.captured_queries
+            if query['sql'].startswith(f'INSERT INTO "{AuditEvent._meta.db_table}"')
+        ]
+        self.assertEqual(len(audit_inserts), 1)
+        self.assertEqual(AuditEvent.objects.filter(action='EVIDENCE_FILE_UPLOADED').count(), 3)
+        for evidence_file in EvidenceFile.objects.all():
+            body = contents[evidence_file.filename]
+            self.assertEqual(evidence_file.sha256, hashlib.sha256(body).hexdigest())
+            self.assertEqual(evidence_file.size_bytes, len(body))
+
+    @patch('apps.evidence.views.get_s3_client')
+    def test_direct_upload_verifies_object_before_registering(self, mock_s3_client):
+        evidence = EvidenceItem.objects.create(
+            title='Scan', category='report', event_date='2024-02-01', created_by=self.user,
+        )
+        dummy_s3 = DirectUploadS3Client()
+        mock_s3_client.return_value = dummy_s3
+        body = b'scanned document'
+        declared = {
+            'filename': 'scan.pdf',
+            'content_type': 'application/pdf',
+            'size_bytes': len(body),
+            'sha256': hashlib.sha256(body).hexdigest(),
+        }
+        url = f'/api/v1/evidence-items/{evidence.id}/uploads'
+
+        initiated = self.client.post(url, declared, format='json')
+        self.assertEqual(initiated.status_code, 200)
+        self.assertEqual(initiated.json()['method'], 'PUT')
+        self.assertEqual(
+            initiated.json()['headers']['x-amz-checksum-sha256'],
+            base64.b64encode(hashlib.sha256(body).digest()).decode('ascii'),
+        )
+        object_key = dummy_s3.presigned_urls[0][1]['Params']['Key']
+
+        dummy_s3.put(object_key, body)
+        token = initiated.json()['upload_token']
+        completed = self.client.post(f'{url}/complete', {'upload_token': token}, format='json')
+        self.assertEqual(completed.status_code, 201)
+        evidence_file = EvidenceFile.objects.get(object_key=object_key)
+        self.assertEqual(evidence_file.sha256, declared['sha256'])
+        self.assertEqual(evidence_file.size_bytes, len(body))
+
+        repeated = self.client.post(f'{url}/complete', {'upload_token': token}, format='json')
+        self.assertEqual(repeated.status_code, 200)
+        self.assertEqual(EvidenceFile.objects.count(), 1)
+
+        other = b'another document'
+        mismatched = self.client.post(url, {
+            **declared,
+            'size_bytes': len(other),
+            'sha256': hashlib.sha256(other).hexdigest(),
+        }, format='json')
+        mismatched_key = dummy_s3.presigned_urls[-1][1]['Params']['Key']
+        dummy_s3.put(mismatched_key, other + b'!')
+        rejected = self.client.post(f'{url}/complete', {'upload_token': mismatched.json()['upload_token']}, format='json')
+        self.assertEqual(rejected.status_code, 400)
+        self.assertIn(mismatched_key, dummy_s3.deleted)
+        self.assertEqual(EvidenceFile.objects.count(), 1)
+
+    @override_settings(EVIDENCE_UPLOAD_PART_SIZE=4)
+    @patch('apps.evidence.views.get_s3_client')
+    def test_direct_multipart_upload_checks_parts_and_verifies_digest_later(self, mock_s3_client):
+        evidence = EvidenceItem.objects.create(
+            title='Video', category='report', event_date='2024-02-01', created_by=self.user,
+        )
+        dummy_s3 = DirectUploadS3Client()
+        mock_s3_client.return_value = dummy_s3
+        body = b'0123456789'
+        chunks = [body[offset:offset + 4] for offset in range(0, len(body), 4)]
+        part_sha256 = [hashlib.sha256(chunk).hexdigest() for chunk in chunks]
+        url = f'/api/v1/evidence-items/{evidence.id}/uploads'
+
+        initiated = self.client.post(url, {
+            'filename': 'walkthrough.mp4',
+            'content_type': 'video/mp4',
+            'size_bytes': len(body),
+            'sha256': hashlib.sha256(body).hexdigest(),
+            'part_size': 4,
+            'part_sha256': part_sha256,
+        }, format='json')
+        self.assertEqual(initiated.status_code, 200)
+        payload = initiated.json()
+        self.assertEqual(payload['method'], 'MULTIPART')
+        self.assertEqual([part['part_number'] for part in payload['parts']], [1, 2, 3])
+        signed = [kwargs['Params']['ChecksumSHA256'] for _, kwargs in dummy_s3.presigned_urls]
+        self.assertEqual(signed, [base64.b64encode(hashlib.sha256(chunk).digest()).decode('ascii') for chunk in chunks])
+
+        object_key = dummy_s3.presigned_urls[0][1]['Params']['Key']
+        parts = [
+            {
+                'part_number': index + 1,
+                'etag': dummy_s3.upload_part(object_key, 'upload-1', index + 1, chunk),
+                'sha256': part_sha256[index],
+            }
+            for index, chunk in enumerate(chunks)
+        ]
+        tampered = [{**parts[0], 'sha256': hashlib.sha256(b'other').hexdigest()}, *parts[1:]]
+        rejected = self.client.post(f'{url}/complete', {'upload_token': payload['upload_token'], 'parts': tampered}, format='json')
+        self.assertEqual(rejected.status_code, 400)
+
+        with patch('apps.evidence.direct_upload.hash_stored_object') as hash_stored_object:
+            completed = self.client.post(
+                f'{url}/complete',
+                {'upload_token': payload['upload_token'], 'parts': parts},
+                format='json',
+            )
+        self.assertEqual(completed.status_code, 201)
+        hash_stored_object.assert_not_called()
+        evidence_file = EvidenceFile.objects.get()
+        self.assertIsNone(evidence_file.blob_id)
+
+        self.assertEqual(verify_pending_files(dummy_s3), 1)
+        evidence_file.refresh_from_db()
+        self.assertEqual(evidence_file.blob.sha256, hashlib.sha256(body).hexdigest())
+        self.assertEqual(evidence_file.object_key, object_key)
+        self.assertEqual(verify_pending_files(dummy_s3), 0)
+
+    def test_unreadable_upload_does_not_block_verification(self):
+        evidence = EvidenceItem.objects.create(
+            title='Videos', category='report', event_date='2024-02-01', created_by=self.user,
+        )
+        dummy_s3 = DirectUploadS3Client()
+        body = b'second upload'
+        files = [
+            EvidenceFile.objects.create(
+                evidence_item=evidence,
+                bucket='evidence',
+                object_key=f'evidence/{evidence.id}/{name}',
+                filename=name,
+                content_type='video/mp4',
+                size_bytes=len(body),
+                sha256=hashlib.sha256(body).hexdigest(),
+            )
+            for name in ('missing.mp4', 'present.mp4')
+        ]
+        dummy_s3.put(files[1].object_key, body)
+
+        with self.assertLogs('apps.evidence.direct_upload', level='ERROR'):
+            self.assertEqual(verify_pending_files(dummy_s3, limit=1), 0)
+        files[0].refresh_from_db()
+        self.assertEqual(files[0].verify_attempts, 1)
+        self.assertIn('missing.mp4', files[0].verify_error)
+
+        self.assertEqual(verify_pending_files(dummy_s3, limit=1), 1)
+        files[1].refresh_from_db()
+        self.assertEqual(files[1].blob.sha256, hashlib.sha256(body).hexdigest())
+        self.assertIsNone(EvidenceFile.objects.get(pk=files[0].pk).blob_id)
+
+    @override_settings(EVIDENCE_DIRECT_UPLOAD_EXPIRES=60)
+    def test_abandoned_multipart_uploads_are_aborted(self):
+        dummy_s3 = DirectUploadS3Client()
+        now = datetime.now(dt_timezone.utc)
+        uploads = [
+            {'Key': 'evidence/old.bin', 'UploadId': 'old', 'Initiated': now - timedelta(minutes=5)},
+            {'Key': 'evidence/new.bin', 'UploadId': 'new', 'Initiated': now - timedelta(seconds=30)},
+        ]
+        dummy_s3.multipart = {'old': {}, 'new': {}}
+        dummy_s3.get_paginator = lambda name: SimpleNamespace(paginate=lambda Bucket: [{'Uploads': uploads}])
+
+        self.assertEqual(abort_abandoned_uploads(dummy_s3, 'evidence'), 1)
+        self.assertEqual(set(dummy_s3.multipart), {'new'})
+
+    @patch('apps.evidence.blobs.get_s3_client')
+    @patch('apps.evidence.views.get_s3_client')
+    def test_duplicate_content_shares_one_blob_until_last_delete(self, mock_s3_client, mock_blob_s3_client):
+        dummy_s3 = DirectUploadS3Client()
+        mock_s3_client.return_value = dummy_s3
+        mock_blob_s3_client.return_value = dummy_s3
+        body = b'standard operating procedure'
+        items = [
+            EvidenceItem.objects.create(title=f'SOP {index}', category='policy', event_date='2024-02-01', created_by=self.user)
+            for index in range(2)
+        ]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                f'/api/v1/evidence-items/{items[0].id}/files',
+                {'file': SimpleUploadedFile('sop.pdf', body, content_type='application/pdf')},
+                format='multipart',
+            )
+        self.assertEqual(response.status_code, 201)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                f'/api/v1/evidence-items/{items[1].id}/files',
+                {'file': SimpleUploadedFile('sop.pdf', body, content_type='application/pdf')},
+                format='multipart',
+            )
+        self.assertEqual(response.status_code, 201)
+
+        blob = EvidenceBlob.objects.get()
+        self.assertEqual(blob.ref_count, 2)
+        self.assertEqual(set(EvidenceFile.objects.values_list('object_key', flat=True)), {blob.object_key})
+        redundant_key = dummy_s3.uploads[1][1]
+        self.assertEqual(dummy_s3.deleted, [redundant_key])
+
+        direct = self.client.post(f'/api/v1/evidence-items/{items[1].id}/uploads', {
+            'filename': 'sop-copy.pdf',
+            'size_bytes': len(body),
+            'sha256': hashlib.sha256(body).hexdigest(),
+        }, format='json')
+        self.assertEqual(direct.json()['method'], 'EXISTING')
+        completed = self.client.post(
+            f'/api/v1/evidence-items/{items[1].id}/uploads/complete',
+            {'upload_token': direct.json()['upload_token']},
+            format='json',
+        )
+        self.assertEqual(completed.status_code, 201)
+        blob.refresh_from_db()
+        self.assertEqual(blob.ref_count, 3)
+
+        stale = self.client.post(f'/api/v1/evidence-items/{items[0].id}/uploads', {
+            'filename': 'sop-other.pdf',
+            'size_bytes': len(body),
+            'sha256': hashlib.sha256(body).hexdigest(),
+        }, format='json')
+        with patch('apps.evidence.views.reference_blob', return_value=None):
+            gone = self.client.post(
+                f'/api/v1/evidence-items/{items[0].id}/uploads/complete',
+                {'upload_token': stale.json()['upload_token']},
+                format='json',
+            )
+        self.assertEqual(gone.status_code, 409)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            items[1].delete()
+        blob.refresh_from_db()
+        self.assertEqual(blob.ref_count, 1)
+        self.assertNotIn(blob.object_key, dummy_s3.deleted)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            EvidenceFile.objects.get().delete()
+        self.assertFalse(EvidenceBlob.objects.exists())
+        self.assertIn(blob.object_key, dummy_s3.deleted)
+
     def test_link_to_control_and_timeline(self):
         evidence = EvidenceItem.objects.create(
             title='Policy Document',
@@ -114,7 +458,7 @@ class EvidenceAPITests(TestCase):
         self.assertEqual(len(data['evidence_items']), 1)
         self.assertEqual(data['evidence_items'][0]['evidence_item']['id'], str(evidence.id))
 
-    @patch('apps.evidence.views.get_s3_client')
+    @patch('apps.evidence.presign.get_s3_client')
     def test_download_presigned_url(self, mock_s3_client):
         evidence = EvidenceItem.objects.create(
             title='Manual',
@@ -137,3 +481,123 @@ class EvidenceAPITests(TestCase):
         response = self.client.get(f'/api/v1/evidence-files/{evidence_file.id}/download')
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json()['url'], 'http://example.com/presigned')
+
+
+    @override_settings(
+        AWS_S3_ENDPOINT_URL='http://minio:9000',
+        AWS_ACCESS_KEY_ID='minioadmin',
+        AWS_SECRET_ACCESS_KEY='minio-secret',
+        AWS_S3_REGION_NAME='us-east-1',
+    )
+    def test_batch_download_urls_are_signed_locally_like_botocore(self):
+        evidence = EvidenceItem.objects.create(
+            title='Manual', category='manual', event_date='2024-04-01', created_by=self.user,
+        )
+        for name in ('manual.pdf', 'annex 1.pdf'):
+            EvidenceFile.objects.create(
+                evidence_item=evidence,
+                bucket='evidence',
+                object_key=f'evidence/{evidence.id}/{name}',
+                filename=name,
+                content_type='application/pdf',
+                size_bytes=1,
+                sha256=name,
+            )
+        ControlEvidenceLink.objects.create(control=self.control, evidence_item=evidence, linked_by=self.user)
+
+        response = self.client.get(f'/api/v1/evidence-items/{evidence.id}/download-urls')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['files']), 2)
+        timeline = self.client.get(f'/api/v1/controls/{self.control.id}/timeline/download-urls')
+        self.assertEqual(timeline.status_code, 200)
+        self.assertEqual(
+            {row['file_id'] for row in timeline.json()['files']},
+            {row['file_id'] for row in response.json()['files']},
+        )
+
+        signed_at = datetime(2026, 1, 2, 3, 4, 5, tzinfo=dt_timezone.utc)
+        key = f'evidence/{evidence.id}/annex 1.pdf'
+        botocore_client = boto3.client(
+            's3',
+            endpoint_url='http://minio:9000',
+            aws_access_key_id='minioadmin',
+            aws_secret_access_key='minio-secret',
+            region_name='us-east-1',
+            config=Config(signature_version='s3v4'),
+        )
+        with patch('botocore.auth.datetime') as mock_datetime:
+            mock_datetime.datetime.utcnow.return_value = signed_at.replace(tzinfo=None)
+            expected = botocore_client.generate_presigned_url(
+                'get_object', Params={'Bucket': 'evidence', 'Key': key}, ExpiresIn=600,
+            )
+        self.assertEqual(presign_get_object('evidence', key, 600, now=signed_at), expected)
+
+    def test_bulk_link_and_unlink_recomputes_once(self):
+        controls = [self.control] + [
+            Control.objects.create(
+                standard_pack=self.pack,
+                control_code=f'PHC-ROM-00{index}',
+                section='Records',
+                standard='Maintain records',
+                indicator='Records are maintained',
+                sort_order=index,
+                active=True,
+            )
+            for index in range(2, 7)
+        ]
+        policy = EvidenceItem.objects.create(
+            title='Records policy', category='policy', event_date='2024-02-01', created_by=self.user,
+        )
+        ControlEvidenceLink.objects.create(control=self.control, evidence_item=policy, linked_by=self.user)
+
+        def link_payload(selected):
+            return {'link': [{'control_id': control.id, 'evidence_item_id': str(policy.id)} for control in selected]}
+
+        # Compiled rules are kept per process; load them first so both batches do the same work.
+        get_rule_index(self.pack.id)
+        with CaptureQueriesContext(connection) as small_batch:
+            response = self.client.post('/api/v1/evidence-links/bulk', link_payload(controls[:3]), format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['linked']), 2)
+        self.assertEqual(response.json()['already_linked'], 1)
+
+        with CaptureQueriesContext(connection) as large_batch:
+            response = self.client.post('/api/v1/evidence-links/bulk', link_payload(controls), format='json')
+        self.assertEqual(len(response.json()['linked']), 3)
+        self.assertEqual(len(large_batch), len(small_batch))
+
+        self.assertEqual(ControlEvidenceLink.objects.filter(evidence_item=policy).count(), 6)
+        self.assertEqual(AuditEvent.objects.filter(action='EVIDENCE_LINKED').count(), 5)
+        self.assertEqual(ControlStatusCache.objects.filter(control__in=controls[1:]).count(), 5)
+        self.assertFalse(DirtyControl.objects.filter(control__in=controls[1:]).exists())
+
+        response = self.client.post('/api/v1/evidence-links/bulk', {
+            'unlink': [{'control_id': control.id, 'evidence_item_id': str(policy.id)} for control in controls[:2]],
+        }, format='json')
+        self.assertEqual(len(response.json()['unlinked']), 2)
+        self.assertEqual(sorted(response.json()['recomputed_control_ids']), sorted(control.id for control in controls[:2]))
+        self.assertEqual(AuditEvent.objects.filter(action='EVIDENCE_UNLINKED').count(), 2)
+        self.assertEqual(ControlStatusCache.objects.get(control=self.control).computed_status, 'NOT_STARTED')
+
+        missing = self.client.post('/api/v1/evidence-links/bulk', {
+            'link': [{'control_id': 999999, 'evidence_item_id': str(policy.id)}],
+        }, format='json')
+        self.assertEqual(missing.status_code, 400)
+        self.assertEqual(missing.json()['missing_control_ids'], [999999])
+
+
+class S3ClientCacheTests(TestCase):
+    def tearDown(self):
+        reset_s3_clients()
+
+    @override_settings(AWS_S3_ENDPOINT_URL='http://minio:9000', AWS_S3_REGION_NAME='us-east-1', AWS_S3_MAX_POOL_CONNECTIONS=7)
+    def test_client_is_shared_per_settings_profile(self):
+        client = get_s3_client()
+        self.assertIs(get_s3_client(), client)
+        self.assertEqual(client.meta.config.max_pool_connections, 7)
+
+        with override_settings(AWS_S3_ENDPOINT_URL='http://other-minio:9000'):
+            self.assertIsNot(get_s3_client(), client)
+
+        reset_s3_clients()
+        self.assertIsNot(get_s3_client(), client)
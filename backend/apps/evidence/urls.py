@@ -1,18 +1,28 @@
 from django.urls import path
 from .views import (
-    EvidenceItemCreateView,
+    EvidenceItemListCreateView,
     EvidenceFileUploadView,
+    EvidenceUploadInitiateView,
+    EvidenceUploadCompleteView,
     EvidenceFileDownloadView,
+    EvidenceItemDownloadUrlsView,
     ControlEvidenceLinkView,
     ControlEvidenceUnlinkView,
+    BulkControlEvidenceLinkView,
     ControlTimelineView,
+    ControlTimelineDownloadUrlsView,
 )
 
 urlpatterns = [
-    path('evidence-items', EvidenceItemCreateView.as_view(), name='evidence-item-create'),
+    path('evidence-items', EvidenceItemListCreateView.as_view(), name='evidence-item-list'),
     path('evidence-items/<uuid:evidence_item_id>/files', EvidenceFileUploadView.as_view(), name='evidence-item-upload'),
+    path('evidence-items/<uuid:evidence_item_id>/uploads', EvidenceUploadInitiateView.as_view(), name='evidence-item-upload-initiate'),
+    path('evidence-items/<uuid:evidence_item_id>/uploads/complete', EvidenceUploadCompleteView.as_view(), name='evidence-item-upload-complete'),
+    path('evidence-items/<uuid:evidence_item_id>/download-urls', EvidenceItemDownloadUrlsView.as_view(), name='evidence-item-download-urls'),
     path('evidence-files/<uuid:file_id>/download', EvidenceFileDownloadView.as_view(), name='evidence-file-download'),
     path('controls/<int:control_id>/link-evidence', ControlEvidenceLinkView.as_view(), name='control-link-evidence'),
+    path('evidence-links/bulk', BulkControlEvidenceLinkView.as_view(), name='evidence-links-bulk'),
     path('controls/<int:control_id>/unlink-evidence/<uuid:link_id>', ControlEvidenceUnlinkView.as_view(), name='control-unlink-evidence'),
     path('controls/<int:control_id>/timeline', ControlTimelineView.as_view(), name='control-timeline'),
+    path('controls/<int:control_id>/timeline/download-urls', ControlTimelineDownloadUrlsView.as_view(), name='control-timeline-download-urls'),
 ]
@@ -1,4 +1,5 @@
 from typing import Optional
+from apps.audit import sink
 from apps.audit.models import AuditEvent
 
 
@@ -14,13 +15,12 @@ def _get_client_ip(request) -> Optional[str]:
     return request.META.get('REMOTE_ADDR')
 
 
-def create_audit_event(*, request, action, entity_type, entity_id, before_json=None, after_json=None):
-    actor = None
+def _build_audit_event(request, action, entity_type, entity_id, before_json=None, after_json=None, actor=None):
     if request is not None and getattr(request, 'user', None) is not None:
         if request.user.is_authenticated:
             actor = request.user
 
-    AuditEvent.objects.create(
+    return AuditEvent(
         actor=actor,
         action=action,
         entity_type=entity_type,
@@ -30,3 +30,20 @@ def create_audit_event(*, request, action, entity_type, entity_id, before_json=N
         ip_address=_get_client_ip(request),
         user_agent=(request.META.get('HTTP_USER_AGENT', '') if request is not None else ''),
     )
+
+
+def create_audit_event(*, request, action, entity_type, entity_id, before_json=None, after_json=None, actor=None):
+    sink.record(_build_audit_event(
+        request,
+        action,
+        entity_type,
+        entity_id,
+        before_json=before_json,
+        after_json=after_json,
+        actor=actor,
+    ))
+
+
+def create_audit_events(*, request, events, actor=None):
+    """Bulk form of create_audit_event; each event is a dict of its keyword arguments."""
+    sink.record_many([_build_audit_event(request, actor=actor, **event) for event in events])
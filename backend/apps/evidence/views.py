@@ -1,21 +1,51 @@
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
 from django.conf import settings
+from django.db import transaction
+from .blobs import acquire_blob, reference_blob
+from .direct_upload import DirectUploadError, complete_direct_upload, initiate_direct_upload, load_upload_token
 from .models import EvidenceItem, EvidenceFile, ControlEvidenceLink
 from .serializers import EvidenceItemSerializer, EvidenceFileSerializer, ControlEvidenceLinkSerializer
-from .storage import get_s3_client, build_object_key, compute_sha256
-from .utils import create_audit_event
+from .presign import DEFAULT_EXPIRES_IN, presign_get_object
+from .search import search_evidence_items
+from .storage import get_s3_client, build_object_key, upload_with_sha256
+from .utils import create_audit_event, create_audit_events
+from apps.compliance.invalidation import batch_dirty_marking, mark_controls_dirty, recompute_controls
+from apps.compliance.models import DirtyControl
 from apps.users.permissions import CanReadControls, CanWriteEvidence
-from apps.compliance.engine import recompute_and_persist
 from apps.standards.models import Control
 from apps.standards.serializers import ControlSerializer
 
 
-class EvidenceItemCreateView(APIView):
-    permission_classes = [CanWriteEvidence]
+class EvidenceItemListCreateView(APIView):
+    """
+    GET /api/v1/evidence-items - Search evidence across all controls (paginated).
+    POST /api/v1/evidence-items - Create an evidence item.
+    """
+
+    def get_permissions(self):
+        if self.request.method == 'GET':
+            return [IsAuthenticated()]
+        return [CanWriteEvidence()]
+
+    def get(self, request):
+        try:
+            queryset = search_evidence_items(
+                EvidenceItem.objects.prefetch_related('files'),
+                request.query_params,
+            )
+        except ValueError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        paginator = PageNumberPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        return paginator.get_paginated_response(EvidenceItemSerializer(page, many=True).data)
 
     def post(self, request):
         serializer = EvidenceItemSerializer(data=request.data)
@@ -34,6 +64,39 @@ class EvidenceItemCreateView(APIView):
         return Response(response_data, status=status.HTTP_201_CREATED)
 
 
+def _blob_fields(blob):
+    return {
+        'blob': blob,
+        'bucket': blob.bucket,
+        'object_key': blob.object_key,
+        'size_bytes': blob.size_bytes,
+        'sha256': blob.sha256,
+    }
+
+
+def _create_evidence_file(evidence_item, filename, content_type, **stored):
+    """Create the file row for stored content (_blob_fields(), or the fields of an unverified object)."""
+    evidence_file = EvidenceFile.objects.create(
+        evidence_item=evidence_item,
+        filename=filename,
+        content_type=content_type,
+        **stored,
+    )
+    return EvidenceFileSerializer(evidence_file).data
+
+
+def _audit_uploaded_files(request, evidence_files_data):
+    create_audit_events(request=request, events=[
+        {
+            'action': 'EVIDENCE_FILE_UPLOADED',
+            'entity_type': 'EvidenceFile',
+            'entity_id': data['id'],
+            'after_json': data,
+        }
+        for data in evidence_files_data
+    ])
+
+
 class EvidenceFileUploadView(APIView):
     permission_classes = [CanWriteEvidence]
 
@@ -48,44 +111,143 @@ class EvidenceFileUploadView(APIView):
 
         bucket = getattr(settings, 'AWS_STORAGE_BUCKET_NAME', 'evidence')
         s3_client = get_s3_client()
-        created_files = []
 
-        for uploaded_file in files:
+        def upload(uploaded_file):
             object_key = build_object_key(evidence_item.id, uploaded_file.name)
-            sha256 = compute_sha256(uploaded_file)
+            content_type = uploaded_file.content_type or 'application/octet-stream'
+            reader = upload_with_sha256(s3_client, uploaded_file, bucket, object_key, content_type)
+            return uploaded_file, object_key, content_type, reader
+
+        # Files are hashed while they stream to storage, and several files upload at once.
+        max_workers = min(len(files), getattr(settings, 'EVIDENCE_UPLOAD_PARALLEL_FILES', 4))
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = [pool.submit(upload, uploaded_file) for uploaded_file in files]
+        uploaded, errors = [], []
+        for future in futures:
             try:
-                uploaded_file.seek(0)
-            except Exception:
-                pass
+                uploaded.append(future.result())
+            except Exception as exc:
+                errors.append(exc)
+        if errors:
+            for _, object_key, _, _ in uploaded:
+                try:
+                    s3_client.delete_object(Bucket=bucket, Key=object_key)
+                except Exception:
+                    pass
+            raise errors[0]
 
-            content_type = uploaded_file.content_type or 'application/octet-stream'
-            s3_client.upload_fileobj(
-                uploaded_file,
-                bucket,
-                object_key,
-                ExtraArgs={'ContentType': content_type},
-            )
+        # One transaction for all files, so their audit events go out in one INSERT.
+        created_files = []
+        with transaction.atomic():
+            for uploaded_file, object_key, content_type, reader in uploaded:
+                blob = acquire_blob(reader.sha256, reader.size, bucket, object_key)
+                created_files.append(_create_evidence_file(
+                    evidence_item,
+                    filename=uploaded_file.name,
+                    content_type=content_type,
+                    **_blob_fields(blob),
+                ))
+            _audit_uploaded_files(request, created_files)
 
-            evidence_file = EvidenceFile.objects.create(
-                evidence_item=evidence_item,
-                bucket=bucket,
-                object_key=object_key,
-                filename=uploaded_file.name,
-                content_type=content_type,
-                size_bytes=uploaded_file.size,
-                sha256=sha256,
+        return Response({'files': created_files}, status=status.HTTP_201_CREATED)
+
+
+class EvidenceUploadInitiateView(APIView):
+    permission_classes = [CanWriteEvidence]
+
+    def post(self, request, evidence_item_id):
+        evidence_item = get_object_or_404(EvidenceItem, pk=evidence_item_id)
+        try:
+            size_bytes = int(request.data.get('size_bytes'))
+        except (TypeError, ValueError):
+            return Response({'detail': 'size_bytes must be a positive integer.'}, status=status.HTTP_400_BAD_REQUEST)
+        part_size = request.data.get('part_size')
+        try:
+            part_size = int(part_size) if part_size is not None else None
+        except (TypeError, ValueError):
+            return Response({'detail': 'part_size must be an integer.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            payload = initiate_direct_upload(
+                get_s3_client(),
+                evidence_item,
+                filename=request.data.get('filename'),
+                content_type=request.data.get('content_type'),
+                size_bytes=size_bytes,
+                sha256=request.data.get('sha256'),
+                part_size=part_size,
+                part_sha256=request.data.get('part_sha256'),
             )
-            evidence_file_data = EvidenceFileSerializer(evidence_file).data
-            created_files.append(evidence_file_data)
-            create_audit_event(
-                request=request,
-                action='EVIDENCE_FILE_UPLOADED',
-                entity_type='EvidenceFile',
-                entity_id=evidence_file.id,
-                after_json=evidence_file_data,
+        except DirectUploadError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(payload, status=status.HTTP_200_OK)
+
+
+class EvidenceUploadCompleteView(APIView):
+    permission_classes = [CanWriteEvidence]
+
+    def post(self, request, evidence_item_id):
+        evidence_item = get_object_or_404(EvidenceItem, pk=evidence_item_id)
+        try:
+            state = load_upload_token(request.data.get('upload_token'), evidence_item.id)
+        except DirectUploadError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # A retried complete for content already registered under the same name is a no-op.
+        existing = EvidenceFile.objects.filter(
+            evidence_item=evidence_item,
+            sha256=state['sha256'],
+            filename=state['filename'],
+        ).first()
+        if existing is not None:
+            return Response(EvidenceFileSerializer(existing).data, status=status.HTTP_200_OK)
+
+        try:
+            verified = complete_direct_upload(get_s3_client(), state, parts=request.data.get('parts'))
+        except DirectUploadError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            if state['blob_id']:
+                blob = reference_blob(state['blob_id'])
+                if blob is None:
+                    return Response({'detail': 'Stored content is gone; upload the file again.'}, status=status.HTTP_409_CONFLICT)
+                stored = _blob_fields(blob)
+            elif verified:
+                blob = acquire_blob(state['sha256'], state['size_bytes'], state['bucket'], state['object_key'])
+                stored = _blob_fields(blob)
+            else:
+                # The blob is assigned once process_direct_uploads has hashed the object.
+                stored = {
+                    'bucket': state['bucket'],
+                    'object_key': state['object_key'],
+                    'size_bytes': state['size_bytes'],
+                    'sha256': state['sha256'],
+                }
+            evidence_file_data = _create_evidence_file(
+                evidence_item,
+                filename=state['filename'],
+                content_type=state['content_type'],
+                **stored,
             )
+            _audit_uploaded_files(request, [evidence_file_data])
+        return Response(evidence_file_data, status=status.HTTP_201_CREATED)
 
-        return Response({'files': created_files}, status=status.HTTP_201_CREATED)
+
+def _download_urls_payload(evidence_files):
+    expires_in = DEFAULT_EXPIRES_IN
+    return {
+        'files': [
+            {
+                'file_id': str(evidence_file.id),
+                'evidence_item_id': str(evidence_file.evidence_item_id),
+                'filename': evidence_file.filename,
+                'url': presign_get_object(evidence_file.bucket, evidence_file.object_key, expires_in),
+            }
+            for evidence_file in evidence_files
+        ],
+        'expires_in': expires_in,
+    }
 
 
 class EvidenceFileDownloadView(APIView):
@@ -93,16 +255,32 @@ class EvidenceFileDownloadView(APIView):
 
     def get(self, request, file_id):
         evidence_file = get_object_or_404(EvidenceFile, pk=file_id)
-        s3_client = get_s3_client()
-        expires_in = 600
-        url = s3_client.generate_presigned_url(
-            'get_object',
-            Params={'Bucket': evidence_file.bucket, 'Key': evidence_file.object_key},
-            ExpiresIn=expires_in,
-        )
+        expires_in = DEFAULT_EXPIRES_IN
+        url = presign_get_object(evidence_file.bucket, evidence_file.object_key, expires_in)
         return Response({'url': url, 'expires_in': expires_in}, status=status.HTTP_200_OK)
 
 
+class EvidenceItemDownloadUrlsView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, evidence_item_id):
+        evidence_item = get_object_or_404(EvidenceItem, pk=evidence_item_id)
+        return Response(_download_urls_payload(evidence_item.files.all()), status=status.HTTP_200_OK)
+
+
+class ControlTimelineDownloadUrlsView(APIView):
+    permission_classes = [CanReadControls]
+
+    def get(self, request, control_id):
+        control = get_object_or_404(Control, pk=control_id)
+        evidence_files = (
+            EvidenceFile.objects
+            .filter(evidence_item__control_links__control=control)
+            .order_by('-evidence_item__event_date', '-evidence_item__created_at', '-uploaded_at')
+        )
+        return Response(_download_urls_payload(evidence_files), status=status.HTTP_200_OK)
+
+
 class ControlEvidenceLinkView(APIView):
     permission_classes = [CanWriteEvidence]
 
@@ -134,10 +312,122 @@ class ControlEvidenceLinkView(APIView):
                 entity_id=link.id,
                 after_json=response_data,
             )
-            recompute_and_persist(control)
         return Response(response_data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
 
 
+def _parse_link_pairs(rows):
+    """Return [(control_id, evidence_item_id, row)] or raise ValueError for malformed rows."""
+    pairs = []
+    for row in rows or []:
+        try:
+            pairs.append((int(row['control_id']), uuid.UUID(str(row['evidence_item_id'])), row))
+        except (KeyError, TypeError, ValueError):
+            raise ValueError('Each pair needs a control_id and an evidence_item_id.')
+    return pairs
+
+
+class BulkControlEvidenceLinkView(APIView):
+    """
+    Link and unlink many (control, evidence item) pairs in one request.
+
+    Links are inserted with one bulk_create, audit events are written in bulk,
+    and the affected controls are recomputed once at the end.
+    """
+    permission_classes = [CanWriteEvidence]
+    max_pairs = 1000
+
+    def post(self, request):
+        try:
+            to_link = _parse_link_pairs(request.data.get('link'))
+            to_unlink = _parse_link_pairs(request.data.get('unlink'))
+        except ValueError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        if not to_link and not to_unlink:
+            return Response({'detail': 'Provide link and/or unlink pairs.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(to_link) + len(to_unlink) > self.max_pairs:
+            return Response({'detail': f'At most {self.max_pairs} pairs per request.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        control_ids = {control_id for control_id, _, _ in to_link}
+        evidence_item_ids = {evidence_item_id for _, evidence_item_id, _ in to_link}
+        missing_controls = control_ids - set(Control.objects.filter(id__in=control_ids).values_list('id', flat=True))
+        missing_items = evidence_item_ids - set(EvidenceItem.objects.filter(id__in=evidence_item_ids).values_list('id', flat=True))
+        if missing_controls or missing_items:
+            return Response(
+                {
+                    'detail': 'Unknown controls or evidence items.',
+                    'missing_control_ids': sorted(missing_controls),
+                    'missing_evidence_item_ids': sorted(str(item_id) for item_id in missing_items),
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        linked_by = request.user if request.user.is_authenticated else None
+        unlinked, created, created_data = [], [], []
+        with transaction.atomic(), batch_dirty_marking() as affected:
+            if to_unlink:
+                unlink_pairs = {(control_id, evidence_item_id) for control_id, evidence_item_id, _ in to_unlink}
+                candidates = ControlEvidenceLink.objects.select_related('evidence_item').prefetch_related('evidence_item__files').filter(
+                    control_id__in={control_id for control_id, _ in unlink_pairs},
+                    evidence_item_id__in={evidence_item_id for _, evidence_item_id in unlink_pairs},
+                )
+                unlinked = [link for link in candidates if (link.control_id, link.evidence_item_id) in unlink_pairs]
+                unlinked_data = ControlEvidenceLinkSerializer(unlinked, many=True).data
+                ControlEvidenceLink.objects.filter(id__in=[link.id for link in unlinked]).delete()
+                create_audit_events(request=request, events=[
+                    {
+                        'action': 'EVIDENCE_UNLINKED',
+                        'entity_type': 'ControlEvidenceLink',
+                        'entity_id': data['id'],
+                        'before_json': data,
+                    }
+                    for data in unlinked_data
+                ])
+
+            if to_link:
+                new_links = {
+                    (control_id, evidence_item_id): ControlEvidenceLink(
+                        control_id=control_id,
+                        evidence_item_id=evidence_item_id,
+                        relevance_note=row.get('note'),
+                        linked_by=linked_by,
+                    )
+                    for control_id, evidence_item_id, row in to_link
+                }
+                ControlEvidenceLink.objects.bulk_create(new_links.values(), ignore_conflicts=True)
+                # ignore_conflicts cannot report which rows were skipped; read back the ones we own.
+                created = list(
+                    ControlEvidenceLink.objects
+                    .select_related('evidence_item')
+                    .prefetch_related('evidence_item__files')
+                    .filter(id__in=[link.id for link in new_links.values()])
+                )
+                created_data = ControlEvidenceLinkSerializer(created, many=True).data
+                create_audit_events(request=request, events=[
+                    {
+                        'action': 'EVIDENCE_LINKED',
+                        'entity_type': 'ControlEvidenceLink',
+                        'entity_id': data['id'],
+                        'after_json': data,
+                    }
+                    for data in created_data
+                ])
+                # bulk_create sends no post_save, so mark the new links here.
+                mark_controls_dirty([link.control_id for link in created], DirtyControl.REASON_LINK)
+
+            affected_ids = set(affected)
+        recompute_controls(affected_ids)
+
+        return Response(
+            {
+                'linked': created_data,
+                'already_linked': len(to_link) - len(created),
+                'unlinked': [str(link.id) for link in unlinked],
+                'recomputed_control_ids': sorted(affected_ids),
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
 class ControlEvidenceUnlinkView(APIView):
     permission_classes = [CanWriteEvidence]
 
@@ -152,8 +442,6 @@ class ControlEvidenceUnlinkView(APIView):
             entity_id=link_id,
             before_json=before_data,
         )
-        control = link.control
-        recompute_and_persist(control)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
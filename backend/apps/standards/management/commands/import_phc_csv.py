@@ -2,7 +2,7 @@ import csv
 from pathlib import Path
 from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
-from apps.standards.models import StandardPack, Control
+from apps.standards.models import StandardPack, Control, section_code_from_control_code
 from apps.standards.phc_import_utils import (
     normalize_whitespace,
     normalize_key,
@@ -163,6 +163,8 @@ class Command(BaseCommand):
                 
                 controls_data.append({
                     'control_code': control_code,
+                    # Set here because bulk_create below bypasses Control.save().
+                    'section_code': section_code_from_control_code(control_code),
                     'section': section,
                     'standard': standard,
                     'indicator': indicator,
@@ -209,8 +211,7 @@ class Command(BaseCommand):
                 # Summary output
                 section_summary = {}
                 for control in controls_data:
-                    section_code = control['control_code'].split('-')[1]
-                    section_summary.setdefault(section_code, []).append(control['control_code'])
+                    section_summary.setdefault(control['section_code'], []).append(control['control_code'])
                 self.stdout.write("Counts by section code:")
                 for section_code in sorted(section_summary.keys()):
                     count = len(section_summary[section_code])
@@ -0,0 +1,36 @@
+from django.db import migrations
+
+
+def add_search_vector(apps, schema_editor):
+    # A generated tsvector column keeps itself up to date on every insert and
+    # update. SQLite has no equivalent; search there falls back to LIKE.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        """
+        ALTER TABLE standards_control ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('english'::regconfig, coalesce(control_code, '')), 'A') ||
+            setweight(to_tsvector('english'::regconfig, coalesce(section, '')), 'B') ||
+            setweight(to_tsvector('english'::regconfig, coalesce(standard, '')), 'C') ||
+            setweight(to_tsvector('english'::regconfig, coalesce(indicator, '')), 'D')
+        ) STORED
+        """
+    )
+    schema_editor.execute('CREATE INDEX standards_control_search_vector ON standards_control USING gin (search_vector)')
+
+
+def remove_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('ALTER TABLE standards_control DROP COLUMN IF EXISTS search_vector')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('standards', '0002_alter_control_control_code_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_search_vector, remove_search_vector),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.14 on 2026-10-17 03:37
+
+from django.db import migrations, models
+
+
+def backfill_section_codes(apps, schema_editor):
+    """Store the section part of every existing control_code ('UNK' when it has none)."""
+    Control = apps.get_model('standards', 'Control')
+
+    batch = []
+    for control in Control.objects.only('id', 'control_code').iterator(chunk_size=2000):
+        parts = (control.control_code or '').split('-')
+        control.section_code = parts[1] if len(parts) == 3 and all(parts) else 'UNK'
+        batch.append(control)
+        if len(batch) == 2000:
+            Control.objects.bulk_update(batch, ['section_code'])
+            batch = []
+    if batch:
+        Control.objects.bulk_update(batch, ['section_code'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('standards', '0003_control_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='control',
+            name='section_code',
+            field=models.CharField(default='', editable=False, help_text='Section part of control_code, e.g., ROM; kept in sync on save', max_length=50),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_section_codes, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='control',
+            index=models.Index(fields=['standard_pack', 'section_code', 'sort_order'], name='standards_c_standar_6d5f02_idx'),
+        ),
+    ]
@@ -3,6 +3,16 @@ from django.core.exceptions import ValidationError
 from django.utils import timezone
 import hashlib
 
+UNKNOWN_SECTION_CODE = 'UNK'
+
+
+def section_code_from_control_code(control_code: str) -> str:
+    """'PHC-ROM-001' -> 'ROM'; codes not shaped AUTHORITY-SECTION-NUMBER give 'UNK'."""
+    parts = (control_code or '').split('-')
+    if len(parts) == 3 and parts[0] and parts[1] and parts[2]:
+        return parts[1]
+    return UNKNOWN_SECTION_CODE
+
 
 class StandardPack(models.Model):
     """
@@ -63,6 +73,11 @@ class Control(models.Model):
         db_index=True,
         help_text="e.g., PHC-ROM-001"
     )
+    section_code = models.CharField(
+        max_length=50,
+        editable=False,
+        help_text="Section part of control_code, e.g., ROM; kept in sync on save"
+    )
     section = models.CharField(max_length=255, db_index=True, help_text="Section name")
     standard = models.TextField(help_text="Standard description")
     indicator = models.TextField(help_text="Indicator/requirement text")
@@ -76,6 +91,9 @@ class Control(models.Model):
         verbose_name = 'Control'
         verbose_name_plural = 'Controls'
         unique_together = [['standard_pack', 'control_code']]
+        indexes = [
+            models.Index(fields=['standard_pack', 'section_code', 'sort_order']),
+        ]
     
     def __str__(self):
         return f"{self.control_code}: {self.section}"
@@ -96,5 +114,7 @@ class Control(models.Model):
     
     def save(self, *args, **kwargs):
         """Enforce immutability on save"""
+        # bulk_create skips this; callers set section_code themselves.
+        self.section_code = section_code_from_control_code(self.control_code)
         self.full_clean()
         super().save(*args, **kwargs)
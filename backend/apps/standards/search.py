@@ -0,0 +1,60 @@
+import re
+
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank, SearchVectorField
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Control
+
+SEARCH_CONFIG = 'english'
+_TERM_RE = re.compile(r'\w+')
+
+
+def full_text_search_enabled() -> bool:
+    """The search_vector column and its GIN index only exist on PostgreSQL (migration 0003)."""
+    return connection.vendor == 'postgresql'
+
+
+def prefix_query(text: str) -> SearchQuery | None:
+    """Match every term in text as a word prefix, so 'lab saf' finds 'laboratory safety'."""
+    terms = _TERM_RE.findall(text.lower())
+    if not terms:
+        return None
+    return SearchQuery(' & '.join(f'{term}:*' for term in terms), config=SEARCH_CONFIG, search_type='raw')
+
+
+def search_controls(queryset, text: str):
+    """
+    Filter controls to those matching text.
+
+    On PostgreSQL results are ranked, with control codes weighted above
+    sections and sections above the standard and indicator text, and each
+    result carries a search_highlight snippet of its indicator.
+    Elsewhere this falls back to substring matching in sort order.
+    """
+    query = prefix_query(text) if full_text_search_enabled() else None
+    if query is None:
+        return queryset.filter(
+            Q(control_code__icontains=text) |
+            Q(section__icontains=text) |
+            Q(standard__icontains=text) |
+            Q(indicator__icontains=text)
+        )
+    vector = RawSQL(f'{Control._meta.db_table}.search_vector', [], output_field=SearchVectorField())
+    return (
+        queryset.annotate(search_vector=vector)
+        .filter(search_vector=query)
+        .annotate(
+            search_rank=SearchRank(vector, query),
+            search_highlight=SearchHeadline(
+                'indicator',
+                query,
+                config=SEARCH_CONFIG,
+                start_sel='<mark>',
+                stop_sel='</mark>',
+                max_fragments=2,
+            ),
+        )
+        .order_by('-search_rank', 'sort_order')
+    )
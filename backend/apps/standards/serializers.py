@@ -6,6 +6,7 @@ class ControlSerializer(serializers.ModelSerializer):
     status = serializers.SerializerMethodField()
     last_evidence_date = serializers.SerializerMethodField()
     next_due_date = serializers.SerializerMethodField()
+    search_highlight = serializers.SerializerMethodField()
     
     class Meta:
         model = Control
@@ -20,6 +21,7 @@ class ControlSerializer(serializers.ModelSerializer):
             'status',
             'last_evidence_date',
             'next_due_date',
+            'search_highlight',
         ]
     
     def get_status(self, obj):
@@ -28,6 +30,10 @@ class ControlSerializer(serializers.ModelSerializer):
             return cache.computed_status
         return 'NOT_STARTED'
 
+    def get_search_highlight(self, obj):
+        # Only set on results of a full-text search.
+        return getattr(obj, 'search_highlight', None)
+
     def get_last_evidence_date(self, obj):
         cache = getattr(obj, 'status_cache', None)
         if cache and cache.last_evidence_date:
@@ -1,3 +1,55 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from .models import Control, StandardPack
+
+
+class ControlSearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(user=get_user_model().objects.create_user(username='reader', password='pass1234'))
+        pack = StandardPack.objects.create(
+            authority_code='PHC',
+            name='PHC Lab Licensing Checklist',
+            version='1.0',
+            status='draft',
+            checksum='search-tests-checksum',
+        )
+        rows = [
+            ('PHC-ROM-001', 'Records', 'Maintain records', 'Records are maintained'),
+            ('PHC-SAF-001', 'Safety', 'Laboratory safety', 'Fire extinguishers are inspected'),
+            ('PHC-ROM-002', 'Records', 'Maintain register', 'Safety incidents are recorded in the register'),
+        ]
+        for index, (code, section, standard, indicator) in enumerate(rows, start=1):
+            Control.objects.create(
+                standard_pack=pack,
+                control_code=code,
+                section=section,
+                standard=standard,
+                indicator=indicator,
+                sort_order=index,
+            )
+
+    def test_search_matches_across_fields(self):
+        response = self.client.get('/api/v1/controls/', {'q': 'safety'})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual({row['control_code'] for row in results}, {'PHC-SAF-001', 'PHC-ROM-002'})
+
+        if connection.vendor == 'postgresql':
+            # Section matches outrank indicator matches; prefixes match whole words.
+            self.assertEqual(results[0]['control_code'], 'PHC-SAF-001')
+            self.assertIn('<mark>Safety</mark>', results[1]['search_highlight'])
+            prefixed = self.client.get('/api/v1/controls/', {'q': 'extinguish insp'}).json()['results']
+            self.assertEqual([row['control_code'] for row in prefixed], ['PHC-SAF-001'])
+
+    def test_section_code_follows_control_code(self):
+        control = Control.objects.get(control_code='PHC-SAF-001')
+        self.assertEqual(control.section_code, 'SAF')
+        control.control_code = 'PHC-ROM-003'
+        control.save()
+        self.assertEqual(Control.objects.filter(section_code='ROM').count(), 3)
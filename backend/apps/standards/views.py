@@ -1,13 +1,14 @@
-from rest_framework import viewsets, filters
+from rest_framework import viewsets
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
-from django.db.models import Q
+from apps.compliance.response_cache import cached_response, get_version
 from apps.users.permissions import CanReadControls
 
 from .models import Control, StandardPack
+from .search import search_controls
 from .serializers import ControlSerializer, StandardPackSerializer
-import boto3
+from apps.evidence.storage import get_s3_client
 from botocore.exceptions import ClientError
 from django.conf import settings
 from django.db import connection
@@ -16,13 +17,11 @@ from django.db import connection
 class ControlViewSet(viewsets.ReadOnlyModelViewSet):
     """
     API endpoint for listing and retrieving controls.
-    Supports filtering by section and text search.
+    Supports filtering by section and ranked full-text search (?q=, or ?search=).
     """
     queryset = Control.objects.select_related('standard_pack', 'status_cache').filter(active=True)
     serializer_class = ControlSerializer
     permission_classes = [CanReadControls]
-    filter_backends = [filters.SearchFilter]
-    search_fields = ['control_code', 'section', 'standard', 'indicator']
     
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -33,17 +32,22 @@ class ControlViewSet(viewsets.ReadOnlyModelViewSet):
             queryset = queryset.filter(section__icontains=section)
         
         # Text search
-        q = self.request.query_params.get('q', None)
+        q = self.request.query_params.get('q') or self.request.query_params.get('search')
         if q:
-            queryset = queryset.filter(
-                Q(control_code__icontains=q) |
-                Q(section__icontains=q) |
-                Q(standard__icontains=q) |
-                Q(indicator__icontains=q)
-            )
+            queryset = search_controls(queryset, q)
         
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        # The list is the same for every reader, so it is served from the
+        # shared response cache until a control, status or pack changes.
+        return cached_response(
+            request,
+            'controls',
+            get_version(),
+            lambda: super(ControlViewSet, self).list(request, *args, **kwargs).data,
+        )
+
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
@@ -74,14 +78,7 @@ def health_check(request):
     # Check MinIO
     if settings.USE_S3:
         try:
-            s3_client = boto3.client(
-                's3',
-                endpoint_url=settings.AWS_S3_ENDPOINT_URL,
-                aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-                aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-                region_name=settings.AWS_S3_REGION_NAME,
-                verify=settings.AWS_S3_VERIFY,
-            )
+            s3_client = get_s3_client()
             # Try to list buckets
             response = s3_client.list_buckets()
             health_status['checks']['minio'] = 'ok'
@@ -123,14 +123,14 @@ class AuthAndRBACTests(TestCase):
             def generate_presigned_url(self, *a, **k):
                 return 'http://example.com/presigned'
 
-        with patch('apps.compliance.views.get_s3_client') as mock_s3:
+        with patch('apps.evidence.presign.get_s3_client') as mock_s3:
             mock_s3.return_value = DummyS3()
             export_resp = self.client.post(
                 f'/api/v1/exports/control/{self.control.id}',
                 {},
                 format='json',
             )
-        self.assertEqual(export_resp.status_code, 201)
+        self.assertEqual(export_resp.status_code, 202)
 
     def test_admin_can_create_users_and_assign_roles(self):
         admin = User.objects.create_user(username='admin', password='admin12345')
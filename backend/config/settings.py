@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/6.0/ref/settings/
 
 from pathlib import Path
 import os
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -62,6 +63,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'apps.audit.sink.AuditBufferMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -106,6 +108,30 @@ else:
         }
     }
 
+# Cache
+# CACHE_BACKEND is locmem (per process), file (CACHE_LOCATION is a directory
+# shared by every process) or redis (CACHE_LOCATION is a redis:// URL of any
+# Redis-compatible server; needs the redis package).
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'locmem')
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+}
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND],
+        'LOCATION': os.getenv('CACHE_LOCATION', '/tmp/accredivault-cache' if CACHE_BACKEND == 'file' else ''),
+    }
+}
+if CACHE_BACKEND == 'locmem' and not DEBUG:
+    # Cache invalidation relies on version stamps every process can see.
+    raise ImproperlyConfigured('CACHE_BACKEND=locmem is per process; use file or redis when DEBUG is off.')
+# Cached dashboard, alert and control list responses live this many seconds.
+# Writes invalidate them straight away; with locmem, writes made by other
+# processes (compliance cron, export worker) only show once this expires.
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', '60'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -176,6 +202,7 @@ CORS_ALLOWED_ORIGINS = [
 ]
 CORS_ALLOW_ALL_ORIGINS = not bool(CORS_ALLOWED_ORIGINS)
 CORS_ALLOW_CREDENTIALS = True
+CORS_EXPOSE_HEADERS = ['X-Next-Cursor', 'ETag', 'Last-Modified']
 CSRF_TRUSTED_ORIGINS = [
     origin.strip()
     for origin in os.getenv('CSRF_TRUSTED_ORIGINS', '').split(',')
@@ -204,9 +231,37 @@ if USE_S3:
     # Storage backends
     DEFAULT_FILE_STORAGE = 'storages.backends.s3boto3.S3Boto3Storage'
     
+# Shared S3 client tuning (see apps.evidence.storage.get_s3_client)
+AWS_S3_MAX_POOL_CONNECTIONS = int(os.getenv('AWS_S3_MAX_POOL_CONNECTIONS', '20'))
+AWS_S3_CONNECT_TIMEOUT = float(os.getenv('AWS_S3_CONNECT_TIMEOUT', '5'))
+AWS_S3_READ_TIMEOUT = float(os.getenv('AWS_S3_READ_TIMEOUT', '60'))
+AWS_S3_MAX_ATTEMPTS = int(os.getenv('AWS_S3_MAX_ATTEMPTS', '3'))
+
 # Additional MinIO buckets
 MINIO_BUCKET_EXPORTS = os.getenv('MINIO_BUCKET_EXPORTS', 'exports')
 
+# PDF exports render EXPORT_RENDER_CHUNK_SIZE controls at a time to temp files,
+# on EXPORT_RENDER_WORKERS processes when there is more than one chunk (1
+# renders in-process). The chunks are then streamed into the export with page
+# footers, so render memory follows the chunk size, not the pack size.
+EXPORT_RENDER_WORKERS = int(os.getenv('EXPORT_RENDER_WORKERS', '1'))
+EXPORT_RENDER_CHUNK_SIZE = int(os.getenv('EXPORT_RENDER_CHUNK_SIZE', '200'))
+
+# Evidence uploads stream to storage in multipart parts of EVIDENCE_UPLOAD_PART_SIZE
+# bytes, EVIDENCE_UPLOAD_MAX_CONCURRENCY parts at a time per file, and up to
+# EVIDENCE_UPLOAD_PARALLEL_FILES files of one request at a time.
+EVIDENCE_UPLOAD_PART_SIZE = int(os.getenv('EVIDENCE_UPLOAD_PART_SIZE', str(8 * 1024 * 1024)))
+EVIDENCE_UPLOAD_MAX_CONCURRENCY = int(os.getenv('EVIDENCE_UPLOAD_MAX_CONCURRENCY', '4'))
+EVIDENCE_UPLOAD_PARALLEL_FILES = int(os.getenv('EVIDENCE_UPLOAD_PARALLEL_FILES', '4'))
+# Lifetime in seconds of presigned URLs for direct browser uploads.
+EVIDENCE_DIRECT_UPLOAD_EXPIRES = int(os.getenv('EVIDENCE_DIRECT_UPLOAD_EXPIRES', '3600'))
+
+# Audit events stay in the database for AUDIT_HOT_RETENTION_MONTHS whole months;
+# manage_audit_partitions archives older months to the exports bucket and keeps
+# AUDIT_PARTITION_MONTHS_AHEAD monthly partitions created in advance.
+AUDIT_HOT_RETENTION_MONTHS = int(os.getenv('AUDIT_HOT_RETENTION_MONTHS', '12'))
+AUDIT_PARTITION_MONTHS_AHEAD = int(os.getenv('AUDIT_PARTITION_MONTHS_AHEAD', '3'))
+
 # Static files
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
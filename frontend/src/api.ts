@@ -1,8 +1,12 @@
+import { Sha256 } from './sha256';
+
 export const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || 'http://localhost:8000/api/v1';
 
 const STORAGE_ACCESS = 'accv_access';
 const STORAGE_REFRESH = 'accv_refresh';
 const STORAGE_USER = 'accv_user';
+// Matches the backend's default EVIDENCE_UPLOAD_PART_SIZE, the smallest part it accepts.
+const DIRECT_UPLOAD_PART_SIZE = 8 * 1024 * 1024;
 
 export interface AuthUser {
   id: number;
@@ -30,6 +34,7 @@ export interface Control {
   status: string;
   last_evidence_date?: string | null;
   next_due_date?: string | null;
+  search_highlight?: string | null;
 }
 
 export interface EvidenceFile {
@@ -41,6 +46,13 @@ export interface EvidenceFile {
   uploaded_at: string;
 }
 
+export interface Paginated<T> {
+  count: number;
+  next: string | null;
+  previous: string | null;
+  results: T[];
+}
+
 export interface EvidenceItem {
   id: string;
   title: string;
@@ -105,6 +117,20 @@ export interface ExportJob {
   size_bytes?: number | null;
   sha256?: string | null;
   error_text?: string | null;
+  attempts?: number;
+  progress?: number;
+  started_at?: string | null;
+  fingerprint?: string | null;
+}
+
+export interface DownloadUrls {
+  files: { file_id: string; evidence_item_id: string; filename: string; url: string }[];
+  expires_in: number;
+}
+
+export interface ExportResult {
+  job: ExportJob;
+  download: { url: string; expires_in: number };
 }
 
 export interface DashboardSummary {
@@ -167,6 +193,21 @@ export interface AuditEvent {
   summary: string;
 }
 
+export interface AuditEventsPage {
+  events: AuditEvent[];
+  nextCursor: string | null;
+}
+
+export interface AuditArchive {
+  id: number;
+  period_start: string;
+  period_end: string;
+  row_count: number;
+  size_bytes: number;
+  sha256: string;
+  download_url: string;
+}
+
 export interface UserList {
   id: number;
   username: string;
@@ -296,6 +337,12 @@ async function authFetch(
   return response;
 }
 
+function toHex(digest: ArrayBuffer): string {
+  return Array.from(new Uint8Array(digest))
+    .map((byte) => byte.toString(16).padStart(2, '0'))
+    .join('');
+}
+
 async function checkOk(response: Response): Promise<void> {
   if (!response.ok) {
     let msg = response.statusText;
@@ -356,36 +403,60 @@ export const api = {
     return response.json();
   },
 
-  async createControlExport(controlId: number): Promise<{ job: ExportJob; download: { url: string; expires_in: number } }> {
+  async createControlExport(controlId: number, force = false): Promise<ExportResult> {
     const response = await authFetch(`${API_BASE_URL}/exports/control/${controlId}`, {
       method: 'POST',
       headers: { 'Content-Type': 'application/json' },
-      body: JSON.stringify({}),
+      body: JSON.stringify({ force }),
     });
     await checkOk(response);
-    return response.json();
+    return api.waitForExport(await response.json());
   },
 
-  async createSectionExport(sectionCode: string): Promise<{ job: ExportJob; download: { url: string; expires_in: number } }> {
+  async createSectionExport(sectionCode: string, force = false): Promise<ExportResult> {
     const response = await authFetch(`${API_BASE_URL}/exports/section/${sectionCode}`, {
       method: 'POST',
       headers: { 'Content-Type': 'application/json' },
-      body: JSON.stringify({}),
+      body: JSON.stringify({ force }),
     });
     await checkOk(response);
-    return response.json();
+    return api.waitForExport(await response.json());
   },
 
-  async createFullExport(): Promise<{ job: ExportJob; download: { url: string; expires_in: number } }> {
+  async createFullExport(force = false): Promise<ExportResult> {
     const response = await authFetch(`${API_BASE_URL}/exports/full`, {
       method: 'POST',
       headers: { 'Content-Type': 'application/json' },
-      body: JSON.stringify({}),
+      body: JSON.stringify({ force }),
     });
     await checkOk(response);
+    return api.waitForExport(await response.json());
+  },
+
+  async getExportJob(jobId: string): Promise<{ job: ExportJob; download?: { url: string; expires_in: number } }> {
+    const response = await authFetch(`${API_BASE_URL}/exports/${jobId}`);
+    await checkOk(response);
     return response.json();
   },
 
+  // Exports are rendered by a background worker; poll until the job settles.
+  // Jobs reused from an identical earlier export come back already completed with a download.
+  async waitForExport(
+    initial: { job: ExportJob; download?: { url: string; expires_in: number } },
+    intervalMs = 1500,
+  ): Promise<ExportResult> {
+    const job = initial.job;
+    let current = initial;
+    while (current.job.status === 'QUEUED' || current.job.status === 'RUNNING') {
+      await new Promise((resolve) => setTimeout(resolve, intervalMs));
+      current = await api.getExportJob(job.id);
+    }
+    if (current.job.status !== 'COMPLETED' || !current.download) {
+      throw new Error(current.job.error_text || 'Export failed');
+    }
+    return { job: current.job, download: current.download };
+  },
+
   async downloadExport(jobId: string): Promise<{ url: string; expires_in: number }> {
     const response = await authFetch(`${API_BASE_URL}/exports/${jobId}/download`);
     await checkOk(response);
@@ -443,6 +514,27 @@ export const api = {
     await checkOk(response);
   },
 
+  async searchEvidenceItems(params?: {
+    q?: string;
+    category?: string;
+    subtype?: string;
+    event_date_from?: string;
+    event_date_to?: string;
+    expires_after?: string;
+    expires_before?: string;
+    unlinked?: boolean;
+    page?: number;
+  }): Promise<Paginated<EvidenceItem>> {
+    const sp = new URLSearchParams();
+    for (const [key, value] of Object.entries(params ?? {})) {
+      if (value) sp.append(key, String(value));
+    }
+    const qs = sp.toString();
+    const response = await authFetch(`${API_BASE_URL}/evidence-items${qs ? `?${qs}` : ''}`);
+    await checkOk(response);
+    return response.json();
+  },
+
   async createEvidenceItem(payload: {
     title: string;
     category: string;
@@ -472,6 +564,70 @@ export const api = {
     return response.json();
   },
 
+  // Sends file bytes straight to object storage with presigned URLs; the API only
+  // hands out the URLs and verifies the stored object before registering it.
+  async uploadEvidenceFileDirect(evidenceItemId: string, file: File): Promise<EvidenceFile> {
+    // One pass over part-sized slices yields both the per-part digests that
+    // storage checks and the whole-file digest, without holding the file in memory.
+    const partSize = Math.max(DIRECT_UPLOAD_PART_SIZE, Math.ceil(file.size / 10000));
+    const fileHash = new Sha256();
+    const partSha256: string[] = [];
+    for (let start = 0; start < file.size; start += partSize) {
+      const bytes = new Uint8Array(await file.slice(start, start + partSize).arrayBuffer());
+      fileHash.update(bytes);
+      partSha256.push(toHex(await crypto.subtle.digest('SHA-256', bytes)));
+    }
+    const initiate = await authFetch(`${API_BASE_URL}/evidence-items/${evidenceItemId}/uploads`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({
+        filename: file.name,
+        content_type: file.type || 'application/octet-stream',
+        size_bytes: file.size,
+        sha256: fileHash.hexDigest(),
+        part_size: partSize,
+        part_sha256: partSha256,
+      }),
+    });
+    await checkOk(initiate);
+    const upload = await initiate.json();
+
+    // EXISTING: identical content is already stored, so nothing needs sending.
+    let parts: { part_number: number; etag: string; sha256: string }[] | undefined;
+    if (upload.method === 'PUT') {
+      const put = await fetch(upload.url, { method: 'PUT', headers: upload.headers, body: file });
+      if (!put.ok) throw new Error(`Upload failed (${put.status})`);
+    } else if (upload.method === 'MULTIPART') {
+      parts = [];
+      for (const part of upload.parts as { part_number: number; url: string; headers: Record<string, string> }[]) {
+        const start = (part.part_number - 1) * upload.part_size;
+        const put = await fetch(part.url, {
+          method: 'PUT',
+          headers: part.headers,
+          body: file.slice(start, start + upload.part_size),
+        });
+        if (!put.ok) throw new Error(`Upload of part ${part.part_number} failed (${put.status})`);
+        parts.push({
+          part_number: part.part_number,
+          etag: put.headers.get('ETag') || '',
+          sha256: partSha256[part.part_number - 1],
+        });
+      }
+    }
+
+    const complete = await authFetch(`${API_BASE_URL}/evidence-items/${evidenceItemId}/uploads/complete`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ upload_token: upload.upload_token, parts }),
+    });
+    await checkOk(complete);
+    return complete.json();
+  },
+
+  async uploadEvidenceFilesDirect(evidenceItemId: string, files: File[]): Promise<{ files: EvidenceFile[] }> {
+    return { files: await Promise.all(files.map((file) => api.uploadEvidenceFileDirect(evidenceItemId, file))) };
+  },
+
   async linkEvidenceToControl(controlId: number, evidenceItemId: string, note?: string): Promise<EvidenceLink> {
     const response = await authFetch(`${API_BASE_URL}/controls/${controlId}/link-evidence`, {
       method: 'POST',
@@ -482,6 +638,19 @@ export const api = {
     return response.json();
   },
 
+  async bulkLinkEvidence(payload: {
+    link?: { control_id: number; evidence_item_id: string; note?: string }[];
+    unlink?: { control_id: number; evidence_item_id: string }[];
+  }): Promise<{ linked: EvidenceLink[]; already_linked: number; unlinked: string[]; recomputed_control_ids: number[] }> {
+    const response = await authFetch(`${API_BASE_URL}/evidence-links/bulk`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify(payload),
+    });
+    await checkOk(response);
+    return response.json();
+  },
+
   async unlinkEvidenceFromControl(controlId: number, linkId: string): Promise<void> {
     const response = await authFetch(`${API_BASE_URL}/controls/${controlId}/unlink-evidence/${linkId}`, {
       method: 'DELETE',
@@ -489,6 +658,18 @@ export const api = {
     await checkOk(response);
   },
 
+  async getEvidenceItemDownloadUrls(evidenceItemId: string): Promise<DownloadUrls> {
+    const response = await authFetch(`${API_BASE_URL}/evidence-items/${evidenceItemId}/download-urls`);
+    await checkOk(response);
+    return response.json();
+  },
+
+  async getControlTimelineDownloadUrls(controlId: number): Promise<DownloadUrls> {
+    const response = await authFetch(`${API_BASE_URL}/controls/${controlId}/timeline/download-urls`);
+    await checkOk(response);
+    return response.json();
+  },
+
   async downloadEvidenceFile(fileId: string): Promise<{ url: string; expires_in: number }> {
     const response = await authFetch(`${API_BASE_URL}/evidence-files/${fileId}/download`);
     await checkOk(response);
@@ -537,17 +718,49 @@ export const api = {
   },
 
   // Audit (ADMIN/MANAGER/AUDITOR)
-  async getAuditEvents(params?: { action?: string; entity_type?: string; after?: string; before?: string; q?: string }): Promise<AuditEvent[]> {
+  async getAuditEvents(params?: {
+    action?: string;
+    entity_type?: string;
+    entity_id?: string;
+    after?: string;
+    before?: string;
+    q?: string;
+    cursor?: string;
+    limit?: number;
+  }): Promise<AuditEventsPage> {
     const sp = new URLSearchParams();
     if (params?.action) sp.append('action', params.action);
     if (params?.entity_type) sp.append('entity_type', params.entity_type);
+    if (params?.entity_id) sp.append('entity_id', params.entity_id);
     if (params?.after) sp.append('after', params.after);
     if (params?.before) sp.append('before', params.before);
     if (params?.q) sp.append('q', params.q);
+    if (params?.cursor) sp.append('cursor', params.cursor);
+    if (params?.limit) sp.append('limit', String(params.limit));
     const qs = sp.toString();
     const url = `${API_BASE_URL}/audit/events${qs ? `?${qs}` : ''}`;
     const response = await authFetch(url);
     await checkOk(response);
+    return { events: await response.json(), nextCursor: response.headers.get('X-Next-Cursor') };
+  },
+
+  async getAuditArchives(): Promise<AuditArchive[]> {
+    const response = await authFetch(`${API_BASE_URL}/audit/archives`);
+    await checkOk(response);
     return response.json();
   },
+
+  async getAuditArchiveEvents(
+    archiveId: number,
+    params?: { action?: string; entity_type?: string; entity_id?: string; q?: string; cursor?: string; limit?: number },
+  ): Promise<AuditEventsPage> {
+    const sp = new URLSearchParams();
+    for (const [key, value] of Object.entries(params ?? {})) {
+      if (value) sp.append(key, String(value));
+    }
+    const qs = sp.toString();
+    const response = await authFetch(`${API_BASE_URL}/audit/archives/${archiveId}/events${qs ? `?${qs}` : ''}`);
+    await checkOk(response);
+    return { events: await response.json(), nextCursor: response.headers.get('X-Next-Cursor') };
+  },
 };
@@ -9,17 +9,24 @@ const Audit: React.FC = () => {
   const [filterQ, setFilterQ] = useState('');
   const [filterAction, setFilterAction] = useState('');
   const [filterEntityType, setFilterEntityType] = useState('');
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+
+  const buildParams = () => {
+    const params: { q?: string; action?: string; entity_type?: string } = {};
+    if (filterQ) params.q = filterQ;
+    if (filterAction) params.action = filterAction;
+    if (filterEntityType) params.entity_type = filterEntityType;
+    return params;
+  };
 
   const loadEvents = async () => {
     try {
       setLoading(true);
       setError(null);
-      const params: { q?: string; action?: string; entity_type?: string } = {};
-      if (filterQ) params.q = filterQ;
-      if (filterAction) params.action = filterAction;
-      if (filterEntityType) params.entity_type = filterEntityType;
-      const data = await api.getAuditEvents(params);
-      setEvents(data);
+      const page = await api.getAuditEvents(buildParams());
+      setEvents(page.events);
+      setNextCursor(page.nextCursor);
     } catch (err) {
       setError(err instanceof Error ? err.message : 'Failed to load audit events');
     } finally {
@@ -27,6 +34,20 @@ const Audit: React.FC = () => {
     }
   };
 
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    try {
+      setLoadingMore(true);
+      const page = await api.getAuditEvents({ ...buildParams(), cursor: nextCursor });
+      setEvents((prev) => [...prev, ...page.events]);
+      setNextCursor(page.nextCursor);
+    } catch (err) {
+      setError(err instanceof Error ? err.message : 'Failed to load audit events');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   useEffect(() => {
     loadEvents();
   }, []);
@@ -130,6 +151,13 @@ const Audit: React.FC = () => {
               )}
             </tbody>
           </table>
+          {nextCursor && (
+            <div className="audit-load-more">
+              <button type="button" className="btn-secondary" onClick={loadMore} disabled={loadingMore}>
+                {loadingMore ? 'Loading...' : 'Load more'}
+              </button>
+            </div>
+          )}
         </div>
       )}
     </div>
@@ -224,7 +224,7 @@ const Controls: React.FC = () => {
       await api.linkEvidenceToControl(selectedControl.id, evidence.id);
 
       if (evidenceFiles.length > 0) {
-        await api.uploadEvidenceFiles(evidence.id, evidenceFiles);
+        await api.uploadEvidenceFilesDirect(evidence.id, evidenceFiles);
       }
 
       setEvidenceTitle('');